@@ -7,6 +7,7 @@ including Qualtrics survey data, Google Sheets data, and participant progress tr
 
 from .qualtrics_utils import (
     QualtricsAPI,
+    create_qualtrics_session,
     get_qualtrics_client,
     get_all_study_data,
     get_participant_progress
@@ -25,6 +26,7 @@ except ImportError:
 
 __all__ = [
     'QualtricsAPI',
+    'create_qualtrics_session',
     'get_qualtrics_client', 
     'get_all_study_data',
     'get_participant_progress'
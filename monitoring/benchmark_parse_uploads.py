@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the datetime handling in parse_json_uploads.py.
+
+Generates a synthetic ActivityWatch upload dump and times record extraction
+with the original dateutil-only path against the fast path (ISO/strptime
+parsing plus per-row created_at reuse). Outputs of both paths are compared
+so a speedup never comes at the cost of different results.
+
+Usage: python benchmark_parse_uploads.py [--uploads 2000] [--entries 40] [--repeat 3]
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+from typing import List, Tuple
+from dateutil import parser as date_parser
+
+# Add the current directory to Python path for imports
+sys.path.append(str(Path(__file__).parent))
+
+import parse_json_uploads
+from parse_json_uploads import extract_base_record, iter_upload_records, parse_json_data
+
+APPS = ['YouTube', 'Chrome', 'com.supercell.clashofclans', 'Instagram', 'leagueoflegends.com', 'Discord']
+
+
+def generate_upload_rows(num_uploads: int, entries_per_upload: int, seed: int = 42) -> List[List[str]]:
+    """Generate synthetic uploads rows (id, created_at, json_data, submission_id, platform)."""
+    rng = random.Random(seed)
+    rows = []
+
+    for i in range(num_uploads):
+        app_usage = [
+            {
+                'Date': f"2025-07-{rng.randint(1, 28):02d}",
+                'Time': f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}",
+                'App': rng.choice(APPS),
+                'Duration (min)': round(rng.random() * 60, 2)
+            }
+            for _ in range(entries_per_upload)
+        ]
+        screen_unlocks = [
+            {
+                'Date': f"2025-07-{rng.randint(1, 28):02d}",
+                'Time': f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}"
+            }
+            for _ in range(entries_per_upload // 2)
+        ]
+        json_data = json.dumps([{'AppUsage': app_usage}, {'ScreenUnlocks': screen_unlocks}])
+        created_at = (f"2025-07-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:"
+                      f"{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}.{rng.randint(1, 999999)}+00")
+        rows.append([str(i), created_at, json_data, str(1000 + i % 40), 'ActivityWatch'])
+
+    return rows
+
+
+def extract_records(rows: List[List[str]], legacy: bool) -> List[Tuple[str, dict]]:
+    """
+    Extract all records from the rows.
+
+    With legacy=True every datetime goes through dateutil and created_at is
+    reparsed for each child record, as the parser originally did.
+    """
+    records = []
+    for row in rows:
+        base_record = extract_base_record(row)
+        if legacy:
+            del base_record['created_at_datetime']
+        records.extend(iter_upload_records(base_record, parse_json_data(row[2])))
+    return records
+
+
+def time_path(rows: List[List[str]], legacy: bool, repeat: int) -> Tuple[float, List[Tuple[str, dict]]]:
+    """Return the best wall time over `repeat` runs and the records of the last run."""
+    fast_parse_datetime = parse_json_uploads.fast_parse_datetime
+    if legacy:
+        parse_json_uploads.fast_parse_datetime = date_parser.parse
+
+    try:
+        best = float('inf')
+        records = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            records = extract_records(rows, legacy)
+            best = min(best, time.perf_counter() - start)
+    finally:
+        parse_json_uploads.fast_parse_datetime = fast_parse_datetime
+
+    return best, records
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark datetime parsing in parse_json_uploads.py')
+    parser.add_argument('--uploads', type=int, default=2000, help='Number of synthetic uploads (default: 2000)')
+    parser.add_argument('--entries', type=int, default=40, help='AppUsage entries per upload (default: 40)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per path, best time is reported (default: 3)')
+    args = parser.parse_args()
+
+    print(f"Generating {args.uploads} synthetic uploads with {args.entries} AppUsage entries each...")
+    rows = generate_upload_rows(args.uploads, args.entries)
+
+    legacy_time, legacy_records = time_path(rows, legacy=True, repeat=args.repeat)
+    fast_time, fast_records = time_path(rows, legacy=False, repeat=args.repeat)
+
+    if legacy_records != fast_records:
+        print("✗ Fast path output differs from the dateutil path")
+        sys.exit(1)
+
+    record_count = len(fast_records)
+    print(f"Records extracted: {record_count:,} (outputs identical)")
+    print(f"dateutil path: {legacy_time:.3f}s ({record_count / legacy_time:,.0f} records/s)")
+    print(f"fast path:     {fast_time:.3f}s ({record_count / fast_time:,.0f} records/s)")
+    print(f"Speedup: {legacy_time / fast_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,13 +8,20 @@ ActivityWatch app usage and screen unlock data based on submission_id matching.
 """
 
 import csv
+import io
 import sys
 import os
 import glob
+import tempfile
 import subprocess
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Dict, List, Set, Tuple, Optional
+from typing import Dict, List, Set, Tuple, Optional, Any, Callable, Iterable
+from collections import deque
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
 import argparse
 from dotenv import load_dotenv
 import hashlib
@@ -24,11 +31,50 @@ import json
 from parse_json_uploads import (
     parse_json_data,
     extract_base_record,
-    create_screen_unlocks_record,
-    create_app_usage_record,
-    write_csv_file as parse_write_csv
+    iter_upload_records,
+    find_csv_chunk_offsets,
+    StreamingCSVWriter,
+    SCREEN_UNLOCKS_FIELDNAMES,
+    APP_USAGE_FIELDNAMES
 )
 
+# Import incremental pull helpers from pull_supabase_data
+from pull_supabase_data import (
+    load_watermark,
+    save_watermark,
+    build_uploads_query,
+    get_delta_path,
+    watermark_from_csv,
+    append_delta_to_store
+)
+
+try:
+    import pyarrow  # noqa: F401  (pandas Parquet engine)
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# Byte size of the uploads CSV shards decoded by each worker process
+UPLOAD_CHUNK_BYTES = 4 * 1024 * 1024
+
+# Columns stored as categoricals / floats in the Parquet intermediates
+CATEGORICAL_COLUMNS = ['App', 'platform', 'RANDOM_ID']
+NUMERIC_COLUMNS = ['Duration (min)']
+
+# Rows per Parquet row group written while parsing
+PARQUET_BATCH_ROWS = 50_000
+
+# Contact list variables added to each joined row
+CONTACT_COLUMNS = ['Condition', 'Platforms', 'phoneType', 'EnrollmentDate']
+
+# Keys used to drop duplicate sessions (see deduplicate_app_usage/deduplicate_screen_unlocks)
+APP_USAGE_DEDUP_KEYS = ['RANDOM_ID', 'session_datetime', 'App', 'Duration (min)', 'platform']
+SCREEN_UNLOCKS_DEDUP_KEYS = ['RANDOM_ID', 'session_datetime', 'platform']
+
+# Fields that identify a unique donation in the participant report
+APP_USAGE_CONTENT_FIELDS = ['session_datetime', 'App', 'Duration (min)', 'platform']
+SCREEN_UNLOCKS_CONTENT_FIELDS = ['session_datetime', 'platform']
+
 
 def detect_platform_from_bucket_info(bucket_info):
     """Simple platform detection from bucket info."""
@@ -68,8 +114,14 @@ def load_credentials():
     return db_password, db_url
 
 
-def pull_supabase_data(output_file: Path) -> bool:
-    """Pull fresh ActivityWatch data from Supabase uploads table."""
+def pull_supabase_data(output_file: Path, full_refresh: bool = False) -> bool:
+    """
+    Pull fresh ActivityWatch data from Supabase uploads table.
+    
+    If a previous pull left a high-water mark next to output_file, only rows newer
+    than it are fetched and appended. full_refresh ignores the watermark and
+    re-downloads the whole table.
+    """
     try:
         db_password, db_url = load_credentials()
         
@@ -83,13 +135,17 @@ def pull_supabase_data(output_file: Path) -> bool:
         env = os.environ.copy()
         env["PGPASSWORD"] = db_password
         
+        # Decide between incremental and full pull
+        watermark = None if full_refresh else load_watermark(output_file)
+        target_file = get_delta_path(output_file) if watermark else output_file
+        
         # Build psql command to export uploads table as CSV (ActivityWatch only)
         # Create a temporary SQL script to set timeout and run the copy command
         import tempfile
         
         sql_script = f"""
 SET statement_timeout = '3600000';  -- 1 hour timeout
-\\copy (SELECT * FROM uploads WHERE platform = 'ActivityWatch') TO '{str(output_file)}' WITH CSV HEADER;
+\\copy ({build_uploads_query(watermark)}) TO '{str(target_file)}' WITH CSV HEADER;
 """
         
         with tempfile.NamedTemporaryFile(mode='w', suffix='.sql', delete=False) as f:
@@ -110,14 +166,27 @@ SET statement_timeout = '3600000';  -- 1 hour timeout
         print(f"Database: {database}")
         print(f"User: {user}")
         print(f"Output file: {output_file}")
-        print(f"Pulling ALL ActivityWatch data (with 1-hour statement timeout)")
+        if watermark:
+            print(f"Pulling NEW ActivityWatch data since created_at={watermark['created_at']}, id={watermark['id']} (with 1-hour statement timeout)")
+        else:
+            print(f"Pulling ALL ActivityWatch data (with 1-hour statement timeout)")
         
         try:
             # Execute command
             result = subprocess.run(cmd, env=env, capture_output=True, text=True)
             
             if result.returncode == 0:
-                print(f"✓ ActivityWatch data successfully exported to {output_file}")
+                if watermark:
+                    appended_count, new_watermark = append_delta_to_store(target_file, output_file)
+                    target_file.unlink()
+                    print(f"✓ Appended {appended_count} new ActivityWatch rows to {output_file}")
+                else:
+                    new_watermark = watermark_from_csv(output_file)
+                    print(f"✓ ActivityWatch data successfully exported to {output_file}")
+                
+                if new_watermark:
+                    save_watermark(output_file, new_watermark)
+                
                 if output_file.exists():
                     file_size = output_file.stat().st_size
                     file_size_mb = file_size / (1024 * 1024)
@@ -141,14 +210,186 @@ SET statement_timeout = '3600000';  -- 1 hour timeout
 
 
 
-def parse_supabase_data(input_file: Path, output_dir: Path) -> Tuple[Optional[Path], Optional[Path]]:
-    """Parse the raw Supabase CSV data into app usage and screen unlocks tables."""
+def parse_upload_rows(rows: Iterable[List[str]], emit: Callable[[str, Dict[str, str]], None],
+                      platform_counts: Dict[str, int], report_progress: bool = False) -> Tuple[int, int]:
+    """
+    Decode upload rows and pass each flattened (table, record) pair to emit.
+    
+    Returns:
+        Tuple of (processed row count, error row count)
+    """
+    processed_count = 0
+    error_count = 0
+    
+    for row in rows:
+        try:
+            base_record = extract_base_record(row)
+            json_data = parse_json_data(row[2])
+            
+            # Detect platform from BucketInfo
+            platform = 'Other'  # default
+            if 'BucketInfo' in json_data and json_data['BucketInfo']:
+                platform = detect_platform_from_bucket_info(json_data['BucketInfo'])
+            
+            # Count platforms
+            platform_counts[platform] += 1
+            
+            # Emit ScreenUnlocks and AppUsage records
+            for table, record in iter_upload_records(base_record, json_data):
+                record['platform'] = platform
+                emit(table, record)
+            
+            processed_count += 1
+            
+            if report_progress and processed_count % 1000 == 0:
+                print(f"Processed {processed_count} rows...")
+        
+        except Exception as e:
+            error_count += 1
+            continue
+    
+    return processed_count, error_count
+
+
+def _parse_upload_chunk(input_file: str, start: int, end: int, chunk_prefix: str,
+                        outputs: Dict[str, List[Tuple[str, List[str]]]]) -> Dict[str, Any]:
+    """
+    Process pool worker: decode the upload rows in one byte range of the uploads CSV.
+    
+    outputs maps each table to its (file format, fieldnames) outputs. Records are
+    written to per-table chunk files named chunk_prefix + table + '.' + format,
+    so only file names and counts are sent back to the parent process.
+    """
+    csv.field_size_limit(sys.maxsize)
+    
+    with open(input_file, 'rb') as f:
+        f.seek(start)
+        raw_chunk = f.read(end - start)
+    
+    platform_counts = {'Android': 0, 'Other': 0}
+    row_files = {
+        table: [f"{chunk_prefix}{table}.{file_format}" for file_format, _ in formats]
+        for table, formats in outputs.items()
+    }
+    row_counts = {table: 0 for table in outputs}
+    
+    with ExitStack() as stack:
+        chunk_writers = {
+            table: [
+                stack.enter_context(open_table_writer(file_format, path, fieldnames, header=False, report=False))
+                for (file_format, fieldnames), path in zip(formats, row_files[table])
+            ]
+            for table, formats in outputs.items()
+        }
+        
+        def emit(table: str, record: Dict[str, str]) -> None:
+            for writer in chunk_writers[table]:
+                writer.write(record)
+            row_counts[table] += 1
+        
+        # TextIOWrapper applies the same newline translation as open(..., 'r') in the serial path
+        reader = csv.reader(io.TextIOWrapper(io.BytesIO(raw_chunk), encoding='utf-8'))
+        processed_count, error_count = parse_upload_rows(reader, emit, platform_counts)
+    
+    return {
+        'row_files': row_files,
+        'row_counts': row_counts,
+        'platform_counts': platform_counts,
+        'processed': processed_count,
+        'errors': error_count
+    }
+
+
+def parse_upload_rows_parallel(input_file: Path, workers: int, writers: Dict[str, List[Any]],
+                               platform_counts: Dict[str, int],
+                               chunk_bytes: int = UPLOAD_CHUNK_BYTES) -> Tuple[int, int]:
+    """
+    Decode the uploads CSV across a process pool, sharded into fixed-size byte ranges.
+    
+    writers maps each table to its StreamingCSVWriter / StreamingParquetWriter
+    outputs. Each worker writes its chunk's rows to temporary files in the same
+    formats, which are appended to writers strictly in file order, so the output
+    is identical to a serial run. At most workers * 2 chunks are in flight and
+    decoded records never cross the process boundary, so memory use does not
+    grow with the file size.
+    
+    Returns:
+        Tuple of (processed row count, error row count)
+    """
+    chunks = find_csv_chunk_offsets(str(input_file), chunk_bytes)
+    outputs = {
+        table: [(writer.file_format, writer.fieldnames) for writer in table_writers]
+        for table, table_writers in writers.items()
+    }
+    output_dir = Path(writers['app_usage'][0].filename).parent
+    print(f"Decoding {len(chunks)} chunks with {workers} worker processes...")
+    
+    processed_count = 0
+    error_count = 0
+    
+    with tempfile.TemporaryDirectory(dir=output_dir) as temp_dir, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        chunk_iter = enumerate(chunks)
+        
+        def submit(index: int, start: int, end: int):
+            chunk_prefix = os.path.join(temp_dir, f"chunk_{index:06d}_")
+            return executor.submit(_parse_upload_chunk, str(input_file), start, end, chunk_prefix, outputs)
+        
+        pending = deque(submit(index, start, end) for index, (start, end) in islice(chunk_iter, workers * 2))
+        
+        while pending:
+            result = pending.popleft().result()
+            
+            # Keep the pool busy while this chunk is being appended
+            for index, (start, end) in islice(chunk_iter, 1):
+                pending.append(submit(index, start, end))
+            
+            for table, rows_files in result['row_files'].items():
+                count = result['row_counts'][table]
+                for writer, rows_file in zip(writers[table], rows_files):
+                    # Chunk writers only create a file once a record arrives
+                    if count:
+                        writer.append_rows_file(rows_file, count)
+                        os.unlink(rows_file)
+            
+            for platform, count in result['platform_counts'].items():
+                platform_counts[platform] += count
+            
+            processed_count += result['processed']
+            error_count += result['errors']
+            print(f"Processed {processed_count} rows...")
+    
+    return processed_count, error_count
+
+
+def parse_supabase_data(input_file: Path, output_dir: Path, workers: int = 1, store_format: str = 'csv',
+                        write_csv: bool = True) -> Tuple[Optional[Path], Optional[Path]]:
+    """
+    Parse the raw Supabase CSV data into app usage and screen unlocks tables.
+    
+    Records are streamed to aw_app_usage / aw_screen_unlocks as each upload row
+    is decoded, so memory use does not grow with the dump size. With
+    store_format 'parquet', typed Parquet tables are written from the same
+    stream, alongside the CSV tables unless write_csv is False.
+    With workers > 1, JSON decoding is spread over a process pool.
+    
+    Returns:
+        Tuple of (app usage file, screen unlocks file) in store_format
+    """
     try:
         print(f"Parsing JSON data from {input_file}...")
         
-        # Collections for the two target tables
-        screen_unlocks_records = []
-        app_usage_records = []
+        # Output files for the two target tables (fixed schema incl. platform)
+        table_fieldnames = {
+            'screen_unlocks': sorted(SCREEN_UNLOCKS_FIELDNAMES + ['platform']),
+            'app_usage': sorted(APP_USAGE_FIELDNAMES + ['platform'])
+        }
+        file_formats = [store_format] if store_format == 'csv' or not write_csv else ['csv', store_format]
+        writers = {
+            table: [open_table_writer(file_format, str(output_dir / f"aw_{table}.{file_format}"), fieldnames)
+                    for file_format in file_formats]
+            for table, fieldnames in table_fieldnames.items()
+        }
         
         # Platform counting for summary
         platform_counts = {'Android': 0, 'Other': 0}
@@ -156,70 +397,38 @@ def parse_supabase_data(input_file: Path, output_dir: Path) -> Tuple[Optional[Pa
         # Set CSV field size limit to maximum
         csv.field_size_limit(sys.maxsize)
         
+        # Stream ScreenUnlocks and AppUsage records straight to disk
+        def emit(table: str, record: Dict[str, str]) -> None:
+            for writer in writers[table]:
+                writer.write(record)
+        
         # Process CSV file
-        with open(input_file, 'r', encoding='utf-8') as csvfile:
-            reader = csv.reader(csvfile)
-            header = next(reader)
+        with ExitStack() as stack:
+            for table_writers in writers.values():
+                for writer in table_writers:
+                    stack.enter_context(writer)
             
-            processed_count = 0
-            error_count = 0
+            if workers > 1:
+                processed_count, error_count = parse_upload_rows_parallel(input_file, workers, writers, platform_counts)
+            else:
+                with open(input_file, 'r', encoding='utf-8') as csvfile:
+                    reader = csv.reader(csvfile)
+                    header = next(reader)
             
-            for row_num, row in enumerate(reader, start=2):
-                try:
-                    base_record = extract_base_record(row)
-                    json_data = parse_json_data(row[2])
-                    
-                    # Detect platform from BucketInfo
-                    platform = 'Other'  # default
-                    if 'BucketInfo' in json_data and json_data['BucketInfo']:
-                        platform = detect_platform_from_bucket_info(json_data['BucketInfo'])
-                    
-                    # Count platforms
-                    platform_counts[platform] += 1
-                    
-                    # Process ScreenUnlocks data
-                    if 'ScreenUnlocks' in json_data and json_data['ScreenUnlocks']:
-                        for unlock_record in json_data['ScreenUnlocks']:
-                            screen_unlock = create_screen_unlocks_record(base_record, unlock_record)
-                            screen_unlock['platform'] = platform
-                            screen_unlocks_records.append(screen_unlock)
-                    
-                    # Process AppUsage data
-                    if 'AppUsage' in json_data and json_data['AppUsage']:
-                        for app_record in json_data['AppUsage']:
-                            app_usage = create_app_usage_record(base_record, app_record)
-                            app_usage['platform'] = platform
-                            app_usage_records.append(app_usage)
-                    
-                    processed_count += 1
-                    
-                    if processed_count % 1000 == 0:
-                        print(f"Processed {processed_count} rows...")
-                        
-                except Exception as e:
-                    error_count += 1
-                    continue
-        
-        # Write output files
-        app_usage_file = None
-        screen_unlocks_file = None
-        
-        # Write screen unlocks table
-        if screen_unlocks_records:
-            screen_unlocks_file = output_dir / "aw_screen_unlocks.csv"
-            parse_write_csv(str(screen_unlocks_file), screen_unlocks_records)
+                    processed_count, error_count = parse_upload_rows(reader, emit, platform_counts, report_progress=True)
         
-        # Write app usage table
-        if app_usage_records:
-            app_usage_file = output_dir / "aw_app_usage.csv"
-            parse_write_csv(str(app_usage_file), app_usage_records)
+        # Only report files that actually received records
+        output_files = {}
+        for table, table_writers in writers.items():
+            writer = table_writers[-1]
+            output_files[table] = Path(writer.filename) if writer.count else None
         
         print(f"✓ Parsing complete! Processed {processed_count} rows, {error_count} errors")
         print(f"  Platform distribution - Android: {platform_counts['Android']}, Other: {platform_counts['Other']}")
-        print(f"  Screen unlocks: {len(screen_unlocks_records)} records")
-        print(f"  App usage: {len(app_usage_records)} records")
+        print(f"  Screen unlocks: {writers['screen_unlocks'][0].count} records")
+        print(f"  App usage: {writers['app_usage'][0].count} records")
         
-        return app_usage_file, screen_unlocks_file
+        return output_files['app_usage'], output_files['screen_unlocks']
         
     except Exception as e:
         print(f"✗ Error parsing Supabase data: {e}")
@@ -410,10 +619,149 @@ def load_contact_list_data(contact_file: str) -> Dict[str, Dict[str, str]]:
     return contact_data
 
 
+def require_parquet() -> None:
+    """Raise if the optional Parquet dependency is missing."""
+    if not PARQUET_AVAILABLE:
+        raise ImportError("Parquet support requires pyarrow. Run: pip install pyarrow")
+
+
+def apply_column_types(df):
+    """Convert *_datetime columns to datetimes and CATEGORICAL_COLUMNS to categoricals."""
+    import pandas as pd
+    
+    for col in df.columns:
+        if col.endswith('_datetime'):
+            df[col] = pd.to_datetime(df[col])
+    
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    
+    return df
+
+
+def parquet_schema(fieldnames: List[str]):
+    """Arrow schema of an ActivityWatch table, with the types apply_column_types() produces."""
+    import pyarrow as pa
+    
+    fields = []
+    for name in fieldnames:
+        if name.endswith('_datetime'):
+            field_type = pa.timestamp('ns')
+        elif name in CATEGORICAL_COLUMNS:
+            field_type = pa.dictionary(pa.int32(), pa.string())
+        elif name in NUMERIC_COLUMNS:
+            field_type = pa.float64()
+        else:
+            field_type = pa.string()
+        fields.append(pa.field(name, field_type))
+    
+    return pa.schema(fields)
+
+
+class StreamingParquetWriter:
+    """
+    Write records to a typed Parquet file, the Parquet counterpart of StreamingCSVWriter.
+    
+    Records are buffered and written as one row group per batch_rows, so memory
+    use is bounded by the batch size. The file is only created when the first
+    batch is written.
+    """
+    
+    file_format = 'parquet'
+    
+    def __init__(self, filename: str, fieldnames: List[str], batch_rows: int = PARQUET_BATCH_ROWS,
+                 report: bool = True):
+        require_parquet()
+        self.filename = filename
+        self.fieldnames = fieldnames
+        self.batch_rows = batch_rows
+        self.report = report
+        self.schema = parquet_schema(fieldnames)
+        self.count = 0
+        self._records = []
+        self._writer = None
+    
+    def write(self, record: Dict[str, Any]) -> None:
+        """Buffer a single record, writing a row group once batch_rows are buffered."""
+        self._records.append(record)
+        self.count += 1
+        if len(self._records) >= self.batch_rows:
+            self._flush()
+    
+    def append_rows_file(self, rows_file: str, count: int) -> None:
+        """Append a Parquet chunk of count rows written with the same fieldnames."""
+        import pyarrow.parquet as pq
+        
+        if not count:
+            return
+        
+        self._flush()
+        self._write_table(pq.read_table(rows_file))
+        self.count += count
+    
+    def _flush(self) -> None:
+        import pandas as pd
+        import pyarrow as pa
+        
+        if not self._records:
+            return
+        
+        df = apply_column_types(pd.DataFrame.from_records(self._records, columns=self.fieldnames))
+        for col in NUMERIC_COLUMNS:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+        self._records = []
+        self._write_table(pa.Table.from_pandas(df, schema=self.schema, preserve_index=False))
+    
+    def _write_table(self, table) -> None:
+        import pyarrow.parquet as pq
+        
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.filename, self.schema)
+        self._writer.write_table(table)
+    
+    def close(self) -> None:
+        """Write any buffered records, close the file and report how much was written."""
+        self._flush()
+        
+        if self._writer is None:
+            if self.report:
+                print(f"No records to write for {self.filename}")
+            return
+        
+        self._writer.close()
+        self._writer = None
+        
+        if self.report:
+            file_size_mb = os.path.getsize(self.filename) / (1024 * 1024)
+            print(f"Written {self.count} records to {self.filename} ({file_size_mb:.2f} MB)")
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def open_table_writer(file_format: str, filename: str, fieldnames: List[str], header: bool = True,
+                      report: bool = True):
+    """Create a StreamingCSVWriter or StreamingParquetWriter for an ActivityWatch table."""
+    if file_format == 'parquet':
+        return StreamingParquetWriter(filename, fieldnames, report=report)
+    return StreamingCSVWriter(filename, fieldnames, header=header, report=report)
+
+
 def load_activitywatch_data(file_path: str) -> List[Dict[str, str]]:
-    """Load ActivityWatch data from CSV file with datetime conversion."""
+    """Load ActivityWatch data from a CSV or Parquet file with datetime conversion."""
     import pandas as pd
     
+    if str(file_path).endswith('.parquet'):
+        # Parquet keeps the column types, so no datetime re-parsing is needed
+        df = pd.read_parquet(file_path)
+        return df.to_dict('records')
+    
     # Load as pandas DataFrame to handle datetime conversion
     df = pd.read_csv(file_path)
     
@@ -537,6 +885,121 @@ def deduplicate_screen_unlocks(data: List[Dict[str, str]]) -> List[Dict[str, str
     return deduplicated_data
 
 
+def load_activitywatch_frame(file_path: str):
+    """Load ActivityWatch data from a CSV or Parquet file as a DataFrame with datetime conversion."""
+    import pandas as pd
+    
+    if str(file_path).endswith('.parquet'):
+        return pd.read_parquet(file_path)
+    
+    df = pd.read_csv(file_path)
+    for col in df.columns:
+        if col.endswith('_datetime'):
+            df[col] = pd.to_datetime(df[col])
+    
+    return df
+
+
+def perform_left_join_frame(df, submission_mapping: Dict[str, str], contact_data: Dict[str, Dict[str, str]]):
+    """
+    DataFrame version of perform_left_join().
+    
+    RANDOM_ID is attached with an inner merge on the normalised submission_id
+    and the contact variables with a left merge on RANDOM_ID, so only matched
+    rows are returned, in their original order.
+    """
+    import pandas as pd
+    
+    if 'submission_id' not in df.columns:
+        return df.iloc[0:0].assign(RANDOM_ID='', **{col: '' for col in CONTACT_COLUMNS})
+    
+    mapping_df = pd.DataFrame(
+        [(submission_id, random_id) for submission_id, random_id in submission_mapping.items() if random_id],
+        columns=['_submission_key', 'RANDOM_ID']
+    )
+    contact_df = pd.DataFrame(
+        [[random_id] + [contact_vars.get(col, '') for col in CONTACT_COLUMNS]
+         for random_id, contact_vars in contact_data.items()],
+        columns=['RANDOM_ID'] + CONTACT_COLUMNS
+    )
+    
+    # Joined columns replace any existing ones, as perform_left_join() does
+    joined = df.drop(columns=[col for col in ['RANDOM_ID'] + CONTACT_COLUMNS if col in df.columns])
+    joined['_submission_key'] = joined['submission_id'].astype(str).str.strip()
+    
+    joined = joined.merge(mapping_df, on='_submission_key', how='inner')
+    joined = joined.merge(contact_df, on='RANDOM_ID', how='left')
+    joined[CONTACT_COLUMNS] = joined[CONTACT_COLUMNS].fillna('')
+    
+    return joined.drop(columns=['_submission_key'])
+
+
+def deduplicate_frame(df, keys: List[str]):
+    """
+    DataFrame version of deduplicate_app_usage()/deduplicate_screen_unlocks().
+    
+    Keeps the first row for each combination of keys, comparing text columns
+    after stripping whitespace like the record-based functions do.
+    """
+    import pandas as pd
+    
+    key_df = pd.DataFrame(index=df.index)
+    for col in keys:
+        if col not in df.columns:
+            key_df[col] = ''
+        elif pd.api.types.is_datetime64_any_dtype(df[col]):
+            key_df[col] = df[col]
+        else:
+            key_df[col] = df[col].astype(str).str.strip()
+    
+    return df[~key_df.duplicated(keep='first')]
+
+
+def collect_submission_ids(data) -> Set[str]:
+    """Return the normalised, non-empty submission_ids of ActivityWatch records or a DataFrame."""
+    import pandas as pd
+    
+    if isinstance(data, pd.DataFrame):
+        raw_values = data['submission_id'].unique() if 'submission_id' in data.columns else []
+    else:
+        raw_values = (record.get('submission_id', '') for record in data)
+    
+    submission_ids = set()
+    for submission_id_raw in raw_values:
+        if isinstance(submission_id_raw, (int, float)):
+            submission_id = str(submission_id_raw)
+        else:
+            submission_id = str(submission_id_raw).strip()
+        if submission_id:
+            submission_ids.add(submission_id)
+    
+    return submission_ids
+
+
+def write_joined_frame(output_file: str, df) -> None:
+    """Write a joined DataFrame to CSV, producing the same file as write_joined_data()."""
+    import pandas as pd
+    
+    if df.empty:
+        print(f"No data to write to {output_file}")
+        return
+    
+    out = df[sorted(df.columns)].copy()
+    
+    # Format values the way csv.DictWriter does (str() of each value)
+    for col in out.columns:
+        if pd.api.types.is_datetime64_any_dtype(out[col]):
+            out[col] = out[col].map(str)
+    
+    out.to_csv(output_file, index=False, na_rep='nan', lineterminator='\r\n', encoding='utf-8')
+    
+    # Report file size
+    file_size = os.path.getsize(output_file)
+    file_size_mb = file_size / (1024 * 1024)
+    print(f"✓ Written {len(out)} records to {output_file}")
+    print(f"File size: {file_size_mb:.2f} MB ({file_size:,} bytes)")
+
+
 def write_joined_data(output_file: str, data: List[Dict[str, str]]) -> None:
     """Write joined data to CSV file."""
     if not data:
@@ -565,6 +1028,33 @@ def write_joined_data(output_file: str, data: List[Dict[str, str]]) -> None:
         print(f"✓ Written {len(data)} records to {output_file}")
 
 
+def write_joined_parquet(output_file: str, data) -> None:
+    """Write joined data (records or a DataFrame) to a typed Parquet file with the write_joined_data() columns."""
+    import pandas as pd
+    
+    require_parquet()
+    
+    if len(data) == 0:
+        print(f"No data to write to {output_file}")
+        return
+    
+    if isinstance(data, pd.DataFrame):
+        df = data[sorted(data.columns)].copy()
+    else:
+        fieldnames = set()
+        for row in data:
+            fieldnames.update(row.keys())
+        df = pd.DataFrame(data, columns=sorted(fieldnames))
+    
+    df = apply_column_types(df)
+    df.to_parquet(output_file, index=False)
+    
+    file_size = os.path.getsize(output_file)
+    file_size_mb = file_size / (1024 * 1024)
+    print(f"✓ Written {len(df)} records to {output_file}")
+    print(f"File size: {file_size_mb:.2f} MB ({file_size:,} bytes)")
+
+
 def hash_data_content(data_dict: Dict[str, str]) -> str:
     """Create a hash of relevant data content for uniqueness comparison."""
     # Create a consistent representation of the data for hashing
@@ -754,6 +1244,105 @@ def generate_participant_report(joined_app_usage: List[Dict[str, str]],
     return report_data
 
 
+def generate_participant_report_frame(joined_app_usage, joined_screen_unlocks,
+                                     contact_data: Dict[str, Dict[str, str]]) -> List[Dict[str, str]]:
+    """
+    DataFrame version of generate_participant_report(), returning the same report rows.
+    
+    Each distinct EnrollmentDate is parsed once, study days are a vectorized date
+    difference, and unique donations are counted per participant on a 64-bit row
+    hash of the content fields instead of an md5 per record.
+    """
+    import pandas as pd
+    
+    participant_stats = {}
+    
+    tables = [
+        ('app_usage', joined_app_usage, APP_USAGE_CONTENT_FIELDS),
+        ('screen_unlocks', joined_screen_unlocks, SCREEN_UNLOCKS_CONTENT_FIELDS)
+    ]
+    
+    for data_type, df, content_fields in tables:
+        if df.empty or 'RANDOM_ID' not in df.columns:
+            continue
+        
+        df = df[df['RANDOM_ID'].notna() & (df['RANDOM_ID'] != '')]
+        random_ids = df['RANDOM_ID'].astype(str)
+        
+        # Donation counts and unique content per participant
+        present_fields = [field for field in content_fields if field in df.columns]
+        if present_fields:
+            content_hash = pd.util.hash_pandas_object(df[present_fields], index=False)
+        else:
+            content_hash = pd.Series(0, index=df.index)
+        
+        donations = pd.DataFrame({'RANDOM_ID': random_ids, 'content_hash': content_hash})
+        grouped = donations.groupby('RANDOM_ID')['content_hash']
+        
+        for random_id, total, unique in zip(grouped.size().index, grouped.size(), grouped.nunique()):
+            if random_id not in participant_stats:
+                participant_stats[random_id] = {
+                    'submission_ids': set(),
+                    'study_days': set(),
+                    'num_unique_donations': 0,
+                    'total_donations': 0,
+                    'data_type': data_type
+                }
+            elif participant_stats[random_id]['data_type'] != data_type:
+                # Mixed data type
+                participant_stats[random_id]['data_type'] = 'mixed'
+            
+            participant_stats[random_id]['num_unique_donations'] += int(unique)
+            participant_stats[random_id]['total_donations'] += int(total)
+        
+        # Count submission IDs
+        if 'submission_id' in df.columns:
+            pairs = pd.DataFrame({'RANDOM_ID': random_ids, 'submission_id': df['submission_id']}).drop_duplicates()
+            for random_id, submission_id in pairs.itertuples(index=False):
+                if submission_id:
+                    participant_stats[random_id]['submission_ids'].add(str(submission_id))
+        
+        # Calculate study days relative to each distinct enrollment date
+        if 'EnrollmentDate' in df.columns and 'session_datetime' in df.columns:
+            enrollment_dates = {
+                date_str: parse_enrollment_date(date_str)
+                for date_str in df['EnrollmentDate'].unique() if date_str
+            }
+            enrollment = pd.to_datetime(df['EnrollmentDate'].map(enrollment_dates))
+            session = pd.to_datetime(df['session_datetime'])
+            
+            study_day = (session.dt.normalize() - enrollment.dt.normalize()).dt.days + 1
+            in_study = study_day.between(1, 28)
+            
+            pairs = pd.DataFrame({'RANDOM_ID': random_ids[in_study], 'study_day': study_day[in_study]}).drop_duplicates()
+            for random_id, day in pairs.itertuples(index=False):
+                participant_stats[random_id]['study_days'].add(int(day))
+    
+    # Convert to report format (same fields as generate_participant_report)
+    report_data = []
+    for random_id in sorted(participant_stats):
+        stats = participant_stats[random_id]
+        contact_info = contact_data.get(random_id, {})
+        
+        report_data.append({
+            'RANDOM_ID': random_id,
+            'Condition': contact_info.get('Condition', ''),
+            'Platforms': contact_info.get('Platforms', ''),
+            'phoneType': contact_info.get('phoneType', ''),
+            'EnrollmentDate': contact_info.get('EnrollmentDate', ''),
+            'data_type': stats['data_type'],
+            'num_submission_ids': len(stats['submission_ids']),
+            'num_unique_donations': stats['num_unique_donations'],
+            'total_donation_records': stats['total_donations'],
+            'uniqueness_ratio': stats['num_unique_donations'] / stats['total_donations'] if stats['total_donations'] > 0 else 0,
+            'study_days_with_data': sorted(stats['study_days']),
+            'num_study_days_with_data': len(stats['study_days']),
+            'submission_ids_list': sorted(stats['submission_ids'])
+        })
+    
+    return report_data
+
+
 def write_participant_report(output_file: str, report_data: List[Dict[str, str]]) -> None:
     """Write participant report to CSV file."""
     if not report_data:
@@ -791,6 +1380,17 @@ def main():
                         help='Skip pulling fresh ActivityWatch & diary data from Supabase (use existing files)')
     parser.add_argument('--skip-parse', action='store_true',
                         help='Skip parsing step (use existing parsed files)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of processes used to decode upload JSON during parsing (default: 1)')
+    parser.add_argument('--full-refresh', action='store_true',
+                        help='Re-download the entire uploads table instead of only rows newer than the stored watermark')
+    parser.add_argument('--store-format', choices=['csv', 'parquet'], default='csv',
+                        help='On-disk format for the aw_* and joined_* intermediates (default: csv). '
+                             'parquet requires pyarrow (pip install pyarrow)')
+    parser.add_argument('--no-csv-export', action='store_true',
+                        help='With --store-format parquet, do not also write the CSV copies used by the R analysis')
+    parser.add_argument('--join-engine', choices=['records', 'dataframe'], default='records',
+                        help='Implementation of the join/dedup step: per-row records or vectorized DataFrame merges (default: records)')
     parser.add_argument('--verbose', '-v', action='store_true',
                         help='Enable verbose output')
     parser.add_argument('--debug', action='store_true',
@@ -798,6 +1398,11 @@ def main():
     
     args = parser.parse_args()
     
+    use_parquet = args.store_format == 'parquet'
+    if use_parquet and not PARQUET_AVAILABLE:
+        print("Error: --store-format parquet requires pyarrow. Run: pip install pyarrow", file=sys.stderr)
+        sys.exit(1)
+    
     output_dir = Path(args.output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
     
@@ -854,7 +1459,7 @@ def main():
             # Pull ActivityWatch data (only if needed)
             if not args.debug or files_status.get("ActivityWatch data") == 'old':
                 print("\n1.1: Pulling ActivityWatch data...")
-                aw_success = pull_supabase_data(raw_data_file)
+                aw_success = pull_supabase_data(raw_data_file, full_refresh=args.full_refresh)
                 
                 if not aw_success:
                     print("Failed to pull ActivityWatch data from Supabase")
@@ -927,7 +1532,9 @@ def main():
             print("=" * 60)
             
             raw_data_file = output_dir / "uploads_data.csv"
-            app_usage_file, screen_unlocks_file = parse_supabase_data(raw_data_file, output_dir)
+            app_usage_file, screen_unlocks_file = parse_supabase_data(raw_data_file, output_dir, workers=args.workers,
+                                                                      store_format=args.store_format,
+                                                                      write_csv=not args.no_csv_export)
             
             if not app_usage_file or not screen_unlocks_file:
                 print("Failed to parse Supabase data")
@@ -940,7 +1547,9 @@ def main():
                 print("STEP 2: PARSING EXISTING JSON DATA")
                 print("=" * 60)
                 
-                app_usage_file, screen_unlocks_file = parse_supabase_data(raw_data_file, output_dir)
+                app_usage_file, screen_unlocks_file = parse_supabase_data(raw_data_file, output_dir, workers=args.workers,
+                                                                          store_format=args.store_format,
+                                                                          write_csv=not args.no_csv_export)
                 
                 if not app_usage_file or not screen_unlocks_file:
                     print("Failed to parse existing Supabase data")
@@ -955,8 +1564,15 @@ def main():
         print("FINDING EXISTING ACTIVITYWATCH FILES")
         print("=" * 60)
         
-        app_usage_file = find_activitywatch_files(str(output_dir), 'aw_app_usage.csv')
-        screen_unlocks_file = find_activitywatch_files(str(output_dir), 'aw_screen_unlocks.csv')
+        app_usage_file = None
+        screen_unlocks_file = None
+        if use_parquet:
+            app_usage_file = find_activitywatch_files(str(output_dir), 'aw_app_usage.parquet')
+            screen_unlocks_file = find_activitywatch_files(str(output_dir), 'aw_screen_unlocks.parquet')
+        
+        # Fall back to the CSV tables if no Parquet copy exists
+        app_usage_file = app_usage_file or find_activitywatch_files(str(output_dir), 'aw_app_usage.csv')
+        screen_unlocks_file = screen_unlocks_file or find_activitywatch_files(str(output_dir), 'aw_screen_unlocks.csv')
         
         if not app_usage_file:
             print(f"Error: No app usage file (aw_app_usage.csv) found in {output_dir}", file=sys.stderr)
@@ -1011,32 +1627,46 @@ def main():
         for i, (rand_id, contact_vars) in enumerate(list(contact_data.items())[:5]):
             print(f"  {rand_id} -> {contact_vars}")
     
+    # Pick the join/dedup implementation (both produce identical output files)
+    if args.join_engine == 'dataframe':
+        load_data = load_activitywatch_frame
+        left_join = perform_left_join_frame
+        dedup_app_usage = partial(deduplicate_frame, keys=APP_USAGE_DEDUP_KEYS)
+        dedup_screen_unlocks = partial(deduplicate_frame, keys=SCREEN_UNLOCKS_DEDUP_KEYS)
+        write_joined = write_joined_frame
+    else:
+        load_data = load_activitywatch_data
+        left_join = perform_left_join
+        dedup_app_usage = deduplicate_app_usage
+        dedup_screen_unlocks = deduplicate_screen_unlocks
+        write_joined = write_joined_data
+    
     # Process app usage data
     print(f"\nProcessing app usage data...")
-    app_usage_data = load_activitywatch_data(app_usage_file)
+    app_usage_data = load_data(app_usage_file)
     print(f"✓ Loaded {len(app_usage_data)} app usage records")
     
-    joined_app_usage = perform_left_join(app_usage_data, submission_mapping, contact_data)
+    joined_app_usage = left_join(app_usage_data, submission_mapping, contact_data)
     print(f"✓ Matched {len(joined_app_usage)}/{len(app_usage_data)} app usage records with RANDOM_ID and contact data")
     
     # Deduplicate app usage data
     print(f"Deduplicating app usage records...")
-    deduplicated_app_usage = deduplicate_app_usage(joined_app_usage)
+    deduplicated_app_usage = dedup_app_usage(joined_app_usage)
     duplicates_removed = len(joined_app_usage) - len(deduplicated_app_usage)
     print(f"✓ Removed {duplicates_removed} duplicate app usage records ({len(deduplicated_app_usage)} remaining)")
     joined_app_usage = deduplicated_app_usage
     
     # Process screen unlocks data
     print(f"\nProcessing screen unlocks data...")
-    screen_unlocks_data = load_activitywatch_data(screen_unlocks_file)
+    screen_unlocks_data = load_data(screen_unlocks_file)
     print(f"✓ Loaded {len(screen_unlocks_data)} screen unlock records")
     
-    joined_screen_unlocks = perform_left_join(screen_unlocks_data, submission_mapping, contact_data)
+    joined_screen_unlocks = left_join(screen_unlocks_data, submission_mapping, contact_data)
     print(f"✓ Matched {len(joined_screen_unlocks)}/{len(screen_unlocks_data)} screen unlock records with RANDOM_ID and contact data")
     
     # Deduplicate screen unlock data
     print(f"Deduplicating screen unlock records...")
-    deduplicated_screen_unlocks = deduplicate_screen_unlocks(joined_screen_unlocks)
+    deduplicated_screen_unlocks = dedup_screen_unlocks(joined_screen_unlocks)
     duplicates_removed = len(joined_screen_unlocks) - len(deduplicated_screen_unlocks)
     print(f"✓ Removed {duplicates_removed} duplicate screen unlock records ({len(deduplicated_screen_unlocks)} remaining)")
     joined_screen_unlocks = deduplicated_screen_unlocks
@@ -1048,8 +1678,13 @@ def main():
     app_usage_output = output_dir / "joined_app_usage.csv"
     screen_unlocks_output = output_dir / "joined_screen_unlocks.csv"
     
-    write_joined_data(str(app_usage_output), joined_app_usage)
-    write_joined_data(str(screen_unlocks_output), joined_screen_unlocks)
+    if use_parquet:
+        write_joined_parquet(str(app_usage_output.with_suffix('.parquet')), joined_app_usage)
+        write_joined_parquet(str(screen_unlocks_output.with_suffix('.parquet')), joined_screen_unlocks)
+    
+    if not use_parquet or not args.no_csv_export:
+        write_joined(str(app_usage_output), joined_app_usage)
+        write_joined(str(screen_unlocks_output), joined_screen_unlocks)
     
     # Generate participant-level report
     print(f"\n" + "=" * 60)
@@ -1057,7 +1692,10 @@ def main():
     print("=" * 60)
     
     print(f"Generating participant report...")
-    participant_report = generate_participant_report(joined_app_usage, joined_screen_unlocks, contact_data)
+    if args.join_engine == 'dataframe':
+        participant_report = generate_participant_report_frame(joined_app_usage, joined_screen_unlocks, contact_data)
+    else:
+        participant_report = generate_participant_report(joined_app_usage, joined_screen_unlocks, contact_data)
     
     # Write participant report
     # Generate platform-specific participant reports
@@ -1126,23 +1764,8 @@ def main():
     all_submission_ids_in_data = set()
     
     # Collect all submission IDs from ActivityWatch data
-    for record in app_usage_data:
-        submission_id_raw = record.get('submission_id', '')
-        if isinstance(submission_id_raw, (int, float)):
-            submission_id = str(submission_id_raw)
-        else:
-            submission_id = str(submission_id_raw).strip()
-        if submission_id:
-            all_submission_ids_in_data.add(submission_id)
-    
-    for record in screen_unlocks_data:
-        submission_id_raw = record.get('submission_id', '')
-        if isinstance(submission_id_raw, (int, float)):
-            submission_id = str(submission_id_raw)
-        else:
-            submission_id = str(submission_id_raw).strip()
-        if submission_id:
-            all_submission_ids_in_data.add(submission_id)
+    all_submission_ids_in_data.update(collect_submission_ids(app_usage_data))
+    all_submission_ids_in_data.update(collect_submission_ids(screen_unlocks_data))
     
     # Find submission IDs without RANDOM_ID mapping
     mapped_submission_ids = set(submission_mapping.keys())
@@ -148,68 +148,42 @@ def pull_contact_list_data(output_dir: Path) -> bool:
         return False
 
 
-def run_ocr_analysis() -> bool:
-    """Run OCR analysis pipeline on downloaded screenshots."""
+def run_ocr_analysis(output_dir: Path, max_in_flight: int = 4, batch_size: int = 1) -> bool:
+    """Run the OCR analysis pipeline on downloaded screenshots in-process."""
     try:
         print("\n" + "=" * 60)
         print("STEP: OCR ANALYSIS PIPELINE")
         print("=" * 60)
         
-        # Step 1: Gemini screenshot analysis
-        print("\nStep 1/4: Analyzing screenshots with Gemini OCR...")
-        cmd = ["python3", "monitoring/ocr/gemini_screenshot_analyzer.py"]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=3600)  # 1 hour timeout
+        # Imported here so the pull-only path does not need the OCR dependencies
+        sys.path.insert(0, str(Path(__file__).parent / "ocr"))
+        from ocr_pipeline import run_ocr_pipeline
         
-        if result.returncode != 0:
-            print(f"⚠️ Warning: Gemini analysis exited with non-zero status")
-            print(f"STDERR: {result.stderr}")
-            print(f"STDOUT: {result.stdout}")
-            return False
-        else:
-            print("✓ Gemini screenshot analysis completed")
-            
-        # Step 2: Participant aggregation
-        print("\nStep 2/4: Aggregating participant data...")
-        cmd = ["python3", "monitoring/ocr/participant_aggregator.py"]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)  # 10 min timeout
+        base_dir = output_dir.parent / "downloads" / "diary_images" / "ios"
+        qualtrics_csv = base_dir.parent / "HFF Gaming Reduction 3 - Daily Survey.csv"
         
-        if result.returncode != 0:
-            print(f"⚠️ Warning: Participant aggregation exited with non-zero status")
-            print(f"STDERR: {result.stderr}")
-            return False
-        else:
-            print("✓ Participant aggregation completed")
-            
-        # Step 3: Convert to CSV
-        print("\nStep 3/4: Converting summary to CSV...")
-        cmd = ["python3", "monitoring/ocr/summary_to_csv.py"]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)  # 5 min timeout
+        print(f"Analyzing, aggregating and classifying screenshots in {base_dir}...")
+        result = run_ocr_pipeline(base_dir, qualtrics_csv_path=qualtrics_csv,
+                                  max_in_flight=max_in_flight, batch_size=batch_size,
+                                  index_file=output_dir / "screenshot_index.json")
         
-        if result.returncode != 0:
-            print(f"⚠️ Warning: CSV conversion exited with non-zero status")
-            print(f"STDERR: {result.stderr}")
-            return False
-        else:
-            print("✓ CSV conversion completed")
-            
-        # Step 4: Gaming app classification
-        print("\nStep 4/4: Classifying gaming applications...")
-        cmd = ["python3", "monitoring/ocr/app_game_classifier.py"]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)  # 10 min timeout
+        print(f"✓ Participants processed: {result.participants}")
+        print(f"✓ App usage rows extracted: {result.rows}")
+        if result.enriched_csv:
+            print(f"✓ Enriched CSV: {result.enriched_csv}")
         
-        if result.returncode != 0:
-            print(f"⚠️ Warning: Gaming app classification exited with non-zero status")
-            print(f"STDERR: {result.stderr}")
+        print("\nStage timings:")
+        for stage, seconds in result.stage_timings.items():
+            print(f"  {stage:<14} {seconds:8.1f}s")
+        print("  (classify runs concurrently with analyze; classify_wait is the time spent waiting for it)")
+        
+        if not result.success:
+            print("⚠️ Warning: OCR analysis pipeline completed with errors")
             return False
-        else:
-            print("✓ Gaming app classification completed")
             
         print("\n✓ OCR analysis pipeline completed successfully!")
         return True
         
-    except subprocess.TimeoutExpired as e:
-        print(f"✗ Error: OCR pipeline step timed out: {e}")
-        return False
     except Exception as e:
         print(f"✗ Error in OCR analysis pipeline: {e}")
         return False
@@ -330,6 +304,10 @@ def main():
                         help='Skip downloading fresh data if recent files (< 60 minutes) exist')
     parser.add_argument('--cache-duration', type=int, default=60,
                         help='Cache duration in minutes for debug mode (default: 60)')
+    parser.add_argument('--ocr-max-in-flight', type=int, default=4,
+                        help='Concurrent Gemini OCR requests (default: 4)')
+    parser.add_argument('--ocr-batch-size', type=int, default=1,
+                        help='Screenshots of the same response sent per OCR request (default: 1)')
     
     args = parser.parse_args()
     
@@ -415,7 +393,7 @@ def main():
     
     # Step 2: Run OCR preprocessing pipeline (unless skipped)
     if not args.skip_ocr:
-        ocr_success = run_ocr_analysis()
+        ocr_success = run_ocr_analysis(output_dir, args.ocr_max_in_flight, args.ocr_batch_size)
         
         if not ocr_success:
             print("⚠️ Warning: OCR analysis pipeline had errors")
@@ -16,11 +16,29 @@ from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 import hashlib
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import google.generativeai as genai
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field, field_validator
 
+# Add the current directory to Python path to import the cache backends
+sys.path.insert(0, str(Path(__file__).parent))
+from classification_cache import CACHE_BACKENDS, SQLiteClassificationCache, create_classification_cache
+from local_app_classifier import LocalAppClassifier
+from app_name_index import AppNameIndex, DEFAULT_NAME_MATCH_THRESHOLD, default_name_index_file
+
+# Batches are sized by estimated tokens: the app name in the prompt plus its JSON answer
+DEFAULT_MAX_BATCH_TOKENS = 2500
+DEFAULT_MAX_BATCH_SIZE = 40
+RESPONSE_TOKENS_PER_APP = 60
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token)"""
+    return len(text) // 4 + 1
+
 
 class GameClassification(BaseModel):
     """Pydantic model for individual app game classification"""
@@ -46,43 +64,41 @@ class AppGameClassifier:
     """Classifies apps as games using Gemini Flash 2.0 with API cost-saving caching"""
     
     def __init__(self, api_key: str, model_name: str = 'gemini-2.0-flash-exp', 
-                 cache_file: str = 'app_game_cache.json'):
-        """Initialize the classifier with API key and cache file"""
+                 cache_file: str = 'app_game_cache.json', cache_backend: str = 'sqlite',
+                 max_in_flight: int = 4, max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, local_rules: bool = True,
+                 name_match_threshold: Optional[float] = DEFAULT_NAME_MATCH_THRESHOLD):
+        """Initialize the classifier with API key and cache file (see classification_cache for backends)"""
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel(model_name)
         self.model_name = model_name
         self.cache_file = Path(cache_file)
-        self.cache = self._load_cache()
+        self.cache = create_classification_cache(cache_file, cache_backend)
+        
+        # app_game_cache.json is the tracked, shared cache; a SQLite cache migrated from it
+        # writes new classifications back after each enrichment (see sync_json_cache)
+        self.json_sync_file = None
+        if isinstance(self.cache, SQLiteClassificationCache) and self.cache_file.suffix.lower() == '.json':
+            self.json_sync_file = self.cache_file
+        self.json_sync_pending = False
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max(1, max_batch_size)
+        
+        # Variants of cached names (truncations, punctuation, near spellings) resolve to the
+        # cached entry; resolved variants are kept next to the cache file
+        self.name_index = None
+        if name_match_threshold is not None:
+            self.name_index = AppNameIndex(self.cache.keys(), threshold=name_match_threshold,
+                                           index_file=default_name_index_file(self.cache_file))
+        
+        # Offline first pass; only names it cannot resolve are sent to Gemini
+        self.local_classifier = LocalAppClassifier() if local_rules else None
         
         # Setup logging
         logging.basicConfig(level=logging.INFO, 
                           format='%(asctime)s - %(levelname)s - %(message)s')
     
-    def _load_cache(self) -> Dict[str, Dict[str, Any]]:
-        """Load existing cache from JSON file"""
-        if self.cache_file.exists():
-            try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-                logging.info(f"Loaded {len(cache_data)} cached classifications from {self.cache_file}")
-                return cache_data
-            except Exception as e:
-                logging.warning(f"Could not load cache file {self.cache_file}: {e}")
-                return {}
-        return {}
-    
-    def _save_cache(self) -> None:
-        """Save cache to JSON file"""
-        try:
-            # Ensure directory exists
-            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache, f, indent=2, ensure_ascii=False)
-            logging.info(f"Saved cache with {len(self.cache)} entries to {self.cache_file}")
-        except Exception as e:
-            logging.error(f"Could not save cache file {self.cache_file}: {e}")
-    
     def _normalize_app_name(self, app_name: str) -> str:
         """Normalize app name for consistent caching (lowercase, no extra spaces)"""
         return app_name.strip().lower()
@@ -118,105 +134,284 @@ CRITICAL:
 - Confidence must be an integer from 1 to 10
 """
 
-    def classify_apps_batch(self, app_names: List[str]) -> Dict[str, Dict[str, Any]]:
-        """Classify a batch of apps, using cache when possible"""
-        # Check cache first
+    def _lookup_cached(self, app_names: List[str]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """
+        Look up apps in the cache; returns (cached results, uncached app names).
+        
+        Names missing from the cache are canonicalized with the name index and looked up
+        again under the cached name they are a variant of.
+        """
         uncached_apps = []
         cached_results = {}
+        cache_keys = {app_name: self._normalize_app_name(app_name) for app_name in app_names}
+        cached = self.cache.get_many(cache_keys.values())
+        
+        if self.name_index:
+            canonical_keys = {}
+            for app_name, normalized_name in cache_keys.items():
+                if normalized_name not in cached:
+                    canonical_name = self.name_index.resolve(normalized_name)
+                    if canonical_name:
+                        canonical_keys[app_name] = canonical_name
+            if canonical_keys:
+                cached.update(self.cache.get_many(canonical_keys.values()))
+                cache_keys.update(canonical_keys)
+                logging.info(f"Matched {len(canonical_keys)} app name variants to cached apps")
         
         for app_name in app_names:
-            normalized_name = self._normalize_app_name(app_name)
-            if normalized_name in self.cache:
-                cached_results[app_name] = self.cache[normalized_name]
+            normalized_name = cache_keys[app_name]
+            if normalized_name in cached:
+                cached_results[app_name] = cached[normalized_name]
                 logging.debug(f"Using cached result for: {app_name}")
             else:
                 uncached_apps.append(app_name)
         
+        return cached_results, uncached_apps
+    
+    def _reusable_classifications(self, df: pd.DataFrame) -> Tuple[Dict[str, Tuple[str, int]], List[str]]:
+        """
+        Map apps classified in an earlier output through the cache.
+        
+        Returns (App -> (ProbGame, LLM_conf) for cached or locally resolved apps, apps to
+        classify again). Apps missing from both, such as failed classifications (never
+        cached), are classified again even though the CSV holds a value for them.
+        """
+        cached_results, uncached_apps = self._lookup_cached(list(existing_classifications(df)))
+        local_results, retry_apps = self._classify_locally(uncached_apps)
+        cached_results.update(local_results)
+        known = {app: ("Yes" if result['is_game'] else "No", result['confidence'])
+                 for app, result in cached_results.items()}
+        return known, retry_apps
+    
+    def _failed_classifications(self, app_names: List[str], error: Exception) -> Dict[str, Dict[str, Any]]:
+        """Default entries for apps whose classification failed (not cached)"""
+        return {
+            app_name: {
+                'is_game': False,
+                'confidence': 1,
+                'reasoning': f'Classification failed: {str(error)}',
+                'classification_timestamp': datetime.now().isoformat(),
+                'model_used': self.model_name
+            }
+            for app_name in app_names
+        }
+    
+    def _request_classifications(self, app_names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Classify apps with one Gemini call, without touching the cache. Raises on API errors"""
+        # Create prompt for batch classification
+        prompt = self._create_classification_prompt(app_names)
+        
+        # Generate response
+        response = self.model.generate_content(prompt)
+        response_text = response.text.strip()
+        
+        # Clean up response (remove markdown if present)
+        if response_text.startswith('```json'):
+            response_text = response_text.replace('```json', '').replace('```', '')
+        elif response_text.startswith('```'):
+            response_text = response_text.replace('```', '')
+        
+        response_text = response_text.strip()
+        
+        # Parse JSON response using Pydantic for validation
+        try:
+            result_data = json.loads(response_text)
+            # Validate with Pydantic
+            validated_response = GameClassificationResponse.model_validate(result_data)
+            classifications = validated_response.classifications
+        except Exception as parse_error:
+            logging.error(f"Failed to parse/validate response: {parse_error}")
+            logging.error(f"Raw response: {response_text[:500]}...")
+            
+            # Try to extract partial results
+            classifications = self._extract_partial_classifications(response_text, app_names)
+        
+        # Process results
+        results = {}
+        for classification in classifications:
+            # Handle both Pydantic objects and dict objects
+            if hasattr(classification, 'app_name'):
+                app_name = classification.app_name
+                is_game = classification.is_game
+                confidence = classification.confidence
+                reasoning = classification.reasoning
+            else:
+                app_name = classification['app_name']
+                is_game = classification['is_game'] 
+                confidence = classification['confidence']
+                reasoning = classification['reasoning']
+            
+            # Create result dictionary
+            results[app_name] = {
+                'is_game': is_game,
+                'confidence': confidence,
+                'reasoning': reasoning,
+                'classification_timestamp': datetime.now().isoformat(),
+                'model_used': self.model_name
+            }
+        
+        return results
+    
+    def _store_classifications(self, results: Dict[str, Dict[str, Any]]) -> None:
+        """Write classifications to the cache in one transaction"""
+        normalized = {self._normalize_app_name(app_name): result for app_name, result in results.items()}
+        self.cache.put_many(normalized.items())
+        self.cache.flush()
+        if normalized:
+            self.json_sync_pending = True
+        if self.name_index:
+            self.name_index.add_names(normalized)
+    
+    def sync_json_cache(self, force: bool = False) -> int:
+        """
+        Write the SQLite cache back to the JSON cache file it was migrated from.
+        
+        Only runs when new classifications were stored since the last sync, unless
+        force is set. Returns the number of exported entries (0 if skipped).
+        """
+        if not self.json_sync_file or not (self.json_sync_pending or force):
+            return 0
+        count = self.cache.export_json(self.json_sync_file)
+        self.json_sync_pending = False
+        logging.info(f"Exported {count} cached classifications to {self.json_sync_file}")
+        return count
+    
+    def _classify_locally(self, app_names: List[str]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """Run the local pre-classifier; returns (local results, apps that still need the LLM)"""
+        if not self.local_classifier or not app_names:
+            return {}, app_names
+        return self.local_classifier.classify(app_names, self._normalize_app_name)
+    
+    def classify_apps_batch(self, app_names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Classify a batch of apps, using cache when possible"""
+        # Check cache first, looking up the whole batch at once
+        cached_results, uncached_apps = self._lookup_cached(app_names)
+        
         if cached_results:
             logging.info(f"Found {len(cached_results)} apps in cache, need to classify {len(uncached_apps)}")
         
+        local_results, remaining_apps = self._classify_locally(uncached_apps)
+        if uncached_apps and not remaining_apps:
+            self.local_classifier.record_avoided_calls(1)
+        cached_results.update(local_results)
+        uncached_apps = remaining_apps
+        
         # Classify uncached apps
         new_results = {}
         if uncached_apps:
             logging.info(f"Calling Gemini API to classify {len(uncached_apps)} apps")
             
             try:
-                # Create prompt for batch classification
-                prompt = self._create_classification_prompt(uncached_apps)
-                
-                # Generate response
-                response = self.model.generate_content(prompt)
-                response_text = response.text.strip()
-                
-                # Clean up response (remove markdown if present)
-                if response_text.startswith('```json'):
-                    response_text = response_text.replace('```json', '').replace('```', '')
-                elif response_text.startswith('```'):
-                    response_text = response_text.replace('```', '')
-                
-                response_text = response_text.strip()
-                
-                # Parse JSON response using Pydantic for validation
-                try:
-                    result_data = json.loads(response_text)
-                    # Validate with Pydantic
-                    validated_response = GameClassificationResponse.model_validate(result_data)
-                    classifications = validated_response.classifications
-                except Exception as parse_error:
-                    logging.error(f"Failed to parse/validate response: {parse_error}")
-                    logging.error(f"Raw response: {response_text[:500]}...")
-                    
-                    # Try to extract partial results
-                    classifications = self._extract_partial_classifications(response_text, uncached_apps)
-                
-                # Process results and update cache
-                for classification in classifications:
-                    # Handle both Pydantic objects and dict objects
-                    if hasattr(classification, 'app_name'):
-                        app_name = classification.app_name
-                        is_game = classification.is_game
-                        confidence = classification.confidence
-                        reasoning = classification.reasoning
-                    else:
-                        app_name = classification['app_name']
-                        is_game = classification['is_game'] 
-                        confidence = classification['confidence']
-                        reasoning = classification['reasoning']
-                    
-                    normalized_name = self._normalize_app_name(app_name)
-                    
-                    # Create result dictionary
-                    result_data = {
-                        'is_game': is_game,
-                        'confidence': confidence,
-                        'reasoning': reasoning,
-                        'classification_timestamp': datetime.now().isoformat(),
-                        'model_used': self.model_name
-                    }
-                    
-                    # Add to results and cache
-                    new_results[app_name] = result_data
-                    self.cache[normalized_name] = result_data
-                
-                # Save updated cache
-                self._save_cache()
-                
+                new_results = self._request_classifications(uncached_apps)
+                self._store_classifications(new_results)
             except Exception as e:
                 logging.error(f"Error classifying apps: {e}")
                 # For failed classifications, create default entries
-                for app_name in uncached_apps:
-                    new_results[app_name] = {
-                        'is_game': False,
-                        'confidence': 1,
-                        'reasoning': f'Classification failed: {str(e)}',
-                        'classification_timestamp': datetime.now().isoformat(),
-                        'model_used': self.model_name
-                    }
+                new_results = self._failed_classifications(uncached_apps, e)
+        
+        if self.name_index:
+            self.name_index.save()
         
         # Combine cached and new results
         all_results = {**cached_results, **new_results}
         return all_results
     
+    def plan_classification_batches(self, app_names: List[str]) -> List[List[str]]:
+        """
+        Split apps into request batches sized by estimated tokens rather than a fixed count.
+        
+        Each app costs its name's prompt tokens plus the tokens of its JSON answer; a batch
+        is closed when it would exceed max_batch_tokens or max_batch_size apps.
+        """
+        batches = []
+        batch = []
+        batch_tokens = 0
+        
+        for app_name in app_names:
+            app_tokens = estimate_tokens(f"- {app_name}\n") + RESPONSE_TOKENS_PER_APP
+            if batch and (batch_tokens + app_tokens > self.max_batch_tokens or len(batch) >= self.max_batch_size):
+                batches.append(batch)
+                batch = []
+                batch_tokens = 0
+            batch.append(app_name)
+            batch_tokens += app_tokens
+        
+        if batch:
+            batches.append(batch)
+        return batches
+    
+    def classify_apps(self, app_names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Classify any number of apps: one cache lookup, then up to max_in_flight concurrent
+        Gemini batches. New classifications are written to the cache once all batches finish.
+        """
+        cached_results, uncached_apps = self._lookup_cached(app_names)
+        logging.info(f"Found {len(cached_results)} apps in cache, need to classify {len(uncached_apps)}")
+        
+        local_results, remaining_apps = self._classify_locally(uncached_apps)
+        if local_results:
+            avoided = len(self.plan_classification_batches(uncached_apps)) - len(self.plan_classification_batches(remaining_apps))
+            self.local_classifier.record_avoided_calls(avoided)
+            logging.info(f"Pre-classifier stats: {self.local_classifier.get_stats()}")
+        cached_results.update(local_results)
+        uncached_apps = remaining_apps
+        
+        if not uncached_apps:
+            if self.name_index:
+                self.name_index.save()
+            return cached_results
+        
+        # Near-duplicate new names (e.g. the same app from iOS OCR and ActivityWatch) are sent once
+        if self.name_index:
+            variant_groups = self.name_index.group_variants(uncached_apps)
+        else:
+            variant_groups = {app_name: [] for app_name in uncached_apps}
+        representatives = list(variant_groups)
+        if len(representatives) < len(uncached_apps):
+            logging.info(f"Collapsed {len(uncached_apps)} new app names into {len(representatives)} distinct apps")
+        
+        batches = self.plan_classification_batches(representatives)
+        logging.info(f"Calling Gemini API to classify {len(representatives)} apps in {len(batches)} batches "
+                     f"({self.max_in_flight} in flight)")
+        
+        def classify(batch):
+            try:
+                return self._request_classifications(batch), None
+            except Exception as e:
+                logging.error(f"Error classifying apps: {e}")
+                return None, e
+        
+        new_results = {}
+        classified = {}
+        start_time = time.time()
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            for batch_number, (batch, (results, error)) in enumerate(zip(batches, executor.map(classify, batches)), 1):
+                if error is None:
+                    classified.update(results)
+                    new_results.update(results)
+                else:
+                    # For failed classifications, create default entries
+                    new_results.update(self._failed_classifications(batch, error))
+                logging.info(f"Processed batch {batch_number}/{len(batches)} ({len(batch)} apps)")
+        
+        # Variants share their representative's classification
+        for representative, variants in variant_groups.items():
+            for variant in variants:
+                if representative in new_results:
+                    new_results[variant] = new_results[representative]
+                if representative in classified:
+                    self.name_index.add_alias(self._normalize_app_name(variant),
+                                              self._normalize_app_name(representative))
+        
+        # Merge all new classifications into the cache at once
+        if classified:
+            self._store_classifications(classified)
+        if self.name_index:
+            self.name_index.save()
+        logging.info(f"Classified {len(uncached_apps)} apps in {time.time() - start_time:.1f}s")
+        
+        return {**cached_results, **new_results}
+    
     def _extract_partial_classifications(self, response_text: str, app_names: List[str]) -> List[Dict[str, Any]]:
         """Try to extract partial classifications from malformed response"""
         classifications = []
@@ -281,7 +476,7 @@ CRITICAL:
         return 'ios'
 
     def enrich_csv_with_game_classification(self, csv_path: str, output_path: Optional[str] = None, 
-                                          force_format: Optional[str] = None) -> str:
+                                          force_format: Optional[str] = None, incremental: bool = True) -> str:
         """
         Enrich CSV file with ProbGame and LLM_conf columns
         Supports both iOS and ActivityWatch CSV formats
@@ -290,6 +485,9 @@ CRITICAL:
             csv_path: Path to input CSV file
             output_path: Path for output CSV (if None, adds '_enriched' to input filename)
             force_format: Force specific format ('ios' or 'activitywatch'), or None for auto-detection
+            incremental: Keep classifications already in the input or in an existing output CSV
+                for apps found in the cache and only classify the other rows; if the input
+                extends the existing output row for row, only the new rows are appended to it
             
         Returns:
             Path to the enriched CSV file
@@ -310,67 +508,116 @@ CRITICAL:
         if 'App' not in df.columns:
             raise ValueError("CSV must contain an 'App' column")
         
+        # Determine output path
+        explicit_output = output_path is not None
+        if output_path is None:
+            input_path = Path(csv_path)
+            if csv_format == 'activitywatch':
+                # For ActivityWatch, save in same location but with enriched suffix
+                output_path = input_path.parent / f"{input_path.stem}_enriched{input_path.suffix}"
+            else:
+                # For iOS, maintain existing behavior
+                output_path = input_path.parent / f"{input_path.stem}_enriched{input_path.suffix}"
+        
+        # Rows to classify; in incremental mode, App -> (ProbGame, LLM_conf) already known
+        rows_to_enrich = pd.Series(True, index=df.index)
+        known_classifications = {}
+        previous = None
+        
         # Check if already enriched
         if 'ProbGame' in df.columns and 'LLM_conf' in df.columns:
             logging.info("CSV already contains ProbGame and LLM_conf columns")
             
             # Check if we need to process any new apps
-            existing_classifications = df[['App', 'ProbGame', 'LLM_conf']].drop_duplicates()
-            apps_with_missing_classification = df[
+            missing_classification = (
                 (df['ProbGame'].isna()) | (df['LLM_conf'].isna()) | 
                 (df['ProbGame'] == '') | (df['LLM_conf'] == '')
-            ]['App'].unique().tolist()
+            )
             
-            if not apps_with_missing_classification:
+            if incremental:
+                known_classifications, retry_apps = self._reusable_classifications(df[~missing_classification])
+                missing_classification |= df['App'].isin(retry_apps)
+            
+            if not missing_classification.any():
                 logging.info("All apps already classified, skipping API calls")
-                if output_path:
+                self.sync_json_cache()
+                if explicit_output:
                     df.to_csv(output_path, index=False)
                     return str(output_path)
                 else:
                     return csv_path
+            
+            if incremental:
+                rows_to_enrich = missing_classification
+                logging.info(f"Incremental mode: {int(missing_classification.sum())} rows need classification")
+        elif incremental and Path(output_path).exists() and Path(output_path).resolve() != Path(csv_path).resolve():
+            # A previous run's output: reuse its classifications, and append if the input only grew
+            previous = pd.read_csv(output_path)
+            if {'App', 'ProbGame', 'LLM_conf'} <= set(previous.columns):
+                known_classifications, retry_apps = self._reusable_classifications(previous)
+                if retry_apps:
+                    # Rows already in the output hold defaults for these apps, so rewrite it
+                    previous = None
+                    logging.info(f"Incremental mode: reclassifying {len(retry_apps)} apps missing from the cache, "
+                                 f"rewriting {output_path}")
+                elif starts_with_rows(df, previous):
+                    rows_to_enrich = pd.Series(df.index >= len(previous), index=df.index)
+                    logging.info(f"Incremental mode: {output_path} already covers the first {len(previous)} rows, "
+                                 f"{len(df) - len(previous)} new rows")
+                else:
+                    previous = None
+                    logging.info(f"Incremental mode: reusing {len(known_classifications)} app classifications "
+                                 f"from {output_path}")
+            else:
+                previous = None
         
         # Get unique apps
-        unique_apps = df['App'].unique().tolist()
-        # Remove any NaN values
-        unique_apps = [app for app in unique_apps if pd.notna(app)]
+        unique_apps = df.loc[rows_to_enrich, 'App'].unique().tolist()
+        # Remove any NaN values and apps classified in earlier runs
+        unique_apps = [app for app in unique_apps if pd.notna(app) and app not in known_classifications]
         
         logging.info(f"Found {len(unique_apps)} unique apps to classify")
         
-        # Classify apps in batches (Gemini can handle multiple apps at once)
-        batch_size = 20  # Process in batches to avoid token limits
-        all_classifications = {}
-        
-        for i in range(0, len(unique_apps), batch_size):
-            batch = unique_apps[i:i + batch_size]
-            batch_results = self.classify_apps_batch(batch)
-            all_classifications.update(batch_results)
-            logging.info(f"Processed batch {i//batch_size + 1}/{(len(unique_apps) + batch_size - 1)//batch_size}")
+        # Classify apps in concurrent token-sized batches (Gemini can handle multiple apps at once)
+        all_classifications = self.classify_apps(unique_apps) if unique_apps else {}
         
         # Create mapping for ProbGame and LLM_conf
-        game_mapping = {}
-        conf_mapping = {}
+        game_mapping = {app: prob_game for app, (prob_game, _) in known_classifications.items()}
+        conf_mapping = {app: confidence for app, (_, confidence) in known_classifications.items()}
         
         for app, classification in all_classifications.items():
             game_mapping[app] = "Yes" if classification['is_game'] else "No"
             conf_mapping[app] = classification['confidence']
         
-        # Add columns to dataframe (or update existing ones)
-        df['ProbGame'] = df['App'].map(game_mapping).fillna("No")
-        df['LLM_conf'] = df['App'].map(conf_mapping).fillna(1)
-        
-        # Determine output path
-        if output_path is None:
-            input_path = Path(csv_path)
-            if csv_format == 'activitywatch':
-                # For ActivityWatch, save in same location but with enriched suffix
-                output_path = input_path.parent / f"{input_path.stem}_enriched{input_path.suffix}"
-            else:
-                # For iOS, maintain existing behavior
-                output_path = input_path.parent / f"{input_path.stem}_enriched{input_path.suffix}"
+        # Add columns to dataframe (or update the rows being enriched)
+        if rows_to_enrich.all():
+            df['ProbGame'] = df['App'].map(game_mapping).fillna("No")
+            df['LLM_conf'] = df['App'].map(conf_mapping).fillna(1)
+        else:
+            apps = df.loc[rows_to_enrich, 'App']
+            if 'ProbGame' not in df.columns:
+                df['ProbGame'] = None
+                df['LLM_conf'] = None
+            df.loc[rows_to_enrich, 'ProbGame'] = apps.map(game_mapping).fillna("No")
+            # Empty cells are read as NaN, making confidences floats; they are integers 1-10
+            df['LLM_conf'] = df['LLM_conf'].astype(object)
+            df.loc[rows_to_enrich, 'LLM_conf'] = apps.map(conf_mapping).fillna(1).astype(int)
+            if df['LLM_conf'].notna().all():
+                df['LLM_conf'] = df['LLM_conf'].astype(int)
+        
+        self.sync_json_cache()
         
         # Save enriched CSV
-        df.to_csv(output_path, index=False)
-        logging.info(f"Saved enriched CSV with {len(df)} rows to {output_path}")
+        if previous is not None:
+            # The output already holds the earlier rows; append only the new ones
+            new_rows = df.loc[rows_to_enrich, previous.columns]
+            if len(new_rows):
+                new_rows.to_csv(output_path, mode='a', header=False, index=False)
+            logging.info(f"Appended {len(new_rows)} rows to enriched CSV {output_path}")
+            df = pd.concat([previous, new_rows], ignore_index=True)
+        else:
+            df.to_csv(output_path, index=False)
+            logging.info(f"Saved enriched CSV with {len(df)} rows to {output_path}")
         
         # Print summary statistics
         game_counts = df['ProbGame'].value_counts()
@@ -387,6 +634,24 @@ CRITICAL:
         return str(output_path)
 
 
+def existing_classifications(df: pd.DataFrame) -> Dict[str, Tuple[Any, Any]]:
+    """Return App -> (ProbGame, LLM_conf) from rows that already have both"""
+    classified = df.dropna(subset=['App', 'ProbGame', 'LLM_conf'])
+    classified = classified[(classified['ProbGame'] != '') & (classified['LLM_conf'] != '')]
+    classified = classified.drop_duplicates('App')
+    return {app: (prob_game, confidence) for app, prob_game, confidence in
+            zip(classified['App'], classified['ProbGame'], classified['LLM_conf'])}
+
+
+def starts_with_rows(df: pd.DataFrame, enriched: pd.DataFrame) -> bool:
+    """Return whether df begins with exactly the rows of a previously enriched copy of it"""
+    if set(enriched.columns) != set(df.columns) | {'ProbGame', 'LLM_conf'} or len(enriched) > len(df):
+        return False
+    columns = list(df.columns)
+    head = df.iloc[:len(enriched)][columns].astype(str).reset_index(drop=True)
+    return head.equals(enriched[columns].astype(str).reset_index(drop=True))
+
+
 def load_environment_variables():
     """Load environment variables from .env file"""
     # Load from credentials/.env file
@@ -424,6 +689,55 @@ def main():
         help='Path to cache file for storing previous classifications'
     )
     
+    parser.add_argument(
+        '--cache-backend',
+        choices=CACHE_BACKENDS,
+        default='sqlite',
+        help='Cache storage: sqlite (stored next to a .json cache file and migrated from it) '
+             'or json (rewrites the whole file) (default: sqlite)'
+    )
+    
+    parser.add_argument(
+        '--max-in-flight',
+        type=int,
+        default=4,
+        help='Maximum number of concurrent classification requests (default: 4)'
+    )
+    
+    parser.add_argument(
+        '--max-batch-tokens',
+        type=int,
+        default=DEFAULT_MAX_BATCH_TOKENS,
+        help=f'Estimated token budget per classification request (default: {DEFAULT_MAX_BATCH_TOKENS})'
+    )
+    
+    parser.add_argument(
+        '--no-local-rules',
+        action='store_true',
+        help='Send every uncached app to Gemini instead of resolving obvious ones locally first'
+    )
+    
+    parser.add_argument(
+        '--name-match-threshold',
+        type=float,
+        default=DEFAULT_NAME_MATCH_THRESHOLD,
+        help='Trigram similarity at which an app name counts as a variant of a cached name '
+             f'(default: {DEFAULT_NAME_MATCH_THRESHOLD}; 1 only merges identical canonical forms)'
+    )
+    
+    parser.add_argument(
+        '--full-refresh',
+        action='store_true',
+        help='Reclassify every row instead of keeping classifications from the input or an existing output CSV'
+    )
+    
+    parser.add_argument(
+        '--export-json-cache',
+        action='store_true',
+        help='After enrichment, write the whole SQLite cache back to the JSON cache file even if '
+             'no new classifications were made (new ones are always written back)'
+    )
+    
     parser.add_argument(
         '--model',
         default='gemini-2.0-flash-exp',
@@ -457,7 +771,12 @@ def main():
         classifier = AppGameClassifier(
             api_key=api_key,
             model_name=args.model,
-            cache_file=args.cache_file
+            cache_file=args.cache_file,
+            cache_backend=args.cache_backend,
+            max_in_flight=args.max_in_flight,
+            max_batch_tokens=args.max_batch_tokens,
+            local_rules=not args.no_local_rules,
+            name_match_threshold=args.name_match_threshold
         )
         
         # Process CSV with format specification
@@ -465,10 +784,17 @@ def main():
         output_path = classifier.enrich_csv_with_game_classification(
             csv_path=args.csv_path,
             output_path=args.output,
-            force_format=force_format
+            force_format=force_format,
+            incremental=not args.full_refresh
         )
         
         print(f"Successfully enriched CSV. Output saved to: {output_path}")
+        
+        if args.export_json_cache and isinstance(classifier.cache, SQLiteClassificationCache):
+            if classifier.json_sync_file is None:
+                classifier.json_sync_file = Path(args.cache_file).with_suffix('.json')
+            count = classifier.sync_json_cache(force=True)
+            print(f"Exported {count} cached classifications to: {classifier.json_sync_file}")
         return 0
         
     except Exception as e:
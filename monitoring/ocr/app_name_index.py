@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Fuzzy canonicalization index for app names
+
+Maps variants of an app name to the name already in the classification cache,
+so the same app seen as "The Office: Somehow We Mana..." in an iOS screenshot
+and "The Office: Somehow We Manage" in aw_app_usage.csv is classified once.
+
+Names are reduced to a canonical form (lowercase, accents and punctuation
+removed, "&" spelled "and", ".exe" and "www." dropped). Two names match when
+their forms are equal, when one is a truncation ("...") of exactly one other,
+or when the Dice similarity of their character trigrams reaches the threshold.
+Resolved variants are persisted next to the cache so later runs skip the
+search.
+"""
+
+import os
+import re
+import json
+import logging
+import threading
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+NAME_INDEX_VERSION = 1
+
+DEFAULT_NAME_MATCH_THRESHOLD = 0.85
+
+TRUNCATION_MARKERS = ('...', '…')
+MIN_TRUNCATED_PREFIX = 8
+
+
+def canonical_form(name: str) -> str:
+    """Reduce an app name to the form compared by the index"""
+    form = unicodedata.normalize('NFKD', name.strip().lower())
+    form = ''.join(char for char in form if not unicodedata.combining(char))
+    for marker in TRUNCATION_MARKERS:
+        if form.endswith(marker):
+            form = form[:-len(marker)]
+    if form.endswith('.exe'):
+        form = form[:-len('.exe')]
+    if form.startswith('www.'):
+        form = form[len('www.'):]
+    form = re.sub(r'[^\w]+', ' ', form.replace('&', ' and '))
+    return ' '.join(form.split())
+
+
+def is_truncated(name: str) -> bool:
+    return name.rstrip().endswith(TRUNCATION_MARKERS)
+
+
+def trigrams(form: str) -> Counter:
+    padded = f"  {form} "
+    return Counter(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def dice_similarity(a: Counter, b: Counter) -> float:
+    total = sum(a.values()) + sum(b.values())
+    return 2 * sum((a & b).values()) / total if total else 0.0
+
+
+def default_name_index_file(cache_file: Path) -> Path:
+    """app_game_cache.json -> app_game_cache_name_index.json"""
+    return cache_file.with_name(f"{cache_file.stem}_name_index.json")
+
+
+class AppNameIndex:
+    """Trigram index over canonical names of cached apps"""
+
+    def __init__(self, names: Iterable[str] = (), threshold: float = DEFAULT_NAME_MATCH_THRESHOLD,
+                 index_file: Optional[Path] = None):
+        """Index names; with index_file, previously resolved variants are loaded and saved there"""
+        self.threshold = threshold
+        self.index_file = Path(index_file) if index_file else None
+        self.lock = threading.Lock()
+        self.names_by_form = {}
+        self.grams_by_form = {}
+        self.forms_by_gram = {}
+        self.truncated_forms = set()
+        self.aliases = {}
+        self.dirty = False
+
+        if self.index_file and self.index_file.exists():
+            self._load()
+        self.add_names(names)
+
+    def _load(self):
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"Could not read app name index {self.index_file}: {e}")
+            return
+
+        # Aliases found with another threshold may not hold for this one
+        if data.get('version') == NAME_INDEX_VERSION and data.get('threshold') == self.threshold:
+            self.aliases = data.get('aliases', {})
+            logging.info(f"Loaded {len(self.aliases)} app name aliases from {self.index_file}")
+
+    def save(self) -> None:
+        """Persist resolved aliases if an index file was configured and they changed"""
+        with self.lock:
+            if not self.index_file or not self.dirty:
+                return
+            data = {'version': NAME_INDEX_VERSION, 'threshold': self.threshold, 'aliases': self.aliases}
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.index_file.with_suffix(self.index_file.suffix + '.tmp')
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False, sort_keys=True)
+            os.replace(temp_file, self.index_file)
+            self.dirty = False
+
+    def add_names(self, names: Iterable[str]) -> None:
+        """Index names (as stored in the cache); the first name seen for a form stays canonical"""
+        with self.lock:
+            for name in names:
+                form = canonical_form(name)
+                if not form or form in self.names_by_form:
+                    continue
+                self.names_by_form[form] = name
+                grams = trigrams(form)
+                self.grams_by_form[form] = grams
+                for gram in grams:
+                    self.forms_by_gram.setdefault(gram, set()).add(form)
+                if is_truncated(name):
+                    self.truncated_forms.add(form)
+
+    def __len__(self) -> int:
+        return len(self.names_by_form)
+
+    def _truncation_match(self, form: str, truncated: bool, candidates: Iterable[str]) -> Optional[str]:
+        """Match a truncated name to its unique completion, or a full name to a unique truncated entry"""
+        if len(form) < MIN_TRUNCATED_PREFIX:
+            return None
+        if truncated:
+            completions = [candidate for candidate in candidates if candidate.startswith(form)]
+        else:
+            completions = [candidate for candidate in candidates
+                           if candidate in self.truncated_forms and form.startswith(candidate)
+                           and len(candidate) >= MIN_TRUNCATED_PREFIX]
+        return completions[0] if len(completions) == 1 else None
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Return the indexed name that name is a variant of, or None"""
+        with self.lock:
+            if name in self.aliases:
+                return self.aliases[name]
+
+            form = canonical_form(name)
+            if not form:
+                return None
+
+            match = self.names_by_form.get(form)
+            if match is None:
+                grams = trigrams(form)
+                shared = Counter()
+                for gram in grams:
+                    for candidate in self.forms_by_gram.get(gram, ()):
+                        shared[candidate] += 1
+
+                match_form = self._truncation_match(form, is_truncated(name), shared)
+                if match_form is None:
+                    best_score = 0.0
+                    for candidate, _ in shared.most_common():
+                        score = dice_similarity(grams, self.grams_by_form[candidate])
+                        if score > best_score:
+                            best_score, match_form = score, candidate
+                    if best_score < self.threshold:
+                        match_form = None
+                if match_form is None:
+                    return None
+                match = self.names_by_form[match_form]
+
+            if match != name:
+                self.aliases[name] = match
+                self.dirty = True
+            return match
+
+    def add_alias(self, name: str, canonical_name: str) -> None:
+        """Record that name is a variant of the indexed canonical_name"""
+        with self.lock:
+            if name != canonical_name and self.aliases.get(name) != canonical_name:
+                self.aliases[name] = canonical_name
+                self.dirty = True
+
+    def group_variants(self, names: List[str]) -> Dict[str, List[str]]:
+        """Group names that are variants of each other; returns {representative: [variants]}"""
+        local_index = AppNameIndex(threshold=self.threshold)
+        groups = {}
+        for name in names:
+            representative = local_index.resolve(name)
+            if representative is None:
+                local_index.add_names([name])
+                groups[name] = []
+            else:
+                groups[representative].append(name)
+        return groups
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark screenshot pre-processing for Gemini OCR.
+
+For each sample screenshot, compares the original image against the
+pre-processed one (grayscale, status bar crop, downsample, re-encode):
+payload size, Gemini latency and extraction accuracy. Accuracy is measured
+against the existing <stem>_analysis.json next to each image when present,
+otherwise against the analysis of the original image.
+
+Usage: python benchmark_preprocessing.py [--images-dir downloads/ios] [--limit 10] [--sizes-only]
+"""
+
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add the current directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+from image_preprocessor import ImagePreprocessor, DEFAULT_PREPROCESS_MAX_DIMENSION, DEFAULT_CROP_TOP_FRACTION
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg'}
+
+
+def find_sample_images(images_dir: Path, limit: Optional[int]) -> List[Path]:
+    """Return sample screenshots under images_dir, sorted for a stable order."""
+    images = sorted(p for p in images_dir.rglob('*') if p.suffix.lower() in IMAGE_EXTENSIONS)
+    return images[:limit] if limit else images
+
+
+def load_reference(image_path: Path) -> Optional[Dict]:
+    """Load the existing analysis JSON for an image, if any."""
+    json_path = image_path.parent / f"{image_path.stem}_analysis.json"
+    if not json_path.exists():
+        return None
+    with open(json_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_results(result: Optional[Dict], reference: Dict) -> Dict[str, float]:
+    """
+    Score a result against a reference analysis.
+
+    Returns app-name F1 (case-insensitive), the fraction of matched apps with
+    identical minutes, and whether the screenshot date matches.
+    """
+    if not result:
+        return {'app_f1': 0.0, 'minutes_match': 0.0, 'date_match': 0.0}
+
+    def apps_by_name(analysis):
+        return {app.get('app_name', '').strip().lower(): app.get('time_spent_minutes')
+                for app in analysis.get('apps', [])}
+
+    found = apps_by_name(result)
+    expected = apps_by_name(reference)
+    matched = set(found) & set(expected)
+
+    precision = len(matched) / len(found) if found else 0.0
+    recall = len(matched) / len(expected) if expected else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    minutes_match = (sum(1 for name in matched if found[name] == expected[name]) / len(matched)
+                     if matched else 0.0)
+    date_match = float(result.get('date_of_screenshot') == reference.get('date_of_screenshot'))
+
+    return {'app_f1': f1, 'minutes_match': minutes_match, 'date_match': date_match}
+
+
+def timed_analysis(analyzer, image_path: Path):
+    """Run one analysis and return (seconds, result)."""
+    start = time.perf_counter()
+    result = analyzer.analyze_screenshot(str(image_path))
+    return time.perf_counter() - start, result
+
+
+def summarize(label: str, latencies: List[float], scores: List[Dict[str, float]]):
+    print(f"{label}:")
+    if latencies:
+        print(f"  latency: mean {statistics.mean(latencies):.2f}s, median {statistics.median(latencies):.2f}s")
+    if scores:
+        for metric in ('app_f1', 'minutes_match', 'date_match'):
+            print(f"  {metric}: {statistics.mean(s[metric] for s in scores):.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark screenshot pre-processing for Gemini OCR')
+    parser.add_argument('--images-dir', default='downloads/ios',
+                        help='Directory searched recursively for sample screenshots (default: downloads/ios)')
+    parser.add_argument('--limit', type=int, help='Maximum number of images to benchmark')
+    parser.add_argument('--model', default='gemini-2.0-flash', help='Gemini model (default: gemini-2.0-flash)')
+    parser.add_argument('--max-dimension', type=int, default=DEFAULT_PREPROCESS_MAX_DIMENSION,
+                        help=f'Pre-processing max dimension (default: {DEFAULT_PREPROCESS_MAX_DIMENSION})')
+    parser.add_argument('--crop-top', type=float, default=DEFAULT_CROP_TOP_FRACTION,
+                        help=f'Fraction of height cropped from the top (default: {DEFAULT_CROP_TOP_FRACTION})')
+    parser.add_argument('--sizes-only', action='store_true',
+                        help='Only measure payload sizes and pre-processing time (no API calls)')
+    args = parser.parse_args()
+
+    images = find_sample_images(Path(args.images_dir), args.limit)
+    if not images:
+        print(f"✗ No sample images found in {args.images_dir}")
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        preprocessor = ImagePreprocessor(crop_top_fraction=args.crop_top, max_dimension=args.max_dimension,
+                                         cache_dir=Path(cache_dir))
+
+        print(f"Benchmarking {len(images)} images with pre-processing '{preprocessor.config_id}'")
+
+        original_bytes = 0
+        processed_bytes = 0
+        preprocess_times = []
+        for image_path in images:
+            data = image_path.read_bytes()
+            start = time.perf_counter()
+            processed = preprocessor.process_bytes(data)
+            preprocess_times.append(time.perf_counter() - start)
+            original_bytes += len(data)
+            processed_bytes += len(processed)
+
+        print(f"Payload: {original_bytes:,} -> {processed_bytes:,} bytes "
+              f"({processed_bytes / original_bytes * 100:.1f}% of original)")
+        print(f"Pre-processing time: mean {statistics.mean(preprocess_times) * 1000:.1f}ms per image")
+
+        if args.sizes_only:
+            return
+
+        from gemini_screenshot_analyzer import GeminiScreenshotAnalyzer, load_environment_variables
+
+        api_key = load_environment_variables()
+        baseline = GeminiScreenshotAnalyzer(api_key, args.model)
+        candidate = GeminiScreenshotAnalyzer(api_key, args.model, preprocessor=preprocessor)
+
+        baseline_latencies, candidate_latencies = [], []
+        baseline_scores, candidate_scores = [], []
+
+        for image_path in images:
+            baseline_time, baseline_result = timed_analysis(baseline, image_path)
+            candidate_time, candidate_result = timed_analysis(candidate, image_path)
+            baseline_latencies.append(baseline_time)
+            candidate_latencies.append(candidate_time)
+
+            reference = load_reference(image_path) or baseline_result
+            if reference:
+                baseline_scores.append(compare_results(baseline_result, reference))
+                candidate_scores.append(compare_results(candidate_result, reference))
+
+            print(f"  {image_path.name}: original {baseline_time:.2f}s, pre-processed {candidate_time:.2f}s")
+
+        summarize("Original images", baseline_latencies, baseline_scores)
+        summarize("Pre-processed images", candidate_latencies, candidate_scores)
+
+
+if __name__ == "__main__":
+    main()
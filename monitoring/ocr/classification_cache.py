@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Storage backends for the app-game classification cache
+
+Classifications are keyed by normalized app name. Backends support bulk
+lookup and single-row inserts:
+
+- SQLiteClassificationCache: one row per app, inserted as classifications
+  arrive; nothing is rewritten. On first use it imports the existing JSON
+  cache, and it re-imports new JSON entries whenever the JSON file changes
+  (e.g. after pulling an updated app_game_cache.json).
+- JSONClassificationCache: the original format, the whole file rewritten on
+  flush().
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+CACHE_BACKENDS = ('sqlite', 'json')
+SQLITE_SUFFIXES = ('.sqlite', '.sqlite3', '.db')
+
+# Keep bulk lookups below SQLite's bound-parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+
+class ClassificationCache(ABC):
+    """Interface of a classification cache backend"""
+
+    @abstractmethod
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Return the cached classifications for the keys that are present"""
+
+    @abstractmethod
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Insert or replace one classification"""
+
+    def put_many(self, items: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        """Insert or replace several classifications"""
+        for key, value in items:
+            self.put(key, value)
+
+    @abstractmethod
+    def keys(self) -> List[str]:
+        """Return all cached keys"""
+
+    def flush(self) -> None:
+        """Persist pending writes"""
+
+    def close(self) -> None:
+        self.flush()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.get_many([key]).get(key)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+
+class JSONClassificationCache(ClassificationCache):
+    """Whole-file JSON cache (the original app_game_cache.json format)"""
+
+    def __init__(self, cache_file: Path):
+        self.cache_file = Path(cache_file)
+        self.data = load_json_cache(self.cache_file)
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            return {key: self.data[key] for key in keys if key in self.data}
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        with self.lock:
+            self.data[key] = value
+            self.dirty = True
+
+    def keys(self) -> List[str]:
+        with self.lock:
+            return list(self.data)
+
+    def flush(self) -> None:
+        with self.lock:
+            if not self.dirty:
+                return
+            try:
+                self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.cache_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.data, f, indent=2, ensure_ascii=False)
+                self.dirty = False
+                logging.info(f"Saved cache with {len(self.data)} entries to {self.cache_file}")
+            except Exception as e:
+                logging.error(f"Could not save cache file {self.cache_file}: {e}")
+
+
+class SQLiteClassificationCache(ClassificationCache):
+    """SQLite cache with one row per normalized app name"""
+
+    def __init__(self, db_file: Path, json_file: Optional[Path] = None):
+        """Open (or create) db_file, importing entries from json_file when it is new or changed"""
+        self.db_file = Path(db_file)
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+
+        # The pipeline classifies on a worker thread and enriches on the main thread
+        self.connection = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS classifications (app_key TEXT PRIMARY KEY, data TEXT NOT NULL)'
+            )
+            self.connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+
+        if json_file:
+            self.import_json(Path(json_file))
+
+        logging.info(f"Using SQLite classification cache {self.db_file} with {len(self)} entries")
+
+    def import_json(self, json_file: Path) -> int:
+        """Import entries missing from the database; skipped if the JSON file is unchanged since the last import"""
+        if not json_file.exists():
+            return 0
+
+        mtime = str(os.stat(json_file).st_mtime_ns)
+        meta_key = f"json_import_mtime:{json_file.resolve()}"
+        with self.lock:
+            row = self.connection.execute('SELECT value FROM meta WHERE key = ?', (meta_key,)).fetchone()
+        if row and row[0] == mtime:
+            return 0
+
+        data = load_json_cache(json_file)
+        with self.lock, self.connection:
+            before = self.connection.total_changes
+            # Entries already in the database are newer than the JSON file, so they win
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO classifications (app_key, data) VALUES (?, ?)',
+                ((key, json.dumps(value, ensure_ascii=False)) for key, value in data.items())
+            )
+            imported = self.connection.total_changes - before
+            self.connection.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (meta_key, mtime))
+
+        if imported:
+            logging.info(f"Migrated {imported} classifications from {json_file} to {self.db_file}")
+        return imported
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        keys = list(dict.fromkeys(keys))
+        results = {}
+        with self.lock:
+            for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+                chunk = keys[start:start + LOOKUP_CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self.connection.execute(
+                    f'SELECT app_key, data FROM classifications WHERE app_key IN ({placeholders})', chunk
+                )
+                results.update((key, json.loads(data)) for key, data in rows)
+        return results
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        self.put_many([(key, value)])
+
+    def put_many(self, items: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO classifications (app_key, data) VALUES (?, ?)',
+                ((key, json.dumps(value, ensure_ascii=False)) for key, value in items)
+            )
+
+    def keys(self) -> List[str]:
+        with self.lock:
+            return [row[0] for row in self.connection.execute('SELECT app_key FROM classifications')]
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM classifications').fetchone()[0]
+
+    def export_json(self, json_file: Path) -> int:
+        """Write all classifications in the app_game_cache.json format; returns the entry count"""
+        with self.lock:
+            data = {key: json.loads(value) for key, value in
+                    self.connection.execute('SELECT app_key, data FROM classifications ORDER BY rowid')}
+        json_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+        # The exported file holds nothing the database lacks, so don't re-import it
+        with self.lock, self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                                    (f"json_import_mtime:{json_file.resolve()}", str(os.stat(json_file).st_mtime_ns)))
+        return len(data)
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+
+def load_json_cache(cache_file: Path) -> Dict[str, Dict[str, Any]]:
+    """Load an app_game_cache.json file, returning {} if it is missing or unreadable"""
+    if cache_file.exists():
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cache_data = json.load(f)
+            logging.info(f"Loaded {len(cache_data)} cached classifications from {cache_file}")
+            return cache_data
+        except Exception as e:
+            logging.warning(f"Could not load cache file {cache_file}: {e}")
+    return {}
+
+
+def create_classification_cache(cache_file: str, backend: str = 'sqlite') -> ClassificationCache:
+    """
+    Open the classification cache for cache_file with the given backend.
+
+    For 'sqlite' with a .json cache_file, the database is stored next to it with a
+    .sqlite suffix and the JSON file is migrated into it.
+    """
+    cache_path = Path(cache_file)
+
+    if backend == 'json':
+        return JSONClassificationCache(cache_path)
+
+    if backend == 'sqlite':
+        if cache_path.suffix.lower() in SQLITE_SUFFIXES:
+            return SQLiteClassificationCache(cache_path)
+        return SQLiteClassificationCache(cache_path.with_suffix('.sqlite'), json_file=cache_path)
+
+    raise ValueError(f"Unknown cache backend '{backend}'. Choose from: {', '.join(CACHE_BACKENDS)}")
@@ -14,14 +14,50 @@ import logging
 import warnings
 import re
 import time
+import copy
+import random
+import hashlib
+import threading
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Tuple
+import io
 import base64
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 from dotenv import load_dotenv
 
+from image_preprocessor import ImagePreprocessor, DEFAULT_PREPROCESS_MAX_DIMENSION
+from screenshot_index import ScreenshotIndex
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+
+# Bump whenever create_analysis_prompt() changes so cached results are not reused
+PROMPT_VERSION = '1'
+
+DEFAULT_CACHE_FILE = Path(__file__).parent.parent.parent / '.tmp' / 'ocr_result_cache.jsonl'
+
+# Images are sent inline in the generate request unless the (downscaled) payload
+# exceeds this size; larger images fall back to the File API upload. In batched
+# requests the limit applies to the inline images of the request combined
+DEFAULT_INLINE_SIZE_LIMIT_BYTES = 15 * 1024 * 1024
+DEFAULT_INLINE_MAX_DIMENSION = 2048
+
+# Formats Gemini accepts inline; anything else is re-encoded as PNG
+INLINE_MIME_TYPES = {
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.webp': 'image/webp'
+}
+
 
 class ScreenshotAnalysisError(Exception):
     """Raised when critical analysis errors occur"""
@@ -33,20 +69,223 @@ class ScreenshotAnalysisWarning(UserWarning):
     pass
 
 
+class TokenBucketLimiter:
+    """Thread-safe token bucket limiting requests per minute across analysis workers"""
+    
+    def __init__(self, requests_per_minute: float, burst: int = 1):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until a request token is available"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                
+                wait_time = (1 - self.tokens) / self.rate
+            
+            time.sleep(wait_time)
+
+
+def is_quota_error(error: Exception) -> bool:
+    """Return True if an API error means the request was rate limited / over quota"""
+    if isinstance(error, (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)):
+        return True
+    
+    message = str(error).lower()
+    return '429' in message or 'quota' in message or 'resource has been exhausted' in message
+
+
+class OCRResultCache:
+    """
+    Content-addressed cache of analysis results stored in an append-only JSON-lines log.
+    
+    Entries are keyed by model name, prompt version and the SHA-256 of the image
+    bytes, so renamed or re-downloaded copies of a screenshot are never re-sent.
+    Each put() appends one line; later lines for the same key win on load. A
+    legacy single-JSON index next to the log is imported the first time.
+    """
+    
+    def __init__(self, index_file: Path = DEFAULT_CACHE_FILE):
+        self.index_file = Path(index_file)
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.entries = {}
+        # Set when an interrupted run left a partial last line, so the next append starts a new line
+        self.needs_newline = False
+        
+        if self.index_file.exists():
+            self._load_log()
+        else:
+            self._import_legacy_index(self.index_file.with_suffix('.json'))
+    
+    def _load_log(self):
+        skipped = 0
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self.needs_newline = not line.endswith('\n')
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                        self.entries[record['key']] = record['result']
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        # e.g. a line truncated by an interrupted run
+                        skipped += 1
+        except OSError as e:
+            logging.warning(f"Could not read OCR cache {self.index_file}: {e}. Starting with an empty cache")
+            return
+        
+        if skipped:
+            logging.warning(f"Skipped {skipped} unreadable lines in OCR cache {self.index_file}")
+        logging.info(f"Loaded {len(self.entries)} cached OCR results from {self.index_file}")
+    
+    def _import_legacy_index(self, legacy_file: Path):
+        if legacy_file == self.index_file or not legacy_file.exists():
+            return
+        try:
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"Could not read legacy OCR cache {legacy_file}: {e}")
+            return
+        
+        self.entries = entries
+        self._append_lines(self._format_record(key, result) for key, result in entries.items())
+        logging.info(f"Migrated {len(entries)} cached OCR results from {legacy_file} to {self.index_file}")
+    
+    @staticmethod
+    def make_key(image_hash: str, model_name: str, prompt_version: str = PROMPT_VERSION,
+                 variant: Optional[str] = None) -> str:
+        """Build the cache key for an image digest analyzed with a given model, prompt and pre-processing variant"""
+        key = f"{model_name}:{prompt_version}:{image_hash}"
+        return f"{key}:{variant}" if variant else key
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached result for key, counting the hit or miss"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return copy.deepcopy(entry)
+    
+    def put(self, key: str, result: Dict[str, Any]):
+        """Store a copy of a result and append it to the log"""
+        line = self._format_record(key, result)
+        entry = copy.deepcopy(result)
+        with self.lock:
+            self.entries[key] = entry
+        self._append_lines([line])
+    
+    @staticmethod
+    def _format_record(key: str, result: Dict[str, Any]) -> str:
+        return json.dumps({'key': key, 'result': result}, ensure_ascii=False) + '\n'
+    
+    def _append_lines(self, lines):
+        # Lookups only take self.lock, so they never wait on file I/O
+        with self.write_lock:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.index_file, 'a', encoding='utf-8') as f:
+                if self.needs_newline:
+                    f.write('\n')
+                    self.needs_newline = False
+                f.writelines(lines)
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the number of cached entries"""
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries)}
+
+
+def hash_image_file(image_path: str) -> str:
+    """Return the SHA-256 hex digest of an image file's bytes"""
+    digest = hashlib.sha256()
+    with open(image_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 class GeminiScreenshotAnalyzer:
     """Analyzes screenshots using Gemini Flash OCR to extract app usage data"""
     
-    def __init__(self, api_key: str, model_name: str = 'gemini-2.0-flash'):
-        """Initialize the Gemini client with API key"""
+    def __init__(self, api_key: str, model_name: str = 'gemini-2.0-flash',
+                 requests_per_minute: Optional[float] = None, max_retries: int = 5,
+                 cache: Optional[OCRResultCache] = None, inline_images: bool = True,
+                 inline_max_dimension: int = DEFAULT_INLINE_MAX_DIMENSION,
+                 inline_size_limit: int = DEFAULT_INLINE_SIZE_LIMIT_BYTES,
+                 preprocessor: Optional[ImagePreprocessor] = None):
+        """Initialize the Gemini client with API key, optional requests-per-minute limit and result cache"""
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel(model_name)
         self.model_name = model_name
+        self.max_retries = max_retries
+        self.cache = cache
+        self.inline_images = inline_images
+        self.inline_max_dimension = inline_max_dimension
+        self.inline_size_limit = inline_size_limit
+        self.preprocessor = preprocessor
+        
+        # Shared by all threads using this analyzer
+        self.rate_limiter = TokenBucketLimiter(requests_per_minute) if requests_per_minute else None
         
     def encode_image(self, image_path: str) -> str:
         """Encode image to base64 for API transmission"""
         with open(image_path, 'rb') as image_file:
             return base64.b64encode(image_file.read()).decode('utf-8')
     
+    def prepare_inline_image(self, image_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Build an inline image part for generate_content.
+        
+        Images larger than inline_max_dimension are downscaled (requires Pillow).
+        Returns None if the payload would exceed inline_size_limit or the format
+        cannot be sent inline, in which case the caller should upload the file.
+        """
+        suffix = Path(image_path).suffix.lower()
+        mime_type = INLINE_MIME_TYPES.get(suffix)
+        
+        with open(image_path, 'rb') as image_file:
+            data = image_file.read()
+        
+        if PIL_AVAILABLE:
+            with Image.open(io.BytesIO(data)) as image:
+                needs_resize = max(image.size) > self.inline_max_dimension
+                if needs_resize or mime_type is None:
+                    if needs_resize:
+                        image.thumbnail((self.inline_max_dimension, self.inline_max_dimension), Image.LANCZOS)
+                    
+                    if mime_type == 'image/jpeg':
+                        output_format = 'JPEG'
+                        image = image.convert('RGB')
+                    else:
+                        output_format, mime_type = 'PNG', 'image/png'
+                    
+                    buffer = io.BytesIO()
+                    image.save(buffer, format=output_format)
+                    data = buffer.getvalue()
+        elif mime_type is None:
+            return None
+        
+        if len(data) > self.inline_size_limit:
+            return None
+        
+        return {'mime_type': mime_type, 'data': data}
+    
     def create_analysis_prompt(self) -> str:
         """Create the prompt for Gemini to analyze screenshots"""
         return """
@@ -80,49 +319,143 @@ Rules:
 Analyze the image and provide the JSON response:
 """
 
+    def generate_with_retry(self, contents):
+        """Call generate_content under the rate limiter, retrying quota errors with exponential backoff"""
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            
+            try:
+                return self.model.generate_content(contents)
+            except Exception as e:
+                if not is_quota_error(e) or attempt == self.max_retries:
+                    raise
+                
+                # Exponential backoff with jitter, capped at 60 seconds
+                delay = min(2 ** attempt, 60) * random.uniform(1.0, 1.3)
+                logging.warning(f"Gemini quota error, retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries}): {e}")
+                time.sleep(delay)
+    
+    def create_batch_analysis_prompt(self, num_images: int) -> str:
+        """Create the prompt for analyzing several screenshots in one request"""
+        return f"""
+You will receive {num_images} screenshots, each preceded by a label from "Image 1" to "Image {num_images}".
+Analyze every screenshot independently using the instructions below and return a JSON array
+containing exactly {num_images} objects, one per image, in the same order as the images.
+Each object must use the format described below.
+""" + self.create_analysis_prompt()
+
+    def _cache_key(self, image_path: str) -> Optional[str]:
+        """Return the OCR cache key for an image, or None if caching is disabled"""
+        if not self.cache:
+            return None
+        variant = self.preprocessor.config_id if self.preprocessor else None
+        return OCRResultCache.make_key(hash_image_file(image_path), self.model_name, variant=variant)
+    
+    def _get_cached_result(self, cache_key: Optional[str], image_path: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for an image, with metadata pointing at this copy"""
+        if not cache_key:
+            return None
+        cached_result = self.cache.get(cache_key)
+        if cached_result:
+            logging.info(f"OCR cache hit: {image_path}")
+            cached_result['_metadata']['source_image'] = str(image_path)
+            cached_result['_metadata']['cache_hit'] = True
+        return cached_result
+    
+    def _image_content(self, image_path: str, inline_budget: Optional[int] = None) -> Tuple[Any, Optional[Any]]:
+        """
+        Return (content part, uploaded file) for an image.
+        
+        The uploaded file is None for inline parts; otherwise the caller must delete it.
+        inline_budget is the inline payload left in the request; images that do not
+        fit are uploaded instead.
+        """
+        # Shrink the screenshot first if pre-processing is enabled (cached on disk)
+        source_path = str(self.preprocessor.preprocess(image_path)) if self.preprocessor else image_path
+        
+        # Send the image inline when possible; only oversized images go through the File API
+        image_part = self.prepare_inline_image(source_path) if self.inline_images else None
+        if image_part and (inline_budget is None or len(image_part['data']) <= inline_budget):
+            return image_part, None
+        
+        image_file = genai.upload_file(path=source_path)
+        return image_file, image_file
+    
+    @staticmethod
+    def _strip_code_fences(response_text: str) -> str:
+        """Remove any markdown code blocks around a JSON response"""
+        response_text = response_text.strip()
+        
+        if response_text.startswith('```json'):
+            response_text = response_text.replace('```json', '').replace('```', '')
+        elif response_text.startswith('```'):
+            response_text = response_text.replace('```', '')
+        
+        return response_text.strip()
+    
+    def _finalize_result(self, result: Dict[str, Any], image_path: str, cache_key: Optional[str],
+                         batch_size: int = 1) -> Dict[str, Any]:
+        """Add metadata, normalize and validate a parsed result, then store it in the cache"""
+        if not isinstance(result, dict):
+            raise ScreenshotAnalysisError(f"Unexpected analysis result for {Path(image_path).name}: {result!r:.100}")
+        
+        # Add metadata
+        result['_metadata'] = {
+            'source_image': str(image_path),
+            'analysis_timestamp': datetime.now().isoformat(),
+            'model_used': self.model_name
+        }
+        if self.preprocessor:
+            result['_metadata']['preprocessing'] = self.preprocessor.config_id
+        if batch_size > 1:
+            result['_metadata']['batch_size'] = batch_size
+        
+        # Normalize date to 2025 if needed
+        self._normalize_date_to_2025(result)
+        
+        # Validate results and add warnings/errors
+        self._validate_analysis_result(result, str(image_path))
+        
+        if cache_key:
+            self.cache.put(cache_key, result)
+        
+        return result
+    
     def analyze_screenshot(self, image_path: str) -> Optional[Dict[str, Any]]:
-        """Analyze a screenshot using Gemini Flash OCR"""
+        """Analyze a screenshot using Gemini Flash OCR, reusing cached results for identical images"""
         try:
-            # Load and prepare the image
-            image_file = genai.upload_file(path=image_path)
+            cache_key = self._cache_key(image_path)
+        except OSError as e:
+            logging.error(f"Error analyzing screenshot {image_path}: {e}")
+            return None
+            
+        cached_result = self._get_cached_result(cache_key, image_path)
+        if cached_result:
+            return cached_result
             
+        return self._analyze_uncached(image_path, cache_key)
+    
+    def _analyze_uncached(self, image_path: str, cache_key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Send a single screenshot to Gemini and return the validated result"""
+        try:
             # Create the prompt
             prompt = self.create_analysis_prompt()
             
-            # Generate response
-            response = self.model.generate_content([prompt, image_file])
-            
-            # Clean up the uploaded file
-            genai.delete_file(image_file.name)
-            
-            # Parse JSON response
-            response_text = response.text.strip()
+            image_part, image_file = self._image_content(image_path)
             
-            # Remove any markdown code blocks if present
-            if response_text.startswith('```json'):
-                response_text = response_text.replace('```json', '').replace('```', '')
-            elif response_text.startswith('```'):
-                response_text = response_text.replace('```', '')
-            
-            response_text = response_text.strip()
+            try:
+                # Generate response
+                response = self.generate_with_retry([prompt, image_part])
+            finally:
+                # Clean up the uploaded file
+                if image_file:
+                    genai.delete_file(image_file.name)
             
             # Parse JSON
-            result = json.loads(response_text)
-            
-            # Add metadata
-            result['_metadata'] = {
-                'source_image': str(image_path),
-                'analysis_timestamp': datetime.now().isoformat(),
-                'model_used': self.model_name
-            }
+            result = json.loads(self._strip_code_fences(response.text))
             
-            # Normalize date to 2025 if needed
-            self._normalize_date_to_2025(result)
-            
-            # Validate results and add warnings/errors
-            self._validate_analysis_result(result, str(image_path))
-            
-            return result
+            return self._finalize_result(result, image_path, cache_key)
             
         except json.JSONDecodeError as e:
             logging.error(f"Failed to parse JSON response: {e}")
@@ -132,6 +465,82 @@ Analyze the image and provide the JSON response:
             logging.error(f"Error analyzing screenshot {image_path}: {e}")
             return None
     
+    def analyze_screenshots(self, image_paths: List[str], batch_size: int = 3) -> List[Optional[Dict[str, Any]]]:
+        """
+        Analyze several screenshots, sending up to batch_size uncached images per request.
+        
+        Returns one result (or None on failure) per input path, in input order, in the
+        same JSON shape as analyze_screenshot(). A batch whose response cannot be matched
+        to its images is retried one image per request.
+        """
+        results = [None] * len(image_paths)
+        pending = []
+        
+        for index, image_path in enumerate(image_paths):
+            try:
+                cache_key = self._cache_key(image_path)
+            except OSError as e:
+                logging.error(f"Error analyzing screenshot {image_path}: {e}")
+                continue
+            
+            cached_result = self._get_cached_result(cache_key, image_path)
+            if cached_result:
+                results[index] = cached_result
+            else:
+                pending.append((index, image_path, cache_key))
+        
+        for start in range(0, len(pending), max(1, batch_size)):
+            batch = pending[start:start + max(1, batch_size)]
+            
+            batch_results = self._analyze_batch(batch) if len(batch) > 1 else None
+            if batch_results is None:
+                batch_results = [self._analyze_uncached(image_path, cache_key) for _, image_path, cache_key in batch]
+            
+            for (index, _, _), result in zip(batch, batch_results):
+                results[index] = result
+        
+        return results
+    
+    def _analyze_batch(self, batch: List[Tuple[int, str, Optional[str]]]) -> Optional[List[Optional[Dict[str, Any]]]]:
+        """Send several screenshots in one request; returns None if the response cannot be used"""
+        uploaded_files = []
+        
+        try:
+            contents = [self.create_batch_analysis_prompt(len(batch))]
+            # Keep the combined inline payload within the request size limit
+            inline_budget = self.inline_size_limit
+            for number, (_, image_path, _) in enumerate(batch, 1):
+                image_part, image_file = self._image_content(image_path, inline_budget)
+                if image_file:
+                    uploaded_files.append(image_file)
+                else:
+                    inline_budget -= len(image_part['data'])
+                contents.extend([f"Image {number}:", image_part])
+            
+            response = self.generate_with_retry(contents)
+            parsed = json.loads(self._strip_code_fences(response.text))
+        except Exception as e:
+            logging.warning(f"Batched analysis of {len(batch)} images failed ({e}); analyzing them individually")
+            return None
+        finally:
+            # Clean up any uploaded files
+            for image_file in uploaded_files:
+                genai.delete_file(image_file.name)
+        
+        if not isinstance(parsed, list) or len(parsed) != len(batch):
+            logging.warning(f"Batched response did not contain {len(batch)} results; analyzing images individually")
+            return None
+        
+        results = []
+        for (_, image_path, cache_key), result in zip(batch, parsed):
+            try:
+                results.append(self._finalize_result(result, image_path, cache_key, batch_size=len(batch)))
+            except Exception as e:
+                logging.error(f"Error analyzing screenshot {image_path}: {e}")
+                results.append(None)
+        
+        return results
+    
     def _normalize_date_to_2025(self, result: Dict[str, Any]) -> None:
         """Normalize date_of_screenshot to assume 2025 year"""
         date_str = result.get('date_of_screenshot', '')
@@ -280,6 +689,44 @@ def load_environment_variables():
     return api_key
 
 
+def get_analysis_output_file(image_path: Path, output_dir: Optional[Path] = None) -> Path:
+    """Return where the analysis JSON for an image is saved"""
+    if output_dir:
+        # Use specified output directory
+        return output_dir / f"{image_path.stem}_analysis.json"
+    # Save next to the source image by default
+    return image_path.parent / f"{image_path.stem}_analysis.json"
+
+
+def save_analysis_result(result: Optional[Dict[str, Any]], image_path: Path,
+                         output_dir: Optional[Path] = None, save_json: bool = True) -> Optional[Dict[str, Any]]:
+    """Log and (optionally) save the result of analyzing one image"""
+    if not result:
+        logging.error(f"Failed to analyze {image_path}")
+        return None
+    
+    logging.info(f"Successfully analyzed {image_path}")
+    logging.info(f"Device: {result['device_type']} (confidence: {result['device_type_confidence']:.2f})")
+    logging.info(f"Apps found: {len(result['apps'])}")
+    
+    # Check for warnings
+    warnings_info = result.get('_metadata', {}).get('analysis_warnings', [])
+    if warnings_info:
+        logging.info(f"Analysis completed with {len(warnings_info)} warnings")
+    
+    # Save to file - by default next to the source image
+    if save_json:
+        output_file = get_analysis_output_file(image_path, output_dir)
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        
+        logging.info(f"Results saved to: {output_file}")
+    
+    return result
+
+
 def process_single_image(analyzer: GeminiScreenshotAnalyzer, image_path: Path, 
                         output_dir: Optional[Path] = None, save_json: bool = True, 
                         reprocess_existing: bool = False) -> Optional[Dict[str, Any]]:
@@ -305,36 +752,7 @@ def process_single_image(analyzer: GeminiScreenshotAnalyzer, image_path: Path,
     
     try:
         result = analyzer.analyze_screenshot(str(image_path))
-        
-        if result:
-            logging.info(f"Successfully analyzed {image_path}")
-            logging.info(f"Device: {result['device_type']} (confidence: {result['device_type_confidence']:.2f})")
-            logging.info(f"Apps found: {len(result['apps'])}")
-            
-            # Check for warnings
-            warnings_info = result.get('_metadata', {}).get('analysis_warnings', [])
-            if warnings_info:
-                logging.info(f"Analysis completed with {len(warnings_info)} warnings")
-            
-            # Save to file - by default next to the source image
-            if save_json:
-                if output_dir:
-                    # Use specified output directory
-                    output_dir.mkdir(parents=True, exist_ok=True)
-                    output_file = output_dir / f"{image_path.stem}_analysis.json"
-                else:
-                    # Save next to the source image by default
-                    output_file = image_path.parent / f"{image_path.stem}_analysis.json"
-                
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump(result, f, indent=2, ensure_ascii=False)
-                
-                logging.info(f"Results saved to: {output_file}")
-            
-            return result
-        else:
-            logging.error(f"Failed to analyze {image_path}")
-            return None
+        return save_analysis_result(result, image_path, output_dir, save_json)
             
     except ScreenshotAnalysisError as e:
         logging.error(f"Analysis error for {image_path}: {e}")
@@ -344,17 +762,84 @@ def process_single_image(analyzer: GeminiScreenshotAnalyzer, image_path: Path,
         return None
 
 
+def process_image_batch(analyzer: GeminiScreenshotAnalyzer, image_paths: List[Path],
+                        output_dir: Optional[Path] = None, save_json: bool = True,
+                        reprocess_existing: bool = False) -> List[Tuple[bool, Optional[Dict[str, Any]]]]:
+    """
+    Process several images (e.g. all screenshots of one response) with a single batched request.
+    
+    Returns (was_skipped, result) per image, in input order.
+    """
+    if len(image_paths) == 1:
+        image_path = image_paths[0]
+        was_skipped = save_json and not reprocess_existing and get_analysis_output_file(image_path, output_dir).exists()
+        return [(was_skipped, process_single_image(analyzer, image_path, output_dir, save_json, reprocess_existing))]
+    
+    outcomes = [None] * len(image_paths)
+    to_analyze = []
+    
+    for index, image_path in enumerate(image_paths):
+        # Check if analysis already exists (unless reprocessing is requested)
+        expected_output_file = get_analysis_output_file(image_path, output_dir)
+        if save_json and not reprocess_existing and expected_output_file.exists():
+            try:
+                with open(expected_output_file, 'r', encoding='utf-8') as f:
+                    outcomes[index] = (True, json.load(f))
+                logging.info(f"Skipping (already analyzed): {image_path}")
+                continue
+            except Exception as e:
+                logging.warning(f"Failed to load existing analysis for {image_path}: {e}. Reprocessing...")
+        to_analyze.append(index)
+    
+    if to_analyze:
+        logging.info(f"Analyzing batch of {len(to_analyze)} images in {image_paths[0].parent}")
+        try:
+            batch_results = analyzer.analyze_screenshots([str(image_paths[i]) for i in to_analyze],
+                                                         batch_size=len(to_analyze))
+        except Exception as e:
+            logging.error(f"Unexpected error processing batch in {image_paths[0].parent}: {e}")
+            batch_results = [None] * len(to_analyze)
+        
+        for index, result in zip(to_analyze, batch_results):
+            try:
+                outcomes[index] = (False, save_analysis_result(result, image_paths[index], output_dir, save_json))
+            except Exception as e:
+                logging.error(f"Unexpected error processing {image_paths[index]}: {e}")
+                outcomes[index] = (False, None)
+    
+    return outcomes
+
+
+def group_images_into_batches(image_files: List[Path], batch_size: int) -> List[List[Path]]:
+    """Group images by parent directory (one response each) and split groups into batches of batch_size"""
+    if batch_size <= 1:
+        return [[image_path] for image_path in image_files]
+    
+    groups = {}
+    for image_path in image_files:
+        groups.setdefault(image_path.parent, []).append(image_path)
+    
+    batches = []
+    for group in groups.values():
+        group.sort()
+        batches.extend(group[start:start + batch_size] for start in range(0, len(group), batch_size))
+    return batches
+
+
 def process_directory(analyzer: GeminiScreenshotAnalyzer, input_dir: Path, 
                      output_dir: Optional[Path] = None, save_json: bool = True, 
-                     reprocess_existing: bool = False) -> Dict[str, Any]:
-    """Process all images in a directory"""
-    # Find all image files
-    image_extensions = {'.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff'}
-    image_files = []
+                     reprocess_existing: bool = False, max_in_flight: int = 1,
+                     batch_size: int = 1, index: Optional[ScreenshotIndex] = None) -> Dict[str, Any]:
+    """
+    Process all images in a directory, with up to max_in_flight requests running concurrently.
     
-    for ext in image_extensions:
-        image_files.extend(input_dir.rglob(f"*{ext}"))
-        image_files.extend(input_dir.rglob(f"*{ext.upper()}"))
+    With batch_size > 1, screenshots in the same folder are sent batch_size at a time in one request.
+    Images are found in one directory scan; pass an index to reuse an existing scan.
+    """
+    # Find all image files (extensions are matched case-insensitively)
+    if index is None:
+        index = ScreenshotIndex(input_dir).refresh()
+    image_files = index.image_files(input_dir)
     
     if not image_files:
         logging.warning(f"No image files found in {input_dir}")
@@ -369,21 +854,25 @@ def process_directory(analyzer: GeminiScreenshotAnalyzer, input_dir: Path,
         "successful": 0, 
         "failed": 0,
         "warnings": 0,
+        "images_per_minute": 0.0,
+        "cache_hits": 0,
+        "cache_misses": 0,
         "results": []
     }
     
-    for image_path in image_files:
-        # Check if file already exists before processing
-        was_skipped = False
-        if save_json and not reprocess_existing:
-            if output_dir:
-                expected_output_file = output_dir / f"{image_path.stem}_analysis.json"
-            else:
-                expected_output_file = image_path.parent / f"{image_path.stem}_analysis.json"
-            was_skipped = expected_output_file.exists()
-        
-        result = process_single_image(analyzer, image_path, output_dir, save_json, reprocess_existing)
+    cache_stats_before = analyzer.cache.get_stats() if analyzer.cache else None
+    
+    def analyze_batch(image_paths: List[Path]):
+        return process_image_batch(analyzer, image_paths, output_dir, save_json, reprocess_existing)
         
+    start_time = time.time()
+    
+    # Results are consumed in batch order, so the output is independent of max_in_flight
+    batches = group_images_into_batches(image_files, batch_size)
+    with ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as executor:
+        analyses = [outcome for batch in executor.map(analyze_batch, batches) for outcome in batch]
+    
+    for was_skipped, result in analyses:
         if result:
             results["successful"] += 1
             results["results"].append(result)
@@ -400,6 +889,17 @@ def process_directory(analyzer: GeminiScreenshotAnalyzer, input_dir: Path,
         else:
             results["failed"] += 1
     
+    # Throughput of images actually sent for analysis
+    elapsed_minutes = (time.time() - start_time) / 60
+    analyzed = results["processed"] + results["failed"]
+    if elapsed_minutes > 0:
+        results["images_per_minute"] = analyzed / elapsed_minutes
+    
+    if cache_stats_before:
+        cache_stats = analyzer.cache.get_stats()
+        results["cache_hits"] = cache_stats['hits'] - cache_stats_before['hits']
+        results["cache_misses"] = cache_stats['misses'] - cache_stats_before['misses']
+    
     return results
 
 
@@ -455,6 +955,64 @@ def main():
         help='Reprocess images that already have analysis JSON files (default: skip existing)'
     )
     
+    parser.add_argument(
+        '--max-in-flight',
+        type=int,
+        default=4,
+        help='Maximum number of concurrent Gemini requests for directory processing (default: 4)'
+    )
+    
+    parser.add_argument(
+        '--requests-per-minute',
+        type=float,
+        help='Limit Gemini requests per minute across all workers (default: no limit)'
+    )
+    
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=1,
+        help='Send up to N screenshots from the same folder in one request (default: 1)'
+    )
+    
+    parser.add_argument(
+        '--no-inline',
+        action='store_true',
+        help='Always upload images via the File API instead of sending them inline'
+    )
+    
+    parser.add_argument(
+        '--inline-max-dimension',
+        type=int,
+        default=DEFAULT_INLINE_MAX_DIMENSION,
+        help=f'Downscale inline images so their longest side is at most this many pixels (default: {DEFAULT_INLINE_MAX_DIMENSION}, requires Pillow)'
+    )
+    
+    parser.add_argument(
+        '--preprocess',
+        action='store_true',
+        help='Grayscale, crop the status bar and downsample screenshots before analysis (requires Pillow)'
+    )
+    
+    parser.add_argument(
+        '--preprocess-max-dimension',
+        type=int,
+        default=DEFAULT_PREPROCESS_MAX_DIMENSION,
+        help=f'Longest side of pre-processed images in pixels (default: {DEFAULT_PREPROCESS_MAX_DIMENSION})'
+    )
+    
+    parser.add_argument(
+        '--cache-file',
+        default=str(DEFAULT_CACHE_FILE),
+        help='Content-addressed OCR result cache log (default: .tmp/ocr_result_cache.jsonl)'
+    )
+    
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Do not read or write the OCR result cache'
+    )
+    
     args = parser.parse_args()
     
     # Setup logging
@@ -465,7 +1023,12 @@ def main():
         api_key = load_environment_variables()
         
         # Initialize analyzer with specified model
-        analyzer = GeminiScreenshotAnalyzer(api_key, args.model)
+        cache = None if args.no_cache else OCRResultCache(Path(args.cache_file))
+        preprocessor = ImagePreprocessor(max_dimension=args.preprocess_max_dimension) if args.preprocess else None
+        analyzer = GeminiScreenshotAnalyzer(api_key, args.model, requests_per_minute=args.requests_per_minute,
+                                            cache=cache, inline_images=not args.no_inline,
+                                            inline_max_dimension=args.inline_max_dimension,
+                                            preprocessor=preprocessor)
         
         # Process input
         input_path = Path(args.input_path)
@@ -488,7 +1051,8 @@ def main():
         elif input_path.is_dir():
             # Process directory
             save_json = not args.no_save
-            results = process_directory(analyzer, input_path, output_dir, save_json, args.reprocess_existing)
+            results = process_directory(analyzer, input_path, output_dir, save_json, args.reprocess_existing,
+                                        max_in_flight=args.max_in_flight, batch_size=args.batch_size)
             
             # Print summary
             logging.info(f"\nProcessing Summary:")
@@ -498,6 +1062,9 @@ def main():
             logging.info(f"Successful: {results['successful']}")
             logging.info(f"With warnings: {results['warnings']}")
             logging.info(f"Failed: {results['failed']}")
+            logging.info(f"Throughput: {results['images_per_minute']:.1f} images/minute")
+            if cache:
+                logging.info(f"OCR cache: {results['cache_hits']} hits, {results['cache_misses']} misses")
             
             if args.pretty_print and not args.summary_only:
                 print(json.dumps(results, indent=2, ensure_ascii=False))
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Screenshot pre-processing for Gemini OCR
+
+Shrinks screenshots before they are sent to Gemini: converts to grayscale,
+crops the iOS status bar / home indicator, downsamples to a maximum dimension
+and re-encodes. Processed images are cached on disk, keyed by the SHA-256 of
+the source bytes and the pre-processing settings.
+"""
+
+import io
+import os
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+
+DEFAULT_PREPROCESS_CACHE_DIR = Path(__file__).parent.parent.parent / '.tmp' / 'ocr_preprocessed'
+DEFAULT_PREPROCESS_MAX_DIMENSION = 1536
+
+# Fractions of the image height removed from the top (status bar) and bottom
+# (home indicator). The iOS status bar is ~5% of a portrait screenshot.
+DEFAULT_CROP_TOP_FRACTION = 0.05
+DEFAULT_CROP_BOTTOM_FRACTION = 0.0
+
+
+class ImagePreprocessor:
+    """Grayscale / crop / downsample / re-encode screenshots, caching results on disk"""
+
+    def __init__(self, grayscale: bool = True,
+                 crop_top_fraction: float = DEFAULT_CROP_TOP_FRACTION,
+                 crop_bottom_fraction: float = DEFAULT_CROP_BOTTOM_FRACTION,
+                 max_dimension: int = DEFAULT_PREPROCESS_MAX_DIMENSION,
+                 output_format: str = 'PNG', jpeg_quality: int = 85,
+                 cache_dir: Optional[Path] = DEFAULT_PREPROCESS_CACHE_DIR):
+        """Configure the pre-processing steps; processed images are written to cache_dir"""
+        if not PIL_AVAILABLE:
+            raise ImportError("Image pre-processing requires Pillow. Run: pip install Pillow")
+
+        if not 0 <= crop_top_fraction + crop_bottom_fraction < 1:
+            raise ValueError("Crop fractions must be non-negative and sum to less than 1")
+
+        self.grayscale = grayscale
+        self.crop_top_fraction = crop_top_fraction
+        self.crop_bottom_fraction = crop_bottom_fraction
+        self.max_dimension = max_dimension
+        self.output_format = output_format.upper()
+        self.jpeg_quality = jpeg_quality
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+
+    @property
+    def config_id(self) -> str:
+        """Short identifier of the settings, used in cache keys"""
+        parts = [
+            'gray' if self.grayscale else 'color',
+            f"crop{self.crop_top_fraction:g}-{self.crop_bottom_fraction:g}",
+            f"max{self.max_dimension}",
+            self.output_format.lower() + (str(self.jpeg_quality) if self.output_format == 'JPEG' else '')
+        ]
+        return '_'.join(parts)
+
+    @property
+    def suffix(self) -> str:
+        return '.jpg' if self.output_format == 'JPEG' else '.png'
+
+    def process_bytes(self, data: bytes) -> bytes:
+        """Apply the pre-processing steps to encoded image bytes and return the re-encoded image"""
+        with Image.open(io.BytesIO(data)) as image:
+            image.load()
+
+        if self.grayscale:
+            image = image.convert('L')
+        elif image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        # Crop status bar / home indicator chrome
+        width, height = image.size
+        top = int(height * self.crop_top_fraction)
+        bottom = height - int(height * self.crop_bottom_fraction)
+        if top > 0 or bottom < height:
+            image = image.crop((0, top, width, bottom))
+
+        if max(image.size) > self.max_dimension:
+            image.thumbnail((self.max_dimension, self.max_dimension), Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        if self.output_format == 'JPEG':
+            image.save(buffer, format='JPEG', quality=self.jpeg_quality, optimize=True)
+        else:
+            image.save(buffer, format='PNG', optimize=True)
+        return buffer.getvalue()
+
+    def preprocess(self, image_path: str) -> Path:
+        """Return the path of the pre-processed image, creating and caching it if needed"""
+        with open(image_path, 'rb') as f:
+            data = f.read()
+
+        if self.cache_dir is None:
+            raise ValueError("preprocess() needs a cache_dir; use process_bytes() for in-memory processing")
+
+        digest = hashlib.sha256(data + self.config_id.encode('utf-8')).hexdigest()
+        cached_path = self.cache_dir / f"{digest}{self.suffix}"
+
+        if cached_path.exists():
+            return cached_path
+
+        processed = self.process_bytes(data)
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(processed)
+        os.replace(temp_path, cached_path)
+
+        logging.debug(f"Pre-processed {image_path}: {len(data):,} -> {len(processed):,} bytes")
+        return cached_path
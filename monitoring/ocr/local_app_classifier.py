@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Local rule-based pre-classifier for app names
+
+Resolves app names whose game / not-game status is obvious without asking
+Gemini, so only ambiguous names are sent to the LLM:
+
+1. Known apps: a curated dictionary of common iOS, desktop and web apps
+2. Bundle identifiers and domain rules (com.apple.*, .ac.uk, .gov, ...), and
+   domains whose name is a known app (youtube.com). Platform bundle identifiers
+   that look like games (com.microsoft.microsoftsolitairecollection) are
+   forwarded instead
+
+Variants of names already in the classification cache are resolved before
+this pass by the AppNameIndex (app_name_index.py). Anything else is forwarded
+to the LLM. Local results are not written to the classification cache.
+"""
+
+import re
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# Names are compared after AppGameClassifier._normalize_app_name() (stripped, lowercase)
+KNOWN_NON_GAMES = {
+    # iOS / macOS / Windows system apps
+    'settings', 'phone', 'messages', 'mail', 'calendar', 'photos', 'camera', 'clock', 'notes',
+    'reminders', 'maps', 'wallet', 'health', 'files', 'calculator', 'app store', 'safari',
+    'screenshots', 'passwords', 'preview', 'finder', 'facetime', 'contacts', 'weather', 'music',
+    'podcasts', 'books', 'news', 'find my', 'shortcuts', 'home', 'translate', 'voice memos',
+    'system preferences', 'system settings', 'explorer', 'task manager', 'terminal', 'authenticator',
+    # Browsers
+    'chrome', 'google chrome', 'firefox', 'edge', 'microsoft edge', 'opera', 'brave',
+    # Social and messaging
+    'instagram', 'facebook', 'facebook & messenger', 'messenger', 'whatsapp', 'snapchat', 'tiktok',
+    'youtube', 'youtube music', 'reddit', 'threads', 'telegram', 'tumblr', 'pinterest', 'linkedin',
+    'x', 'twitter', 'signal', 'bereal', 'bluesky', 'discord',
+    # Productivity, shopping, media and finance
+    'google', 'gmail', 'google maps', 'google photos', 'google drive', 'google docs', 'outlook',
+    'microsoft outlook', 'teams', 'microsoft teams', 'slack', 'zoom', 'zoom workplace', 'notion',
+    'word', 'microsoft word', 'excel', 'microsoft excel', 'powerpoint', 'microsoft powerpoint',
+    'onedrive', 'dropbox', 'spotify', 'netflix', 'bbc iplayer', 'disney+', 'prime video', 'amazon',
+    'uber', 'uber eats', 'deliveroo', 'just eat', 'paypal', 'klarna', 'temu', 'wikipedia',
+    'duolingo', 'chatgpt', 'visual studio code', 'anydesk', 'nhs app',
+}
+
+KNOWN_GAMES = {
+    'minecraft', 'roblox', 'fortnite', 'candy crush saga', 'candy crush soda saga', 'clash royale',
+    'clash of clans', 'pokémon go', 'among us', 'genshin impact', 'subway surfers', 'league of legends',
+    'valorant', 'stardew valley', 'balatro', 'coin master', 'monopoly go', 'monopolygo', 'royal match',
+    'old school runescape', 'destiny 2', 'counter-strike 2', 'cs2', 'rocket league', 'rocketleague',
+    'hearthstone', 'chess.com', 'lichess', 'solitaire', 'block blast!', 'woodoku', 'wordle',
+}
+
+# Bundle identifier prefixes of platform (non-game) apps
+NON_GAME_BUNDLE_PREFIXES = ('com.apple.', 'com.microsoft.', 'com.google.')
+
+# Microsoft and Google also publish games (Solitaire Collection, Xbox titles, Play Games);
+# bundle identifiers containing these are left to the LLM
+GAME_BUNDLE_MARKERS = ('game', 'solitaire', 'minesweeper', 'mahjong', 'sudoku', 'jigsaw', 'crossword',
+                       'minecraft', 'mojang', 'xbox', 'halo', 'forza', 'bethesda', 'blizzard', 'activision')
+
+# Domain suffixes of institutional sites
+NON_GAME_DOMAIN_SUFFIXES = ('.ac.uk', '.edu', '.gov', '.gov.uk', '.nhs.uk', '.nhs.net', '.mil', '.police.uk')
+
+DOMAIN_PATTERN = re.compile(r'^(?:[a-z0-9-]+\.)+[a-z]{2,}$')
+
+KNOWN_APP_CONFIDENCE = 9
+RULE_CONFIDENCE = 8
+
+
+class LocalAppClassifier:
+    """First-pass offline classifier; returns None for names that need the LLM"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {'known_app': 0, 'domain_rule': 0, 'forwarded': 0, 'api_calls_avoided': 0}
+
+    def _result(self, is_game: bool, confidence: int, reasoning: str, rule: str) -> Dict[str, Any]:
+        return {
+            'is_game': is_game,
+            'confidence': confidence,
+            'reasoning': reasoning,
+            'classification_timestamp': datetime.now().isoformat(),
+            'model_used': f'local:{rule}'
+        }
+
+    def match_known_app(self, name: str) -> Optional[Dict[str, Any]]:
+        """Look the name up in the curated dictionaries (.exe suffixes are ignored)"""
+        if name.endswith('.exe'):
+            name = name[:-len('.exe')]
+
+        if name in KNOWN_GAMES:
+            return self._result(True, KNOWN_APP_CONFIDENCE, f"{name} is a well-known game", 'known_app')
+        if name in KNOWN_NON_GAMES:
+            return self._result(False, KNOWN_APP_CONFIDENCE, f"{name} is a well-known non-game app", 'known_app')
+        return None
+
+    def match_domain_rules(self, name: str) -> Optional[Dict[str, Any]]:
+        """Classify platform bundle identifiers, institutional domains and domains of known apps"""
+        if name.startswith(NON_GAME_BUNDLE_PREFIXES):
+            if any(marker in name for marker in GAME_BUNDLE_MARKERS):
+                return None
+            return self._result(False, RULE_CONFIDENCE, f"{name} is a platform app bundle identifier", 'domain_rule')
+
+        if not DOMAIN_PATTERN.match(name):
+            return None
+
+        if name.endswith(NON_GAME_DOMAIN_SUFFIXES):
+            return self._result(False, RULE_CONFIDENCE, f"{name} is an institutional website", 'domain_rule')
+
+        # youtube.com, www.reddit.com, bbc.co.uk -> known app names
+        labels = name.split('.')
+        if labels[0] == 'www':
+            labels = labels[1:]
+        site = labels[0]
+        if site in KNOWN_GAMES:
+            return self._result(True, RULE_CONFIDENCE, f"{name} is the website of the game {site}", 'domain_rule')
+        if site in KNOWN_NON_GAMES:
+            return self._result(False, RULE_CONFIDENCE, f"{name} is the website of {site}", 'domain_rule')
+        return None
+
+    def classify(self, app_names: List[str], normalize) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """
+        Resolve what can be resolved locally.
+
+        Returns (results by app name, names to forward to the LLM).
+        """
+        results = {}
+        forwarded = []
+
+        for app_name in app_names:
+            name = normalize(app_name)
+            result = self.match_known_app(name)
+            if result is None:
+                result = self.match_domain_rules(name)
+            if result is not None:
+                results[app_name] = result
+            else:
+                forwarded.append(app_name)
+
+        with self.lock:
+            for result in results.values():
+                self.stats[result['model_used'].split(':', 1)[1]] += 1
+            self.stats['forwarded'] += len(forwarded)
+
+        if results:
+            logging.info(f"Pre-classifier resolved {len(results)} apps locally, forwarding {len(forwarded)} to the LLM")
+        return results, forwarded
+
+    def record_avoided_calls(self, count: int) -> None:
+        with self.lock:
+            self.stats['api_calls_avoided'] += count
+
+    def get_stats(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.stats)
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+In-process OCR Pipeline for iOS Screenshots
+
+Runs the screenshot pipeline without spawning an interpreter per step. Each
+participant's screenshots are analyzed, summarized and flattened to CSV rows in
+memory; the rows stream to a classification worker that classifies new app
+names while OCR continues on the next participants. The aggregated CSV is then
+enriched from the warm classification cache. Per-stage timings are reported at
+the end of the run.
+"""
+
+import csv
+import sys
+import time
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add the current directory to Python path to import the pipeline stages
+sys.path.insert(0, str(Path(__file__).parent))
+from gemini_screenshot_analyzer import GeminiScreenshotAnalyzer, OCRResultCache, load_environment_variables
+from participant_aggregator import ParticipantAggregator, ParticipantStats
+from summary_to_csv import CSV_FIELDNAMES
+from app_game_classifier import AppGameClassifier
+
+
+# Apps per classification request, matching enrich_csv_with_game_classification()
+CLASSIFICATION_BATCH_SIZE = 20
+
+
+@dataclass
+class PipelineResult:
+    """Outcome of an OCR pipeline run"""
+    success: bool
+    participants: int = 0
+    rows: int = 0
+    aggregated_csv: Optional[Path] = None
+    enriched_csv: Optional[Path] = None
+    stage_timings: Dict[str, float] = field(default_factory=dict)
+    participant_stats: List[ParticipantStats] = field(default_factory=list)
+
+
+class StageTimer:
+    """Accumulates wall time per pipeline stage across threads"""
+
+    def __init__(self):
+        self.timings = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.timings[name] = self.timings.get(name, 0.0) + elapsed
+
+
+def write_rows_csv(output_path: Path, rows: List[Dict[str, str]]) -> None:
+    """Write flattened summary rows with the summary_to_csv.py columns"""
+    with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def classify_streamed_apps(classifier: AppGameClassifier, row_queue: queue.Queue,
+                           timer: StageTimer, errors: List[str]) -> None:
+    """
+    Classification worker: classify app names as rows arrive, in batches.
+
+    Results land in the classifier cache, so the final enrichment needs no API calls
+    for apps seen here. A None item on the queue ends the stream.
+    """
+    seen_apps = set()
+    pending_apps = []
+
+    def classify_pending(count: int):
+        batch = pending_apps[:count]
+        del pending_apps[:count]
+        with timer.stage('classify'):
+            classifier.classify_apps_batch(batch)
+
+    while True:
+        rows = row_queue.get()
+        if rows is None:
+            break
+
+        try:
+            for row in rows:
+                app_name = row.get('App')
+                if app_name and app_name not in seen_apps:
+                    seen_apps.add(app_name)
+                    pending_apps.append(app_name)
+
+            while len(pending_apps) >= CLASSIFICATION_BATCH_SIZE:
+                classify_pending(CLASSIFICATION_BATCH_SIZE)
+        except Exception as e:
+            logging.error(f"Streaming classification failed: {e}")
+            errors.append(str(e))
+
+    try:
+        if pending_apps:
+            classify_pending(len(pending_apps))
+    except Exception as e:
+        logging.error(f"Streaming classification failed: {e}")
+        errors.append(str(e))
+
+
+def run_ocr_pipeline(base_dir: Path, qualtrics_csv_path: Optional[Path] = None,
+                     model: str = 'gemini-2.0-flash', classifier_model: str = 'gemini-2.0-flash-exp',
+                     classifier_cache_file: str = 'monitoring/ocr/app_game_cache.json',
+                     max_in_flight: int = 4, batch_size: int = 1,
+                     requests_per_minute: Optional[float] = None,
+                     index_file: Optional[Path] = None) -> PipelineResult:
+    """
+    Analyze, summarize, flatten and classify all participants under base_dir in one process.
+
+    Writes the same files as the CLI chain: per-image analysis JSON, per-participant
+    summary JSON/CSV, aggregated_participant_data.csv and its _enriched copy. The
+    screenshot tree is scanned once; with index_file the scan is persisted between runs.
+    """
+    timer = StageTimer()
+    start_time = time.perf_counter()
+    result = PipelineResult(success=True, stage_timings=timer.timings)
+
+    with timer.stage('setup'):
+        api_key = load_environment_variables()
+        analyzer = GeminiScreenshotAnalyzer(api_key, model, requests_per_minute=requests_per_minute,
+                                            cache=OCRResultCache())
+        aggregator = ParticipantAggregator(base_dir, analyzer=analyzer, qualtrics_csv_path=qualtrics_csv_path,
+                                           max_in_flight=max_in_flight, batch_size=batch_size,
+                                           index_file=index_file)
+        classifier = AppGameClassifier(api_key=api_key, model_name=classifier_model,
+                                       cache_file=classifier_cache_file)
+
+    with timer.stage('index'):
+        participants = aggregator.discover_participants()
+    result.participants = len(participants)
+    if not participants:
+        logging.warning(f"No participants found in {base_dir}")
+        result.success = False
+        return result
+
+    # Classification runs alongside OCR, fed with each participant's rows
+    row_queue = queue.Queue()
+    classification_errors = []
+    classification_worker = threading.Thread(
+        target=classify_streamed_apps,
+        args=(classifier, row_queue, timer, classification_errors),
+        daemon=True
+    )
+    classification_worker.start()
+
+    all_rows = []
+    try:
+        for participant_id, participant_dir in participants:
+            try:
+                with timer.stage('analyze'):
+                    stats = aggregator.process_participant_images(participant_id, participant_dir)
+                result.participant_stats.append(stats)
+
+                with timer.stage('summarize'):
+                    report = aggregator.create_participant_summary_report(participant_id, participant_dir)
+                    aggregator.save_participant_summary_report(participant_id, participant_dir, report)
+
+                with timer.stage('to_csv'):
+                    rows = aggregator.convert_summary_to_csv(participant_id, participant_dir, report)
+            except Exception as e:
+                logging.error(f"Failed to process participant {participant_id}: {e}")
+                result.success = False
+                continue
+
+            all_rows.extend(rows)
+            row_queue.put(rows)
+    finally:
+        aggregator.index.save()
+        row_queue.put(None)
+        with timer.stage('classify_wait'):
+            classification_worker.join()
+
+    if classification_errors:
+        result.success = False
+
+    result.rows = len(all_rows)
+    if not all_rows:
+        logging.warning("No app usage rows extracted; skipping aggregation and classification")
+        timer.timings['total'] = time.perf_counter() - start_time
+        return result
+
+    with timer.stage('aggregate'):
+        result.aggregated_csv = base_dir / "aggregated_participant_data.csv"
+        write_rows_csv(result.aggregated_csv, all_rows)
+        logging.info(f"Aggregated CSV created: {result.aggregated_csv} ({len(all_rows)} rows)")
+
+    with timer.stage('enrich'):
+        try:
+            result.enriched_csv = Path(classifier.enrich_csv_with_game_classification(
+                str(result.aggregated_csv), force_format='ios'
+            ))
+        except Exception as e:
+            logging.error(f"Failed to enrich {result.aggregated_csv}: {e}")
+            result.success = False
+
+    timer.timings['total'] = time.perf_counter() - start_time
+    return result
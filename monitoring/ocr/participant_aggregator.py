@@ -18,11 +18,17 @@ from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime, timedelta
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 import time
 
 # Add the current directory to Python path to import our analyzer
 sys.path.insert(0, str(Path(__file__).parent))
-from gemini_screenshot_analyzer import GeminiScreenshotAnalyzer, ScreenshotAnalysisError
+from gemini_screenshot_analyzer import (
+    GeminiScreenshotAnalyzer, ScreenshotAnalysisError, OCRResultCache, DEFAULT_CACHE_FILE, load_environment_variables
+)
+from image_preprocessor import ImagePreprocessor
+from summary_to_csv import CSV_FIELDNAMES, extract_csv_rows
+from screenshot_index import ScreenshotIndex
 
 
 @dataclass
@@ -57,11 +63,16 @@ class ParticipantAggregator:
     """Aggregates OCR processing for all participants"""
     
     def __init__(self, base_dir: Path, analyzer: Optional[GeminiScreenshotAnalyzer] = None, 
-                 qualtrics_csv_path: Optional[Path] = None):
-        """Initialize the aggregator with base directory and optional Qualtrics CSV"""
+                 qualtrics_csv_path: Optional[Path] = None, max_in_flight: int = 1, batch_size: int = 1,
+                 participant_workers: int = 1, index_file: Optional[Path] = None):
+        """Initialize the aggregator with base directory and optional Qualtrics CSV and persisted directory index"""
         self.base_dir = base_dir
         self.analyzer = analyzer
+        self.max_in_flight = max(1, max_in_flight)
+        self.batch_size = max(1, batch_size)
+        self.participant_workers = max(1, participant_workers)
         self.image_extensions = {'.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff'}
+        self.index = ScreenshotIndex(base_dir, index_file, self.image_extensions)
         self.qualtrics_csv_path = qualtrics_csv_path
         self._response_start_dates = {}  # Cache for response ID -> StartDate mapping
         
@@ -123,39 +134,28 @@ class ParticipantAggregator:
             # Look for specific participant
             participant_dir = self.base_dir / specific_participant
             if participant_dir.exists() and participant_dir.is_dir():
+                self.index.refresh(participant_dir)
                 participants.append((specific_participant, participant_dir))
                 logging.info(f"Found specific participant: {specific_participant}")
             else:
                 logging.error(f"Participant {specific_participant} not found in {self.base_dir}")
         else:
-            # Look for all participant directories (should be numeric IDs)
-            for item in self.base_dir.iterdir():
-                if item.is_dir() and item.name.isdigit():
-                    participants.append((item.name, item))
-                    
-            # Sort by participant ID for consistent processing order
-            participants.sort(key=lambda x: int(x[0]))
+            # Scan the whole tree once; participant directories should be numeric IDs,
+            # returned sorted by ID for consistent processing order
+            self.index.refresh()
+            participants = self.index.participant_dirs()
             
             logging.info(f"Discovered {len(participants)} participants")
+            logging.info(f"Directory index: {self.index.scan_stats['listed']} directories listed, "
+                         f"{self.index.scan_stats['reused']} unchanged")
             
         return participants
     
     def discover_participant_images(self, participant_dir: Path) -> List[Tuple[Path, str]]:
-        """Discover all images for a specific participant"""
-        images = []
-        
-        # Look through all response folders for this participant
-        for response_dir in participant_dir.iterdir():
-            if response_dir.is_dir():
-                # Find image files in this response directory
-                for file_path in response_dir.iterdir():
-                    if file_path.suffix.lower() in self.image_extensions:
-                        # Skip if JSON analysis already exists
-                        json_path = file_path.parent / f"{file_path.stem}_analysis.json"
-                        if not json_path.exists():
-                            images.append((file_path, response_dir.name))
-                            
-        return images
+        """Discover all images for a specific participant that have no analysis JSON yet"""
+        if not self.index.is_indexed(participant_dir):
+            self.index.refresh(participant_dir)
+        return self.index.unanalyzed_images(participant_dir)
     
     def process_participant_images(self, participant_id: str, participant_dir: Path, 
                                  skip_existing: bool = True) -> ParticipantStats:
@@ -187,80 +187,38 @@ class ParticipantAggregator:
             
         logging.info(f"  Found {stats.total_images} unprocessed images across {len(response_folders)} response folders")
         
-        # Process each image
-        for i, (image_path, response_folder) in enumerate(images_to_process, 1):
-            logging.info(f"  Processing image {i}/{stats.total_images}: {image_path.name}")
+        # Screenshots of the same response are sent together when batching is enabled
+        batches = self.group_images_into_batches(images_to_process)
+        
+        # Analyze up to max_in_flight requests concurrently; outcomes come back in batch order
+        def analyze(indexed_batch):
+            first, batch = indexed_batch
+            if len(batch) == 1:
+                logging.info(f"  Processing image {first}/{stats.total_images}: {batch[0][0].name}")
+            else:
+                logging.info(f"  Processing images {first}-{first + len(batch) - 1}/{stats.total_images} "
+                             f"from {batch[0][1]} in one request")
+            return self.analyze_participant_batch(batch)
+        
+        indexed_batches = []
+        first = 1
+        for batch in batches:
+            indexed_batches.append((first, batch))
+            first += len(batch)
             
-            try:
-                if self.analyzer:
-                    # Use direct analyzer
-                    result = self.analyzer.analyze_screenshot(str(image_path))
-                    if result:
-                        stats.successful_images += 1
-                        
-                        # Check for warnings
-                        warnings_info = result.get('_metadata', {}).get('analysis_warnings', [])
-                        if warnings_info:
-                            stats.images_with_warnings += 1
-                            
-                        # Save JSON next to image
-                        json_path = image_path.parent / f"{image_path.stem}_analysis.json"
-                        with open(json_path, 'w', encoding='utf-8') as f:
-                            json.dump(result, f, indent=2, ensure_ascii=False)
-                    else:
-                        stats.failed_images += 1
-                        stats.error_details.append({
-                            'image': str(image_path),
-                            'response_folder': response_folder,
-                            'error': 'Analysis returned None'
-                        })
-                else:
-                    # Use subprocess to call the CLI tool
-                    cmd = [
-                        sys.executable, 
-                        str(Path(__file__).parent / 'gemini_screenshot_analyzer.py'),
-                        str(image_path),
-                        '--model', 'gemini-2.0-flash-exp'
-                    ]
-                    
-                    result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-                    
-                    if result.returncode == 0:
-                        stats.successful_images += 1
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            outcomes = [outcome for batch_outcomes in executor.map(analyze, indexed_batches)
+                        for outcome in batch_outcomes]
                         
-                        # Check if warnings were logged (simple heuristic)
-                        if 'WARNING' in result.stderr:
-                            stats.images_with_warnings += 1
-                    else:
-                        stats.failed_images += 1
-                        error_msg = result.stderr.strip() if result.stderr else result.stdout.strip()
-                        stats.error_details.append({
-                            'image': str(image_path),
-                            'response_folder': response_folder,
-                            'error': error_msg[:200]  # Truncate long errors
-                        })
-                        
-                stats.processed_images += 1
-                
-            except subprocess.TimeoutExpired:
-                stats.failed_images += 1
-                stats.processed_images += 1
-                stats.error_details.append({
-                    'image': str(image_path),
-                    'response_folder': response_folder,
-                    'error': 'Analysis timed out (120s)'
-                })
-                logging.warning(f"    Timeout processing {image_path.name}")
-                
-            except Exception as e:
+        for outcome in outcomes:
+            stats.processed_images += 1
+            if outcome['success']:
+                stats.successful_images += 1
+                if outcome['warnings']:
+                    stats.images_with_warnings += 1
+            else:
                 stats.failed_images += 1
-                stats.processed_images += 1
-                stats.error_details.append({
-                    'image': str(image_path),
-                    'response_folder': response_folder,
-                    'error': str(e)[:200]
-                })
-                logging.error(f"    Error processing {image_path.name}: {e}")
+                stats.error_details.append(outcome['error'])
         
         stats.processing_time_seconds = time.time() - start_time
         
@@ -271,9 +229,124 @@ class ParticipantAggregator:
         logging.info(f"    Failed: {stats.failed_images}")
         logging.info(f"    With warnings: {stats.images_with_warnings}")
         logging.info(f"    Processing time: {stats.processing_time_seconds:.1f}s")
+        if stats.processing_time_seconds > 0:
+            logging.info(f"    Throughput: {stats.processed_images / stats.processing_time_seconds * 60:.1f} images/minute")
         
         return stats
     
+    def group_images_into_batches(self, images: List[Tuple[Path, str]]) -> List[List[Tuple[Path, str]]]:
+        """Group images by response folder and split each group into batches of at most batch_size"""
+        if self.batch_size == 1 or not self.analyzer:
+            return [[image] for image in images]
+        
+        groups = {}
+        for image_path, response_folder in images:
+            groups.setdefault(response_folder, []).append((image_path, response_folder))
+        
+        batches = []
+        for group in groups.values():
+            batches.extend(group[start:start + self.batch_size] for start in range(0, len(group), self.batch_size))
+        return batches
+    
+    def analyze_participant_batch(self, batch: List[Tuple[Path, str]]) -> List[Dict]:
+        """Analyze a batch of images from one response in a single request; returns one outcome per image"""
+        if len(batch) == 1 or not self.analyzer:
+            return [self.analyze_participant_image(image_path, response_folder) for image_path, response_folder in batch]
+        
+        try:
+            results = self.analyzer.analyze_screenshots([str(image_path) for image_path, _ in batch],
+                                                        batch_size=len(batch))
+        except Exception as e:
+            logging.error(f"    Error processing batch from {batch[0][1]}: {e}")
+            results = [None] * len(batch)
+        
+        return [self.record_analysis_result(image_path, response_folder, result)
+                for (image_path, response_folder), result in zip(batch, results)]
+    
+    def record_analysis_result(self, image_path: Path, response_folder: str, result: Optional[Dict]) -> Dict:
+        """Save an in-process analysis result next to its image and return the outcome dict"""
+        outcome = {'success': False, 'warnings': False, 'error': None}
+        
+        if not result:
+            outcome['error'] = {
+                'image': str(image_path),
+                'response_folder': response_folder,
+                'error': 'Analysis returned None'
+            }
+            return outcome
+        
+        try:
+            # Save JSON next to image
+            json_path = image_path.parent / f"{image_path.stem}_analysis.json"
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            logging.error(f"    Error processing {image_path.name}: {e}")
+            outcome['error'] = {
+                'image': str(image_path),
+                'response_folder': response_folder,
+                'error': str(e)[:200]
+            }
+            return outcome
+        
+        outcome['success'] = True
+        
+        # Check for warnings
+        warnings_info = result.get('_metadata', {}).get('analysis_warnings', [])
+        outcome['warnings'] = bool(warnings_info)
+        return outcome
+    
+    def analyze_participant_image(self, image_path: Path, response_folder: str) -> Dict:
+        """
+        Analyze a single image and save its JSON next to it.
+        
+        Returns a dict with 'success', 'warnings' and, on failure, an 'error' detail entry.
+        Safe to call from multiple threads.
+        """
+        outcome = {'success': False, 'warnings': False, 'error': None}
+        
+        def error_detail(message: str) -> Dict[str, str]:
+            return {
+                'image': str(image_path),
+                'response_folder': response_folder,
+                'error': message
+            }
+        
+        try:
+            if self.analyzer:
+                # Use direct analyzer
+                result = self.analyzer.analyze_screenshot(str(image_path))
+                return self.record_analysis_result(image_path, response_folder, result)
+            else:
+                # Use subprocess to call the CLI tool
+                cmd = [
+                    sys.executable, 
+                    str(Path(__file__).parent / 'gemini_screenshot_analyzer.py'),
+                    str(image_path),
+                    '--model', 'gemini-2.0-flash-exp'
+                ]
+                
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+                
+                if result.returncode == 0:
+                    outcome['success'] = True
+                    
+                    # Check if warnings were logged (simple heuristic)
+                    outcome['warnings'] = 'WARNING' in result.stderr
+                else:
+                    error_msg = result.stderr.strip() if result.stderr else result.stdout.strip()
+                    outcome['error'] = error_detail(error_msg[:200])  # Truncate long errors
+        
+        except subprocess.TimeoutExpired:
+            outcome['error'] = error_detail('Analysis timed out (120s)')
+            logging.warning(f"    Timeout processing {image_path.name}")
+        
+        except Exception as e:
+            outcome['error'] = error_detail(str(e)[:200])
+            logging.error(f"    Error processing {image_path.name}: {e}")
+        
+        return outcome
+    
     def create_participant_summary_report(self, participant_id: str, participant_dir: Path) -> Dict:
         """Create a concatenated report of all app usage data for a participant"""
         logging.info(f"  Creating summary report for participant {participant_id}...")
@@ -291,13 +364,10 @@ class ParticipantAggregator:
             }
         }
         
-        # Find all JSON analysis files for this participant
-        json_files = []
-        for response_dir in participant_dir.iterdir():
-            if response_dir.is_dir():
-                for file_path in response_dir.iterdir():
-                    if file_path.suffix == '.json' and '_analysis' in file_path.name:
-                        json_files.append((file_path, response_dir.name))
+        # Find all JSON analysis files for this participant; only response folders
+        # changed since the last scan (e.g. by the analysis step) are listed again
+        self.index.refresh(participant_dir)
+        json_files = self.index.analysis_files(participant_dir)
         
         report['processing_summary']['total_json_files_found'] = len(json_files)
         
@@ -419,66 +489,52 @@ class ParticipantAggregator:
         
         return report_file
     
-    def convert_summary_to_csv(self, summary_json_path: Path):
-        """Convert summary JSON to CSV using the summary_to_csv.py script"""
-        try:
-            # Get the path to the summary_to_csv.py script
-            script_path = Path(__file__).parent / "summary_to_csv.py"
+    def convert_summary_to_csv(self, participant_id: str, participant_dir: Path, report: Dict) -> List[Dict[str, str]]:
+        """Flatten a summary report to CSV rows in memory and write the participant's summary CSV"""
+        rows = extract_csv_rows(report)
             
-            # Run the conversion script
-            result = subprocess.run(
-                [sys.executable, str(script_path), str(summary_json_path)],
-                capture_output=True,
-                text=True,
-                check=True
-            )
+        if not rows:
+            logging.warning(f"  No data rows to write to CSV for participant {participant_id}")
+            return rows
             
-            if result.stdout:
-                for line in result.stdout.strip().split('\n'):
-                    logging.info(f"    CSV: {line}")
+        csv_file = participant_dir / f"participant_{participant_id}_summary.csv"
+        with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES)
+            writer.writeheader()
+            writer.writerows(rows)
                     
-        except subprocess.CalledProcessError as e:
-            logging.warning(f"  Failed to convert summary to CSV: {e.stderr}")
-        except Exception as e:
-            logging.warning(f"  Failed to convert summary to CSV: {e}")
+        logging.info(f"    CSV: CSV file written: {csv_file}")
+        logging.info(f"    CSV: Total rows: {len(rows)}")
+        return rows
     
-    def aggregate_participant_csvs(self, participants: List[Tuple[str, Path]]) -> Path:
-        """Aggregate all participant CSV files into a single CSV file"""
-        aggregated_csv_path = self.base_dir / "aggregated_participant_data.csv"
-        
-        all_rows = []
-        csv_files_found = 0
-        
-        for participant_id, participant_dir in participants:
-            csv_file = participant_dir / f"participant_{participant_id}_summary.csv"
+    def process_participant(self, participant_id: str, participant_dir: Path, skip_existing: bool = True,
+                            generate_summary_reports: bool = True) -> Tuple[Optional[ParticipantStats], List[Dict[str, str]]]:
+        """
+        Analyze one participant's images and build their summary report and CSV rows.
+        
+        Returns (stats, rows); stats is None if the participant failed. Safe to run for
+        different participants in parallel threads.
+        """
+        rows = []
+        try:
+            stats = self.process_participant_images(participant_id, participant_dir, skip_existing)
             
-            if csv_file.exists():
+            # Generate participant summary report after processing images
+            if generate_summary_reports:
                 try:
-                    with open(csv_file, 'r', encoding='utf-8') as f:
-                        reader = csv.DictReader(f)
-                        for row in reader:
-                            all_rows.append(row)
-                    csv_files_found += 1
+                    summary_report = self.create_participant_summary_report(participant_id, participant_dir)
+                    self.save_participant_summary_report(participant_id, participant_dir, summary_report)
+                    
+                    # Convert summary to CSV
+                    rows = self.convert_summary_to_csv(participant_id, participant_dir, summary_report)
                 except Exception as e:
-                    logging.warning(f"Failed to read CSV for participant {participant_id}: {e}")
-        
-        if all_rows:
-            # Write aggregated CSV
-            fieldnames = ["PID", "DeviceType", "App", "Date", "Duration"]
+                    logging.warning(f"Failed to create summary report for participant {participant_id}: {e}")
             
-            with open(aggregated_csv_path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(all_rows)
-            
-            logging.info(f"\nAggregated CSV created: {aggregated_csv_path}")
-            logging.info(f"  Participants included: {csv_files_found}")
-            logging.info(f"  Total rows: {len(all_rows)}")
-            
-            return aggregated_csv_path
-        else:
-            logging.warning("No participant CSV files found to aggregate")
-            return None
+            return stats, rows
+        
+        except Exception as e:
+            logging.error(f"Failed to process participant {participant_id}: {e}")
+            return None, rows
     
     def process_all_participants(self, skip_existing: bool = True, 
                                specific_participant: Optional[str] = None,
@@ -509,30 +565,56 @@ class ParticipantAggregator:
         successful_participants = 0
         failed_participants = 0
         
-        for participant_id, participant_dir in participants:
-            try:
-                stats = self.process_participant_images(participant_id, participant_dir, skip_existing)
-                participant_stats.append(stats)
+        # In group mode, rows are streamed into the aggregated CSV as each participant finishes
+        aggregate_csv = specific_participant is None and generate_summary_reports and len(participants) > 1
+        aggregated_csv_path = self.base_dir / "aggregated_participant_data.csv"
+        aggregated_file = None
+        aggregated_writer = None
+        aggregated_rows = 0
+        aggregated_participants = 0
                 
-                # Generate participant summary report after processing images
-                if generate_summary_reports:
-                    try:
-                        summary_report = self.create_participant_summary_report(participant_id, participant_dir)
-                        summary_json_path = self.save_participant_summary_report(participant_id, participant_dir, summary_report)
+        def process(participant):
+            participant_id, participant_dir = participant
+            return self.process_participant(participant_id, participant_dir, skip_existing, generate_summary_reports)
+        
+        if self.participant_workers > 1:
+            logging.info(f"Processing participants with {self.participant_workers} workers")
+        
+        # Participants run concurrently, but results are consumed here in discovery order,
+        # so stats and the aggregated CSV are built by one thread in a deterministic order
+        try:
+            with ThreadPoolExecutor(max_workers=self.participant_workers) as executor:
+                for stats, rows in executor.map(process, participants):
+                    if stats is None:
+                        failed_participants += 1
+                        continue
+                    
+                    participant_stats.append(stats)
                         
-                        # Convert summary to CSV
-                        self.convert_summary_to_csv(summary_json_path)
-                    except Exception as e:
-                        logging.warning(f"Failed to create summary report for participant {participant_id}: {e}")
-                
-                if stats.failed_images == 0:
-                    successful_participants += 1
-                else:
-                    failed_participants += 1
+                    if aggregate_csv and rows:
+                        if aggregated_writer is None:
+                            aggregated_file = open(aggregated_csv_path, 'w', newline='', encoding='utf-8')
+                            aggregated_writer = csv.DictWriter(aggregated_file, fieldnames=CSV_FIELDNAMES)
+                            aggregated_writer.writeheader()
+                        aggregated_writer.writerows(rows)
+                        aggregated_rows += len(rows)
+                        aggregated_participants += 1
                     
-            except Exception as e:
-                logging.error(f"Failed to process participant {participant_id}: {e}")
-                failed_participants += 1
+                    if stats.failed_images == 0:
+                        successful_participants += 1
+                    else:
+                        failed_participants += 1
+        finally:
+            if aggregated_file:
+                aggregated_file.close()
+            self.index.save()
+                    
+        if aggregated_writer is not None:
+            logging.info(f"\nAggregated CSV created: {aggregated_csv_path}")
+            logging.info(f"  Participants included: {aggregated_participants}")
+            logging.info(f"  Total rows: {aggregated_rows}")
+        elif aggregate_csv:
+            logging.warning("No participant CSV rows found to aggregate")
         
         # Calculate aggregated statistics
         total_processing_time = time.time() - start_time
@@ -549,10 +631,6 @@ class ParticipantAggregator:
             participant_stats=participant_stats
         )
         
-        # Create aggregated CSV if in group mode and summary reports were generated
-        if specific_participant is None and generate_summary_reports and len(participants) > 1:
-            self.aggregate_participant_csvs(participants)
-        
         return aggregated
 
 
@@ -667,6 +745,57 @@ def main():
         help='Skip generating participant summary reports'
     )
     
+    parser.add_argument(
+        '--max-in-flight',
+        type=int,
+        default=4,
+        help='Maximum number of concurrent Gemini requests per participant (default: 4)'
+    )
+    
+    parser.add_argument(
+        '--requests-per-minute',
+        type=float,
+        help='Limit Gemini requests per minute across all concurrent requests (default: no limit)'
+    )
+    
+    parser.add_argument(
+        '--participant-workers',
+        type=int,
+        default=1,
+        help='Number of participants processed concurrently (default: 1)'
+    )
+    
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=1,
+        help='Send up to N screenshots of the same response in one request (default: 1)'
+    )
+    
+    parser.add_argument(
+        '--preprocess',
+        action='store_true',
+        help='Grayscale, crop the status bar and downsample screenshots before analysis (requires Pillow)'
+    )
+    
+    parser.add_argument(
+        '--cache-file',
+        default=str(DEFAULT_CACHE_FILE),
+        help='Content-addressed OCR result cache log (default: .tmp/ocr_result_cache.jsonl)'
+    )
+    
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Do not read or write the OCR result cache'
+    )
+    
+    parser.add_argument(
+        '--index-file',
+        help='Persist the screenshot directory index here so later runs only rescan changed folders '
+             '(e.g. .tmp/screenshot_index.json)'
+    )
+    
     args = parser.parse_args()
     
     # Setup logging
@@ -685,8 +814,23 @@ def main():
         if not qualtrics_csv_path.is_absolute():
             qualtrics_csv_path = Path.cwd() / qualtrics_csv_path
         
+        # Analyze in-process so concurrent requests share one rate limiter and quota backoff;
+        # fall back to the analyzer CLI per image if the API key cannot be loaded here
+        analyzer = None
+        try:
+            api_key = load_environment_variables()
+            cache = None if args.no_cache else OCRResultCache(Path(args.cache_file))
+            preprocessor = ImagePreprocessor() if args.preprocess else None
+            analyzer = GeminiScreenshotAnalyzer(api_key, args.model, requests_per_minute=args.requests_per_minute,
+                                                cache=cache, preprocessor=preprocessor)
+        except ValueError as e:
+            logging.warning(f"{e}; falling back to the analyzer CLI for each image")
+        
         # Initialize aggregator with Qualtrics CSV
-        aggregator = ParticipantAggregator(base_dir, qualtrics_csv_path=qualtrics_csv_path)
+        aggregator = ParticipantAggregator(base_dir, analyzer=analyzer, qualtrics_csv_path=qualtrics_csv_path,
+                                           max_in_flight=args.max_in_flight, batch_size=args.batch_size,
+                                           participant_workers=args.participant_workers,
+                                           index_file=Path(args.index_file) if args.index_file else None)
         
         # Determine processing mode and target
         if args.participant:
@@ -739,6 +883,16 @@ def main():
             
         logging.info(f"Total processing time: {stats.total_processing_time_seconds:.1f}s")
         
+        analyzed_images = stats.total_successful_images + stats.total_failed_images
+        if stats.total_processing_time_seconds > 0 and analyzed_images > 0:
+            images_per_minute = analyzed_images / stats.total_processing_time_seconds * 60
+            logging.info(f"Throughput: {images_per_minute:.1f} images/minute")
+        
+        if analyzer and analyzer.cache:
+            cache_stats = analyzer.cache.get_stats()
+            logging.info(f"OCR cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                         f"({cache_stats['entries']} cached results)")
+        
         # Save detailed report if requested
         if args.output_report:
             output_file = Path(args.output_report)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Screenshot Directory Index
+
+Builds an in-memory index of a screenshot tree (ios/<RANDOM_ID>/<ResponseID>/)
+in a single filesystem pass: every directory's files with their mtimes and its
+subdirectories. The analyzer, the aggregator and the OCR pipeline query the
+index instead of walking the tree separately.
+
+The index can be persisted to JSON. On the next run each directory is stat'ed
+and only directories whose mtime changed are listed again.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+INDEX_VERSION = 1
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff'}
+ANALYSIS_SUFFIX = '_analysis.json'
+
+# Directory listings younger than this are not trusted on the next run, because a
+# file added within the same mtime tick would not change the directory mtime
+RACY_MTIME_NS = 2 * 10**9
+
+
+class ScreenshotIndex:
+    """Index of files and mtimes under a screenshot directory"""
+
+    def __init__(self, base_dir: Path, index_file: Optional[Path] = None,
+                 image_extensions: Optional[set] = None):
+        """Create the index; call refresh() to scan. index_file enables persistence between runs"""
+        self.base_dir = Path(base_dir)
+        self.index_file = Path(index_file) if index_file else None
+        self.image_extensions = image_extensions or IMAGE_EXTENSIONS
+        self.lock = threading.Lock()
+        self.dirs = {}
+        self.scan_stats = {'listed': 0, 'reused': 0}
+
+        if self.index_file and self.index_file.exists():
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"Could not read screenshot index {self.index_file}: {e}. Rebuilding")
+            return
+
+        if data.get('version') == INDEX_VERSION and data.get('base_dir') == str(self.base_dir.resolve()):
+            self.dirs = data.get('dirs', {})
+            logging.info(f"Loaded screenshot index with {len(self.dirs)} directories from {self.index_file}")
+
+    def save(self):
+        """Persist the index if an index file was configured"""
+        if not self.index_file:
+            return
+
+        with self.lock:
+            data = {'version': INDEX_VERSION, 'base_dir': str(self.base_dir.resolve()), 'dirs': self.dirs}
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.index_file.with_suffix(self.index_file.suffix + '.tmp')
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(temp_file, self.index_file)
+
+    def _relative(self, path: Path) -> str:
+        relative = Path(path).relative_to(self.base_dir).as_posix()
+        return '' if relative == '.' else relative
+
+    def _path(self, relative: str) -> Path:
+        return self.base_dir / relative if relative else self.base_dir
+
+    @staticmethod
+    def _join(parent: str, name: str) -> str:
+        return f"{parent}/{name}" if parent else name
+
+    def refresh(self, directory: Optional[Path] = None) -> 'ScreenshotIndex':
+        """
+        Scan base_dir (or one directory below it), listing only directories whose mtime changed.
+
+        Safe to call for different directories from multiple threads.
+        """
+        root = self._relative(directory) if directory else ''
+        now_ns = time.time_ns()
+        seen = set()
+        stack = [root]
+
+        while stack:
+            relative = stack.pop()
+            try:
+                dir_stat = os.stat(self._path(relative))
+            except FileNotFoundError:
+                continue
+
+            with self.lock:
+                entry = self.dirs.get(relative)
+
+            if entry is None or entry['mtime_ns'] != dir_stat.st_mtime_ns:
+                files = {}
+                subdirs = []
+                with os.scandir(self._path(relative)) as entries:
+                    for dir_entry in entries:
+                        if dir_entry.is_dir(follow_symlinks=False):
+                            subdirs.append(dir_entry.name)
+                        elif dir_entry.is_file():
+                            files[dir_entry.name] = dir_entry.stat().st_mtime
+
+                recent = now_ns - dir_stat.st_mtime_ns < RACY_MTIME_NS
+                entry = {
+                    'mtime_ns': None if recent else dir_stat.st_mtime_ns,
+                    'files': files,
+                    'dirs': sorted(subdirs)
+                }
+                with self.lock:
+                    self.dirs[relative] = entry
+                    self.scan_stats['listed'] += 1
+            else:
+                with self.lock:
+                    self.scan_stats['reused'] += 1
+
+            seen.add(relative)
+            stack.extend(self._join(relative, name) for name in entry['dirs'])
+
+        # Forget directories under the scanned root that no longer exist
+        with self.lock:
+            prefix = f"{root}/" if root else ''
+            for relative in list(self.dirs):
+                if (relative == root or relative.startswith(prefix)) and relative not in seen:
+                    del self.dirs[relative]
+
+        return self
+
+    def _walk(self, relative: str):
+        """Yield (relative dir, entry) for a directory and everything below it"""
+        stack = [relative]
+        while stack:
+            current = stack.pop()
+            with self.lock:
+                entry = self.dirs.get(current)
+            if entry is None:
+                continue
+            yield current, entry
+            stack.extend(self._join(current, name) for name in reversed(entry['dirs']))
+
+    def is_indexed(self, directory: Path) -> bool:
+        """Return whether a directory has been scanned"""
+        with self.lock:
+            return self._relative(directory) in self.dirs
+
+    def image_files(self, directory: Optional[Path] = None) -> List[Path]:
+        """Return all images under base_dir (or a directory below it), sorted by path"""
+        root = self._relative(directory) if directory else ''
+        images = []
+        for relative, entry in self._walk(root):
+            for name in entry['files']:
+                if Path(name).suffix.lower() in self.image_extensions:
+                    images.append(self._path(relative) / name)
+        return sorted(images)
+
+    def participant_dirs(self) -> List[Tuple[str, Path]]:
+        """Return (participant_id, path) for numeric top-level directories, sorted by ID"""
+        with self.lock:
+            entry = self.dirs.get('')
+        if entry is None:
+            return []
+        participants = [(name, self.base_dir / name) for name in entry['dirs'] if name.isdigit()]
+        participants.sort(key=lambda x: int(x[0]))
+        return participants
+
+    def response_files(self, participant_dir: Path) -> List[Tuple[str, Path, Dict[str, float]]]:
+        """Return (response folder, path, {file name: mtime}) for each response directory of a participant"""
+        relative = self._relative(participant_dir)
+        with self.lock:
+            entry = self.dirs.get(relative)
+            if entry is None:
+                return []
+            responses = []
+            for name in entry['dirs']:
+                response_entry = self.dirs.get(self._join(relative, name))
+                if response_entry is not None:
+                    responses.append((name, participant_dir / name, dict(response_entry['files'])))
+        return responses
+
+    def unanalyzed_images(self, participant_dir: Path) -> List[Tuple[Path, str]]:
+        """Return (image path, response folder) for images without an analysis JSON next to them"""
+        images = []
+        for response_folder, response_dir, files in self.response_files(participant_dir):
+            for name in sorted(files):
+                path = Path(name)
+                if path.suffix.lower() in self.image_extensions and f"{path.stem}{ANALYSIS_SUFFIX}" not in files:
+                    images.append((response_dir / name, response_folder))
+        return images
+
+    def analysis_files(self, participant_dir: Path) -> List[Tuple[Path, str]]:
+        """Return (analysis JSON path, response folder) for a participant"""
+        analyses = []
+        for response_folder, response_dir, files in self.response_files(participant_dir):
+            for name in sorted(files):
+                if name.endswith('.json') and '_analysis' in name:
+                    analyses.append((response_dir / name, response_folder))
+        return analyses
@@ -17,6 +17,9 @@ from pathlib import Path
 from typing import Dict, List, Any
 
 
+CSV_FIELDNAMES = ["PID", "DeviceType", "App", "Date", "Duration"]
+
+
 def parse_arguments():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(
@@ -90,11 +93,9 @@ def write_csv(rows: List[Dict[str, str]], output_path: Path) -> None:
         print("Warning: No data rows to write to CSV", file=sys.stderr)
         return
     
-    fieldnames = ["PID", "DeviceType", "App", "Date", "Duration"]
-    
     try:
         with open(output_path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES)
             writer.writeheader()
             writer.writerows(rows)
         
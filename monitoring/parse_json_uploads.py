@@ -11,10 +11,19 @@ import json
 import sys
 import argparse
 import os
+import shutil
 from pathlib import Path
 from datetime import datetime
 from dateutil import parser as date_parser
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+
+# Fixed output schemas (sorted, matching the column order write_csv_file() produces)
+SCREEN_UNLOCKS_FIELDNAMES = ['created_at_datetime', 'session_datetime', 'submission_id']
+APP_USAGE_FIELDNAMES = ['App', 'Duration (min)', 'created_at_datetime', 'session_datetime', 'submission_id']
+
+# Fixed formats tried (after ISO) before falling back to the much slower dateutil parser
+FAST_DATETIME_FORMATS = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M']
 
 
 def parse_json_data(json_str: str) -> Dict[str, List[Dict[str, Any]]]:
@@ -51,15 +60,44 @@ def parse_json_data(json_str: str) -> Dict[str, List[Dict[str, Any]]]:
 
 
 def extract_base_record(row: List[str]) -> Dict[str, str]:
-    """Extract base record information from CSV row."""
+    """
+    Extract base record information from CSV row.
+    
+    created_at is parsed once here and reused by every AppUsage/ScreenUnlocks
+    record of the upload instead of being reparsed per child record.
+    """
     return {
         'id': row[0],
         'created_at': row[1],
+        'created_at_datetime': create_created_at_datetime_string(row[1]),
         'submission_id': row[3],
         'platform': row[4]
     }
 
 
+def fast_parse_datetime(datetime_str: str) -> datetime:
+    """Parse a datetime string, trying ISO and fixed formats before dateutil."""
+    try:
+        return datetime.fromisoformat(datetime_str)
+    except ValueError:
+        pass
+    
+    for fmt in FAST_DATETIME_FORMATS:
+        try:
+            return datetime.strptime(datetime_str, fmt)
+        except ValueError:
+            continue
+    
+    return date_parser.parse(datetime_str)
+
+
+def get_created_at_datetime(base_record: Dict[str, str]) -> str:
+    """Return the formatted created_at of a base record, parsing it only if not already done."""
+    if 'created_at_datetime' in base_record:
+        return base_record['created_at_datetime']
+    return create_created_at_datetime_string(base_record['created_at'])
+
+
 def create_session_datetime_string(date_str: str, time_str: str) -> str:
     """Combine date and time strings into a proper session datetime string."""
     try:
@@ -71,7 +109,7 @@ def create_session_datetime_string(date_str: str, time_str: str) -> str:
             # Combine date and time
             datetime_str = f"{date_str} {time_str}"
             # Parse and reformat to ensure consistent format with seconds
-            dt = date_parser.parse(datetime_str)
+            dt = fast_parse_datetime(datetime_str)
             return dt.strftime("%Y-%m-%d %H:%M:%S")
         return ""
     except Exception:
@@ -83,7 +121,7 @@ def create_created_at_datetime_string(created_at_str: str) -> str:
     try:
         if created_at_str:
             # Parse the created_at timestamp
-            dt = date_parser.parse(created_at_str)
+            dt = fast_parse_datetime(created_at_str)
             return dt.strftime("%Y-%m-%d %H:%M:%S")
         return ""
     except Exception:
@@ -98,7 +136,7 @@ def create_screen_unlocks_record(base_record: Dict[str, str], unlock_record: Dic
     return {
         'session_datetime': create_session_datetime_string(date_str, time_str),
         'submission_id': base_record['submission_id'],
-        'created_at_datetime': create_created_at_datetime_string(base_record['created_at'])
+        'created_at_datetime': get_created_at_datetime(base_record)
     }
 
 
@@ -112,10 +150,129 @@ def create_app_usage_record(base_record: Dict[str, str], app_record: Dict[str, A
         'App': app_record.get('App', ''),
         'Duration (min)': app_record.get('Duration (min)', ''),
         'submission_id': base_record['submission_id'],
-        'created_at_datetime': create_created_at_datetime_string(base_record['created_at'])
+        'created_at_datetime': get_created_at_datetime(base_record)
     }
 
 
+def iter_upload_records(base_record: Dict[str, str], json_data: Dict[str, List[Dict[str, Any]]]) -> Iterator[Tuple[str, Dict[str, str]]]:
+    """
+    Yield (table, record) pairs for a single upload row without materialising them.
+    
+    table is 'screen_unlocks' or 'app_usage'.
+    """
+    for unlock_record in json_data.get('ScreenUnlocks') or []:
+        yield 'screen_unlocks', create_screen_unlocks_record(base_record, unlock_record)
+    
+    for app_record in json_data.get('AppUsage') or []:
+        yield 'app_usage', create_app_usage_record(base_record, app_record)
+
+
+def find_csv_chunk_offsets(input_file: str, target_chunk_bytes: int) -> List[Tuple[int, int]]:
+    """
+    Split a CSV file into (start, end) byte ranges that begin and end on record boundaries.
+    
+    Quoted fields (e.g. json_data) may contain newlines, so a newline only ends a
+    record when an even number of quote characters has been seen since the record
+    started. The header row is not included in any range.
+    """
+    offsets = []
+    
+    with open(input_file, 'rb') as f:
+        position = 0
+        in_quotes = False
+        chunk_start = None
+        
+        for line in f:
+            position += len(line)
+            if line.count(b'"') % 2:
+                in_quotes = not in_quotes
+            if in_quotes:
+                continue
+            
+            # position is now the end of a complete record
+            if chunk_start is None:
+                chunk_start = position  # end of header row
+            elif position - chunk_start >= target_chunk_bytes:
+                offsets.append((chunk_start, position))
+                chunk_start = position
+        
+        if chunk_start is not None and position > chunk_start:
+            offsets.append((chunk_start, position))
+    
+    return offsets
+
+
+class StreamingCSVWriter:
+    """
+    Write records to a CSV file one at a time using a fixed schema.
+    
+    The file is only created when the first record arrives, so an empty stream
+    leaves no output behind (same as write_csv_file with no records). With
+    header=False and report=False it writes the bare row chunks that
+    append_rows_file() concatenates.
+    """
+    
+    file_format = 'csv'
+    
+    def __init__(self, filename: str, fieldnames: List[str], header: bool = True, report: bool = True):
+        self.filename = filename
+        self.fieldnames = fieldnames
+        self.header = header
+        self.report = report
+        self.count = 0
+        self._file = None
+        self._writer = None
+    
+    def _open(self) -> None:
+        if self._writer is None:
+            self._file = open(self.filename, 'w', newline='', encoding='utf-8')
+            self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames)
+            if self.header:
+                self._writer.writeheader()
+    
+    def write(self, record: Dict[str, Any]) -> None:
+        """Write a single record, opening the file and writing the header on first use."""
+        self._open()
+        self._writer.writerow(record)
+        self.count += 1
+    
+    def append_rows_file(self, rows_file: str, count: int) -> None:
+        """Append a headerless CSV of count rows written with the same fieldnames."""
+        if not count:
+            return
+        
+        self._open()
+        with open(rows_file, 'r', newline='', encoding='utf-8') as f:
+            shutil.copyfileobj(f, self._file)
+        self.count += count
+    
+    def close(self) -> None:
+        """Close the file and report how much was written."""
+        if self._file is None:
+            if self.report:
+                print(f"No records to write for {self.filename}")
+            return
+        
+        self._file.close()
+        self._file = None
+        
+        if not self.report:
+            return
+        
+        # Report file size
+        file_size = os.path.getsize(self.filename)
+        file_size_mb = file_size / (1024 * 1024)
+        print(f"Written {self.count} records to {self.filename}")
+        print(f"File size: {file_size_mb:.2f} MB ({file_size:,} bytes)")
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
 def write_csv_file(filename: str, records: List[Dict[str, Any]]) -> None:
     """Write records to CSV file."""
     if not records:
@@ -169,12 +326,17 @@ def main():
     # Set CSV field size limit to maximum
     csv.field_size_limit(sys.maxsize)
     
-    # Collections for the two target tables
-    screen_unlocks_records = []
-    app_usage_records = []
+    # Output files for the two target tables (written row-by-row)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    screen_unlocks_file = output_dir / f"screen_unlocks_{timestamp}.csv"
+    app_usage_file = output_dir / f"app_usage_{timestamp}.csv"
     
     # Process CSV file
-    with open(args.input_file, 'r', encoding='utf-8') as csvfile:
+    with open(args.input_file, 'r', encoding='utf-8') as csvfile, \
+            StreamingCSVWriter(str(screen_unlocks_file), SCREEN_UNLOCKS_FIELDNAMES) as screen_unlocks_writer, \
+            StreamingCSVWriter(str(app_usage_file), APP_USAGE_FIELDNAMES) as app_usage_writer:
+        writers = {'screen_unlocks': screen_unlocks_writer, 'app_usage': app_usage_writer}
+        
         reader = csv.reader(csvfile)
         header = next(reader)
         
@@ -193,17 +355,9 @@ def main():
                 base_record = extract_base_record(row)
                 json_data = parse_json_data(row[2])
                 
-                # Process ScreenUnlocks data
-                if 'ScreenUnlocks' in json_data and json_data['ScreenUnlocks']:
-                    for unlock_record in json_data['ScreenUnlocks']:
-                        screen_unlock = create_screen_unlocks_record(base_record, unlock_record)
-                        screen_unlocks_records.append(screen_unlock)
-                
-                # Process AppUsage data
-                if 'AppUsage' in json_data and json_data['AppUsage']:
-                    for app_record in json_data['AppUsage']:
-                        app_usage = create_app_usage_record(base_record, app_record)
-                        app_usage_records.append(app_usage)
+                # Stream ScreenUnlocks and AppUsage records straight to disk
+                for table, record in iter_upload_records(base_record, json_data):
+                    writers[table].write(record)
                 
                 processed_count += 1
                 
@@ -216,19 +370,6 @@ def main():
                     print(f"Error processing row {row_num}: {e}", file=sys.stderr)
                 continue
     
-    # Write output files
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    
-    # Write screen unlocks table
-    if screen_unlocks_records:
-        screen_unlocks_file = output_dir / f"screen_unlocks_{timestamp}.csv"
-        write_csv_file(screen_unlocks_file, screen_unlocks_records)
-    
-    # Write app usage table
-    if app_usage_records:
-        app_usage_file = output_dir / f"app_usage_{timestamp}.csv"
-        write_csv_file(app_usage_file, app_usage_records)
-    
     # Summary
     print(f"\nProcessing complete!")
     print(f"Processed: {processed_count} rows")
@@ -237,8 +378,8 @@ def main():
     
     # Show record counts
     print(f"\nRecord counts:")
-    print(f"  Screen unlocks: {len(screen_unlocks_records)} records")
-    print(f"  App usage: {len(app_usage_records)} records")
+    print(f"  Screen unlocks: {screen_unlocks_writer.count} records")
+    print(f"  App usage: {app_usage_writer.count} records")
 
 
 if __name__ == "__main__":
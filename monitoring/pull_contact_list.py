@@ -11,7 +11,7 @@ import os
 sys.path.insert(0, os.path.dirname(__file__))
 
 try:
-    from qualtrics_utils import save_contact_list_to_csv
+    from qualtrics_utils import save_contact_list_to_csv, DEFAULT_CONTACT_WORKERS
 except ImportError as e:
     print(f"Error importing qualtrics_utils: {e}")
     sys.exit(1)
@@ -21,13 +21,19 @@ def main():
     parser = argparse.ArgumentParser(description='Export contact list data to CSV in .tmp directory')
     parser.add_argument('--output', type=str, default='contact_list_with_embedded',
                        help='Output filename (without path or extension)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_CONTACT_WORKERS,
+                       help=f'Concurrent contact detail requests when the bulk export is unavailable (default: {DEFAULT_CONTACT_WORKERS})')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Ignore the local contact cache and refetch every contact')
     
     args = parser.parse_args()
     
     try:
         print("Exporting contact list data from Qualtrics...")
         file_path = save_contact_list_to_csv(
-            filename=args.output
+            filename=args.output,
+            max_workers=args.workers,
+            use_cache=not args.no_cache
         )
         
         print(f"✓ Export complete: {file_path}")
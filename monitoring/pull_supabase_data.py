@@ -1,13 +1,20 @@
 #!/usr/bin/env python3
 """
 CLI command to pull all data from Supabase 'uploads' table.
-Usage: python pull_data.py
+Usage: python pull_data.py [--full-refresh]
+
+By default only rows newer than the stored high-water mark (max created_at/id
+seen on the previous run) are fetched and appended to the local uploads CSV.
 """
 
 import os
 import sys
+import csv
+import json
+import argparse
 import subprocess
 from pathlib import Path
+from typing import Dict, Optional, Tuple
 from dotenv import load_dotenv
 
 def load_credentials():
@@ -29,8 +36,127 @@ def ensure_tmp_dir():
     tmp_dir.mkdir(exist_ok=True)
     return tmp_dir
 
-def pull_uploads_data():
-    """Pull all data from uploads table and save to .tmp directory."""
+def get_watermark_path(output_file: Path) -> Path:
+    """Return the path of the high-water mark file kept next to the uploads CSV."""
+    return output_file.with_name(f"{output_file.stem}_watermark.json")
+
+def get_delta_path(output_file: Path) -> Path:
+    """Return the path used to stage newly pulled rows before appending them."""
+    return output_file.with_name(f"{output_file.stem}_delta.csv")
+
+def load_watermark(output_file: Path) -> Optional[Dict[str, str]]:
+    """
+    Load the high-water mark from the previous pull.
+    
+    Returns None (meaning a full pull is required) if either the local store
+    or the watermark file is missing or unreadable.
+    """
+    watermark_file = get_watermark_path(output_file)
+    if not output_file.exists() or not watermark_file.exists():
+        return None
+    
+    try:
+        with open(watermark_file, 'r', encoding='utf-8') as f:
+            watermark = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️  Warning: Could not read watermark file {watermark_file}: {e}")
+        return None
+    
+    if not watermark.get('created_at') or not watermark.get('id'):
+        return None
+    
+    return watermark
+
+def save_watermark(output_file: Path, watermark: Dict[str, str]) -> None:
+    """Persist the high-water mark for the next incremental pull."""
+    watermark_file = get_watermark_path(output_file)
+    with open(watermark_file, 'w', encoding='utf-8') as f:
+        json.dump(watermark, f, indent=2)
+
+def build_uploads_query(watermark: Optional[Dict[str, str]] = None) -> str:
+    """
+    Build the SELECT used to export ActivityWatch uploads.
+    
+    Rows are ordered by (created_at, id) so the last exported row is always the
+    new high-water mark. With a watermark, only strictly newer rows are selected.
+    """
+    query = "SELECT * FROM uploads WHERE platform = 'ActivityWatch'"
+    
+    if watermark:
+        created_at = str(watermark['created_at']).replace("'", "''")
+        upload_id = str(watermark['id']).replace("'", "''")
+        query += f" AND (created_at, id) > ('{created_at}', '{upload_id}')"
+    
+    return query + " ORDER BY created_at, id"
+
+def _row_watermark(header: list, row: list) -> Dict[str, str]:
+    """Build a watermark dict from a single uploads CSV row."""
+    return {
+        'created_at': row[header.index('created_at')],
+        'id': row[header.index('id')]
+    }
+
+def watermark_from_csv(csv_file: Path) -> Optional[Dict[str, str]]:
+    """Read the watermark from the last row of an uploads CSV ordered by (created_at, id)."""
+    csv.field_size_limit(sys.maxsize)
+    
+    with open(csv_file, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            return None
+        
+        last_row = None
+        for row in reader:
+            last_row = row
+    
+    if last_row is None:
+        return None
+    
+    return _row_watermark(header, last_row)
+
+def append_delta_to_store(delta_file: Path, output_file: Path) -> Tuple[int, Optional[Dict[str, str]]]:
+    """
+    Append rows from a freshly pulled delta CSV to the local uploads store.
+    
+    Returns:
+        Tuple of (number of rows appended, watermark of the newest row or None)
+    """
+    csv.field_size_limit(sys.maxsize)
+    
+    with open(output_file, 'r', encoding='utf-8', newline='') as f:
+        store_header = next(csv.reader(f), None)
+    
+    appended_count = 0
+    last_row = None
+    
+    with open(delta_file, 'r', encoding='utf-8', newline='') as delta:
+        reader = csv.reader(delta)
+        delta_header = next(reader, None)
+        
+        if delta_header is None:
+            return 0, None
+        
+        if delta_header != store_header:
+            raise ValueError(
+                f"Column mismatch between {delta_file} and {output_file}; "
+                "re-run with --full-refresh"
+            )
+        
+        with open(output_file, 'a', encoding='utf-8', newline='') as store:
+            writer = csv.writer(store, lineterminator='\n')
+            for row in reader:
+                writer.writerow(row)
+                appended_count += 1
+                last_row = row
+    
+    if last_row is None:
+        return 0, None
+    
+    return appended_count, _row_watermark(delta_header, last_row)
+
+def pull_uploads_data(full_refresh: bool = False):
+    """Pull new (or, with full_refresh, all) data from uploads table into .tmp directory."""
     try:
         db_password, db_url = load_credentials()
         tmp_dir = ensure_tmp_dir()
@@ -48,6 +174,10 @@ def pull_uploads_data():
         # Output file
         output_file = tmp_dir / "uploads_data.csv"
         
+        # Decide between incremental and full pull
+        watermark = None if full_refresh else load_watermark(output_file)
+        target_file = get_delta_path(output_file) if watermark else output_file
+        
         # Build psql command to export uploads table as CSV (ActivityWatch only)
         cmd = [
             "psql",
@@ -55,8 +185,8 @@ def pull_uploads_data():
             "-p", port,
             "-d", database,
             "-U", user,
-            "-c", "\\copy (SELECT * FROM uploads WHERE platform = 'ActivityWatch') TO STDOUT WITH CSV HEADER",
-            "-o", str(output_file)
+            "-c", f"\\copy ({build_uploads_query(watermark)}) TO STDOUT WITH CSV HEADER",
+            "-o", str(target_file)
         ]
         
         print(f"Connecting to Supabase database...")
@@ -64,12 +194,26 @@ def pull_uploads_data():
         print(f"Database: {database}")
         print(f"User: {user}")
         print(f"Output file: {output_file}")
+        if watermark:
+            print(f"Incremental pull: rows newer than created_at={watermark['created_at']}, id={watermark['id']}")
+        else:
+            print(f"Full pull: all ActivityWatch rows")
         
         # Execute command
         result = subprocess.run(cmd, env=env, capture_output=True, text=True)
         
         if result.returncode == 0:
-            print(f"✓ Data successfully exported to {output_file}")
+            if watermark:
+                appended_count, new_watermark = append_delta_to_store(target_file, output_file)
+                target_file.unlink()
+                print(f"✓ Appended {appended_count} new rows to {output_file}")
+            else:
+                new_watermark = watermark_from_csv(output_file)
+                print(f"✓ Data successfully exported to {output_file}")
+            
+            if new_watermark:
+                save_watermark(output_file, new_watermark)
+            
             if output_file.exists():
                 file_size = output_file.stat().st_size
                 file_size_mb = file_size / (1024 * 1024)
@@ -85,4 +229,9 @@ def pull_uploads_data():
         sys.exit(1)
 
 if __name__ == "__main__":
-    pull_uploads_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Pull ActivityWatch uploads from Supabase into .tmp/uploads_data.csv')
+    parser.add_argument('--full-refresh', action='store_true',
+                        help='Ignore the stored watermark and re-download the entire uploads table')
+    args = parser.parse_args()
+    
+    pull_uploads_data(full_refresh=args.full_refresh)
\ No newline at end of file
@@ -16,17 +16,51 @@ import logging
 import urllib.parse
 import csv
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Optional, Dict, List
 from pathlib import Path
 
 import requests
 from dotenv import load_dotenv
 
+from qualtrics_utils import create_qualtrics_session, stream_response_to_file, DEFAULT_POOL_SIZE, SERVER_ERROR_STATUSES
+
+
+# Records the size of every completed image download so reruns can skip them
+MANIFEST_FILENAME = '.image_manifest.json'
+
+
+class SharedRateLimiter:
+    """Request pacing and 429 backoff shared by all download workers"""
+    
+    def __init__(self, max_requests_per_second: Optional[float] = None):
+        self.min_interval = 1.0 / max_requests_per_second if max_requests_per_second else 0.0
+        self.lock = threading.Lock()
+        self.next_request_time = 0.0
+        self.paused_until = 0.0
+    
+    def wait(self):
+        """Block until the calling worker may send its next request"""
+        with self.lock:
+            start = max(time.monotonic(), self.next_request_time, self.paused_until)
+            self.next_request_time = start + self.min_interval
+        
+        delay = start - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+    
+    def pause(self, delay: float):
+        """Hold back every worker for `delay` seconds (used after a 429)"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+
 
 class QualtricsClient:
     """Client for interacting with Qualtrics API v3"""
     
-    def __init__(self, api_key: str, datacenter_id: str, organization_id: str):
+    def __init__(self, api_key: str, datacenter_id: str, organization_id: str,
+                 pool_size: int = DEFAULT_POOL_SIZE):
         self.api_key = api_key
         self.datacenter_id = datacenter_id
         self.organization_id = organization_id
@@ -37,6 +71,15 @@ class QualtricsClient:
         }
         self.retry_count = 0
         self.max_retries = 5
+        self.rate_limiter: Optional[SharedRateLimiter] = None
+        
+        # Pooled keep-alive session; it retries connection errors and 5xx responses,
+        # while 429s are handled in request() so the backoff is shared by all workers
+        self.session = create_qualtrics_session(
+            pool_size=pool_size,
+            max_retries=self.max_retries,
+            retry_statuses=SERVER_ERROR_STATUSES
+        )
     
     def exponential_backoff_delay(self, attempt: int, base_delay: float = 1.0) -> float:
         """Calculate exponential backoff delay with jitter"""
@@ -58,9 +101,49 @@ class QualtricsClient:
         if response.status_code == 429:
             delay = self.exponential_backoff_delay(attempt)
             logging.warning(f"Rate limited (429). Waiting {delay:.1f} seconds before retry {attempt + 1}/{self.max_retries}")
-            time.sleep(delay)
+            if self.rate_limiter:
+                # Back off all workers, not just the one that was throttled
+                self.rate_limiter.pause(delay)
+            else:
+                time.sleep(delay)
             return True
         return False
+    
+    def wait_for_rate_limit(self):
+        """Wait for the shared rate limiter (if any) before sending a request"""
+        if self.rate_limiter:
+            self.rate_limiter.wait()
+    
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request on the pooled session, retrying 429 responses with exponential backoff"""
+        kwargs.setdefault('headers', self.headers)
+        
+        for attempt in range(self.max_retries + 1):
+            self.wait_for_rate_limit()
+            response = self.session.request(method, url, **kwargs)
+            
+            if not self.handle_rate_limit(response, attempt):
+                return response
+            # Release the connection of a throttled (possibly streamed) response
+            response.close()
+        
+        raise requests.exceptions.HTTPError(f"Max retries ({self.max_retries}) exceeded for rate limiting: {url}")
+    
+    def write_response_file(self, response: requests.Response, output_path: str):
+        """Write a response body to output_path in chunks via a temporary file, checking Content-Length"""
+        temp_path = f"{output_path}.part"
+        with open(temp_path, 'wb') as f:
+            stream_response_to_file(response, f)
+        
+        expected_size = response.headers.get('Content-Length')
+        actual_size = os.path.getsize(temp_path)
+        if expected_size and expected_size.isdigit() and int(expected_size) != actual_size and not response.headers.get('Content-Encoding'):
+            os.remove(temp_path)
+            raise requests.exceptions.ContentDecodingError(
+                f"Incomplete download for {output_path}: got {actual_size} of {expected_size} bytes"
+            )
+        
+        os.replace(temp_path, output_path)
         
     def create_response_export(self, survey_id: str, export_format: str = "csv") -> str:
         """Create a response export and return the export progress ID"""
@@ -75,34 +158,26 @@ class QualtricsClient:
         if export_format in ["csv", "tsv", "spss"]:
             payload["useLabels"] = True
         
-        for attempt in range(self.max_retries + 1):
-            response = requests.post(url, json=payload, headers=self.headers)
+        response = self.request('POST', url, json=payload)
             
-            # Handle rate limiting
-            if self.handle_rate_limit(response, attempt):
-                if attempt < self.max_retries:
-                    continue
-                else:
-                    raise requests.exceptions.HTTPError(f"Max retries exceeded for create export")
-            
-            if not response.ok:
-                error_detail = response.text
-                logging.error(f"API Error: {response.status_code} - {error_detail}")
-            response.raise_for_status()
+        if not response.ok:
+            error_detail = response.text
+            logging.error(f"API Error: {response.status_code} - {error_detail}")
+        response.raise_for_status()
             
-            result = response.json()
-            logging.debug(f"Create export response: {result}")
-            # Check if we get progressId (new format) or id (old format)
-            if 'progressId' in result['result']:
-                return result['result']['progressId']
-            else:
-                return result['result']['id']
+        result = response.json()
+        logging.debug(f"Create export response: {result}")
+        # Check if we get progressId (new format) or id (old format)
+        if 'progressId' in result['result']:
+            return result['result']['progressId']
+        else:
+            return result['result']['id']
     
     def check_export_progress(self, survey_id: str, progress_id: str) -> Dict:
         """Check the progress of a response export"""
         url = f"{self.base_url}/responseexports/{progress_id}"
         
-        response = requests.get(url, headers=self.headers)
+        response = self.request('GET', url)
         response.raise_for_status()
         
         return response.json()['result']
@@ -111,15 +186,15 @@ class QualtricsClient:
         """Download the exported response file"""
         url = f"{self.base_url}/responseexports/{progress_id}/file"
         
-        response = requests.get(url, headers=self.headers)
-        if not response.ok:
-            error_detail = response.text
-            logging.error(f"File download API Error: {response.status_code} - {error_detail}")
-            logging.error(f"URL: {url}")
-        response.raise_for_status()
+        # Stream the export to disk instead of holding it in memory
+        with self.request('GET', url, stream=True) as response:
+            if not response.ok:
+                error_detail = response.text
+                logging.error(f"File download API Error: {response.status_code} - {error_detail}")
+                logging.error(f"URL: {url}")
+            response.raise_for_status()
         
-        with open(output_path, 'wb') as f:
-            f.write(response.content)
+            self.write_response_file(response, output_path)
         
         return output_path
     
@@ -283,45 +358,221 @@ class QualtricsClient:
         # Use the API v3 uploaded files endpoint
         url = f"{self.base_url}/surveys/{survey_id}/responses/{response_id}/uploaded-files/{file_id}"
         
-        for attempt in range(self.max_retries + 1):
-            response = requests.get(url, headers=self.headers)
-            
-            # Handle rate limiting with exponential backoff
-            if self.handle_rate_limit(response, attempt):
-                if attempt < self.max_retries:
-                    continue
-                else:
-                    raise requests.exceptions.HTTPError(f"Max retries ({self.max_retries}) exceeded for rate limiting")
+        # Rate limiting (429) is retried with exponential backoff inside request()
+        response = self.request('GET', url)
             
-            # Check for other errors
-            if not response.ok:
-                if attempt == 0:  # Only log error details on first attempt
-                    error_detail = response.text
-                    logging.error(f"File download API Error: {response.status_code} - {error_detail}")
-                    logging.error(f"URL: {url}")
-                response.raise_for_status()
+        # Check for other errors
+        if not response.ok:
+            error_detail = response.text
+            logging.error(f"File download API Error: {response.status_code} - {error_detail}")
+            logging.error(f"URL: {url}")
+            response.raise_for_status()
             
-            # Success - write file and return
-            with open(output_path, 'wb') as f:
-                f.write(response.content)
+        # Success - write file and return
+        self.write_response_file(response, output_path)
             
-            return output_path
-        
-        # This should not be reached, but just in case
-        raise requests.exceptions.HTTPError(f"Failed to download file after {self.max_retries} retries")
+        return output_path
     
     def download_file_from_url(self, file_url: str, output_path: str) -> str:
         """Download a file from Qualtrics using the direct file URL (fallback method)"""
         # These are direct URLs from Qualtrics file service
-        response = requests.get(file_url, headers={'X-API-TOKEN': self.api_key})
+        response = self.request('GET', file_url, headers={'X-API-TOKEN': self.api_key})
         response.raise_for_status()
         
-        with open(output_path, 'wb') as f:
-            f.write(response.content)
+        self.write_response_file(response, output_path)
         
         return output_path
 
 
+def build_image_download_jobs(client: QualtricsClient, participant_data: Dict[str, Dict[str, List]],
+                              output_dir: Path, android_questions: List[str],
+                              ios_questions: List[str]) -> List[Dict]:
+    """Create the android/ios directory tree and return one download job per uploaded image"""
+    jobs = []
+    
+    platform_dirs = [
+        ('Android', output_dir / "android", android_questions),
+        ('iOS', output_dir / "ios", ios_questions)
+    ]
+    for _, platform_dir, _ in platform_dirs:
+        platform_dir.mkdir(exist_ok=True)
+    
+    for random_id, responses in participant_data.items():
+        for platform, platform_dir, questions in platform_dirs:
+            # Create participant directories
+            participant_dir = platform_dir / random_id
+            participant_dir.mkdir(exist_ok=True)
+            
+            for response_id, files in responses.items():
+                # Separate files by platform
+                platform_files = [f for f in files if f['question_id'] in questions]
+                if not platform_files:
+                    continue
+                
+                response_dir = participant_dir / response_id
+                response_dir.mkdir(exist_ok=True)
+                
+                for file_info in platform_files:
+                    question_id = file_info['question_id']
+                    file_url = file_info['file_url']
+                    file_name = file_info['file_name']
+                    
+                    # Extract file ID from the Qualtrics URL
+                    file_id = client.extract_file_id_from_url(file_url)
+                    if not file_id:
+                        logging.error(f"Could not extract file ID from URL: {file_url}")
+                        continue
+                    
+                    # Determine file extension
+                    file_ext = client.get_file_extension_from_name(file_name)
+                    
+                    # Use original filename if available, otherwise generate one
+                    if file_name and file_name.strip():
+                        # Ensure the filename has an extension
+                        if '.' not in file_name:
+                            filename = f"{question_id}_{file_name}{file_ext}"
+                        else:
+                            filename = f"{question_id}_{file_name}"
+                    else:
+                        filename = f"{question_id}_{file_id}{file_ext}"
+                    
+                    jobs.append({
+                        'platform': platform,
+                        'random_id': random_id,
+                        'response_id': response_id,
+                        'file_id': file_id,
+                        'file_url': file_url,
+                        'filename': filename,
+                        'output_path': response_dir / filename
+                    })
+    
+    return jobs
+
+
+def download_image_job(client: QualtricsClient, survey_id: str, job: Dict) -> int:
+    """Download a single image job (API v3 first, direct URL as fallback) and return its size in bytes"""
+    platform = job['platform']
+    filename = job['filename']
+    output_path = str(job['output_path'])
+    label = f"{job['random_id']}/{job['response_id']}/{filename}"
+    
+    try:
+        # Try the proper API v3 endpoint first (with built-in exponential backoff)
+        client.download_uploaded_file(survey_id, job['response_id'], job['file_id'], output_path)
+        logging.info(f"Downloaded ({platform}): {label}")
+    except Exception as e:
+        logging.warning(f"API v3 download failed for {filename}, trying fallback: {e}")
+        
+        # Fallback to direct URL method
+        client.download_file_from_url(job['file_url'], output_path)
+        logging.info(f"Downloaded ({platform} fallback): {label}")
+    
+    return os.path.getsize(output_path)
+
+
+def load_download_manifest(output_dir: Path) -> Dict[str, int]:
+    """Load the relative path -> size manifest of completed downloads"""
+    manifest_file = output_dir / MANIFEST_FILENAME
+    if not manifest_file.exists():
+        return {}
+    
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logging.warning(f"Could not read download manifest {manifest_file}, re-checking all files: {e}")
+        return {}
+
+
+def save_download_manifest(output_dir: Path, manifest: Dict[str, int]):
+    """Atomically write the download manifest"""
+    manifest_file = output_dir / MANIFEST_FILENAME
+    temp_file = manifest_file.with_suffix('.tmp')
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(temp_file, manifest_file)
+
+
+def download_images(client: QualtricsClient, survey_id: str, jobs: List[Dict], output_dir: Path,
+                    workers: int = 4, save_every: int = 25) -> Dict[str, float]:
+    """
+    Download image jobs on a bounded thread pool.
+    
+    Files already on disk with the size recorded in the manifest are skipped,
+    so an interrupted run can simply be restarted. Non-empty files without a
+    manifest entry (downloaded before the manifest existed) are recorded with
+    their on-disk size instead of being fetched again. Returns download statistics.
+    """
+    manifest = load_download_manifest(output_dir)
+    manifest_lock = threading.Lock()
+    
+    pending = []
+    skipped = 0
+    seeded = 0
+    for job in jobs:
+        key = job['output_path'].relative_to(output_dir).as_posix()
+        size = job['output_path'].stat().st_size if job['output_path'].exists() else None
+        if size and key not in manifest:
+            manifest[key] = size
+            seeded += 1
+        if size is not None and manifest.get(key) == size:
+            skipped += 1
+        else:
+            pending.append((key, job))
+    
+    if seeded:
+        logging.info(f"Added {seeded} existing images to the download manifest")
+        save_download_manifest(output_dir, manifest)
+    
+    logging.info(f"{len(jobs)} images found: {skipped} already downloaded, {len(pending)} to download with {workers} workers")
+    
+    downloaded = 0
+    failed = 0
+    total_bytes = 0
+    start_time = time.monotonic()
+    
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(download_image_job, client, survey_id, job): (key, job) for key, job in pending}
+            
+            for future in as_completed(futures):
+                key, job = futures[future]
+                try:
+                    size = future.result()
+                except Exception as e:
+                    failed += 1
+                    logging.error(f"Failed to download {job['filename']}: {e}")
+                    continue
+                
+                downloaded += 1
+                total_bytes += size
+                with manifest_lock:
+                    manifest[key] = size
+                    if downloaded % save_every == 0:
+                        save_download_manifest(output_dir, manifest)
+    finally:
+        save_download_manifest(output_dir, manifest)
+    
+    elapsed = time.monotonic() - start_time
+    stats = {
+        'downloaded': downloaded,
+        'skipped': skipped,
+        'failed': failed,
+        'bytes': total_bytes,
+        'seconds': elapsed,
+        'files_per_second': downloaded / elapsed if elapsed > 0 else 0.0,
+        'mb_per_second': total_bytes / (1024 * 1024) / elapsed if elapsed > 0 else 0.0
+    }
+    
+    logging.info(
+        f"Downloaded {downloaded} images ({total_bytes / (1024 * 1024):.2f} MB) in {elapsed:.1f}s - "
+        f"{stats['files_per_second']:.2f} files/s, {stats['mb_per_second']:.2f} MB/s "
+        f"({skipped} skipped, {failed} failed)"
+    )
+    
+    return stats
+
+
 def setup_logging(verbose: bool = False):
     """Setup logging configuration"""
     level = logging.DEBUG if verbose else logging.INFO
@@ -383,6 +634,18 @@ def main():
         action='store_true', 
         help='Only download images, skip survey responses'
     )
+    parser.add_argument(
+        '--workers', '-w',
+        type=int,
+        default=4,
+        help='Number of concurrent image downloads (default: 4)'
+    )
+    parser.add_argument(
+        '--max-requests-per-second',
+        type=float,
+        default=None,
+        help='Cap on API requests per second shared by all workers (default: no cap)'
+    )
     parser.add_argument(
         '--verbose', '-v',
         action='store_true',
@@ -409,7 +672,8 @@ def main():
         client = QualtricsClient(
             api_key=env_vars['QUALTRICS_API_KEY'],
             datacenter_id=env_vars['QUALTRICS_DATACENTER_ID'],
-            organization_id=env_vars['QUALTRICS_ORG_ID']
+            organization_id=env_vars['QUALTRICS_ORG_ID'],
+            pool_size=max(DEFAULT_POOL_SIZE, args.workers)
         )
         
         responses_file = None
@@ -474,114 +738,14 @@ def main():
             participant_data = client.extract_image_urls_from_responses(responses_file, all_target_questions)
             
             if participant_data:
-                # Create separate directories for Android and iOS
-                android_dir = output_dir / "android"
-                ios_dir = output_dir / "ios"
-                android_dir.mkdir(exist_ok=True)
-                ios_dir.mkdir(exist_ok=True)
+                jobs = build_image_download_jobs(client, participant_data, output_dir, android_questions, ios_questions)
                 
-                for random_id, responses in participant_data.items():
-                    # Create participant directories
-                    participant_android_dir = android_dir / random_id
-                    participant_ios_dir = ios_dir / random_id
-                    participant_android_dir.mkdir(exist_ok=True)
-                    participant_ios_dir.mkdir(exist_ok=True)
-                    
-                    for response_id, files in responses.items():
-                        # Separate files by platform
-                        android_files = [f for f in files if f['question_id'] in android_questions]
-                        ios_files = [f for f in files if f['question_id'] in ios_questions]
-                        
-                        # Process Android files
-                        if android_files:
-                            android_response_dir = participant_android_dir / response_id
-                            android_response_dir.mkdir(exist_ok=True)
-                            
-                            for file_info in android_files:
-                                question_id = file_info['question_id']
-                                file_url = file_info['file_url']
-                                file_name = file_info['file_name']
-                                
-                                # Extract file ID from the Qualtrics URL
-                                file_id = client.extract_file_id_from_url(file_url)
-                                if not file_id:
-                                    logging.error(f"Could not extract file ID from URL: {file_url}")
-                                    continue
-                                
-                                # Determine file extension
-                                file_ext = client.get_file_extension_from_name(file_name)
-                                
-                                # Use original filename if available, otherwise generate one
-                                if file_name and file_name.strip():
-                                    # Ensure the filename has an extension
-                                    if '.' not in file_name:
-                                        filename = f"{question_id}_{file_name}{file_ext}"
-                                    else:
-                                        filename = f"{question_id}_{file_name}"
-                                else:
-                                    filename = f"{question_id}_{file_id}{file_ext}"
-                                
-                                output_path = android_response_dir / filename
-                                
-                                try:
-                                    # Try the proper API v3 endpoint first (with built-in exponential backoff)
-                                    client.download_uploaded_file(survey_id, response_id, file_id, str(output_path))
-                                    logging.info(f"Downloaded (Android): {random_id}/{response_id}/{filename}")
-                                except Exception as e:
-                                    logging.warning(f"API v3 download failed for {filename}, trying fallback: {e}")
-                                    
-                                    try:
-                                        # Fallback to direct URL method
-                                        client.download_file_from_url(file_url, str(output_path))
-                                        logging.info(f"Downloaded (Android fallback): {random_id}/{response_id}/{filename}")
-                                    except Exception as e2:
-                                        logging.error(f"Failed to download {filename}: {e2}")
-                        
-                        # Process iOS files
-                        if ios_files:
-                            ios_response_dir = participant_ios_dir / response_id
-                            ios_response_dir.mkdir(exist_ok=True)
-                            
-                            for file_info in ios_files:
-                                question_id = file_info['question_id']
-                                file_url = file_info['file_url']
-                                file_name = file_info['file_name']
-                                
-                                # Extract file ID from the Qualtrics URL
-                                file_id = client.extract_file_id_from_url(file_url)
-                                if not file_id:
-                                    logging.error(f"Could not extract file ID from URL: {file_url}")
-                                    continue
-                                
-                                # Determine file extension
-                                file_ext = client.get_file_extension_from_name(file_name)
-                                
-                                # Use original filename if available, otherwise generate one
-                                if file_name and file_name.strip():
-                                    # Ensure the filename has an extension
-                                    if '.' not in file_name:
-                                        filename = f"{question_id}_{file_name}{file_ext}"
-                                    else:
-                                        filename = f"{question_id}_{file_name}"
-                                else:
-                                    filename = f"{question_id}_{file_id}{file_ext}"
-                                
-                                output_path = ios_response_dir / filename
-                                
-                                try:
-                                    # Try the proper API v3 endpoint first (with built-in exponential backoff)
-                                    client.download_uploaded_file(survey_id, response_id, file_id, str(output_path))
-                                    logging.info(f"Downloaded (iOS): {random_id}/{response_id}/{filename}")
-                                except Exception as e:
-                                    logging.warning(f"API v3 download failed for {filename}, trying fallback: {e}")
-                                    
-                                    try:
-                                        # Fallback to direct URL method
-                                        client.download_file_from_url(file_url, str(output_path))
-                                        logging.info(f"Downloaded (iOS fallback): {random_id}/{response_id}/{filename}")
-                                    except Exception as e2:
-                                        logging.error(f"Failed to download {filename}: {e2}")
+                # All workers share one rate-limit/backoff budget
+                client.rate_limiter = SharedRateLimiter(args.max_requests_per_second)
+                download_images(client, survey_id, jobs, output_dir, workers=max(1, args.workers))
                 
+                android_dir = output_dir / "android"
+                ios_dir = output_dir / "ios"
                 logging.info(f"Image downloads completed. Check {android_dir} and {ios_dir}")
             else:
                 logging.info("No images found in survey responses")
@@ -1,22 +1,85 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import pandas as pd
 from typing import Dict, List, Optional, Any
+from concurrent.futures import ThreadPoolExecutor
 import time
 import zipfile
 import io
+import tempfile
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
 # Load environment variables from credentials/.env
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', 'credentials', '.env'))
 
+# Connection pool and retry defaults shared by all Qualtrics clients
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_FACTOR = 1.0
+RATE_LIMIT_STATUSES = (429,)
+SERVER_ERROR_STATUSES = (500, 502, 503, 504)
+
+# Local cache of contact details (contactId -> last-modified + detail) kept in .tmp
+CONTACT_CACHE_FILENAME = 'contact_cache.json'
+# Fields that may carry a contact's last-modified time in list responses (first present wins)
+CONTACT_LAST_MODIFIED_FIELDS = ('lastModifiedDate', 'lastModified', 'updatedAt')
+DEFAULT_CONTACT_WORKERS = 8
+
+# Export files are streamed to disk in chunks of this size instead of being held in memory
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def create_qualtrics_session(pool_size: int = DEFAULT_POOL_SIZE,
+                             max_retries: int = DEFAULT_MAX_RETRIES,
+                             backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+                             retry_statuses: tuple = RATE_LIMIT_STATUSES + SERVER_ERROR_STATUSES) -> requests.Session:
+    """
+    Create a requests.Session with keep-alive connection pooling and retry/backoff.
+    
+    Args:
+        pool_size: Maximum number of pooled connections per host
+        max_retries: Retries for connection errors and retry_statuses responses
+        backoff_factor: Exponential backoff factor between retries (Retry-After is honoured)
+        retry_statuses: HTTP status codes that are retried
+    
+    Returns:
+        Configured requests.Session
+    """
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=retry_statuses,
+        allowed_methods=None,  # export creation (POST) is safe to retry as well
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def stream_response_to_file(response: requests.Response, file_obj, chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> int:
+    """Write a response body to an open binary file chunk by chunk; returns the number of bytes written"""
+    total_bytes = 0
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        if chunk:
+            file_obj.write(chunk)
+            total_bytes += len(chunk)
+    return total_bytes
+
 
 class QualtricsAPI:
     """Utility class for accessing Qualtrics survey data."""
     
-    def __init__(self):
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE):
         """Initialize with credentials from environment variables."""
         self.api_key = os.getenv('QUALTRICS_API_KEY')
         self.datacenter_id = os.getenv('QUALTRICS_DATACENTER_ID')
@@ -37,13 +100,16 @@ class QualtricsAPI:
             'X-API-TOKEN': self.api_key,
             'Content-Type': 'application/json'
         }
+        
+        # Pooled keep-alive session with retry/backoff on 429 and 5xx responses
+        self.session = create_qualtrics_session(pool_size=pool_size)
     
-    def get_survey_responses(self, survey_id: str, format: str = 'json', 
-                           start_date: Optional[str] = None, 
-                           end_date: Optional[str] = None,
-                           use_labels: bool = True) -> Dict[str, Any]:
+    def download_survey_export(self, survey_id: str, format: str = 'json', 
+                               start_date: Optional[str] = None, 
+                               end_date: Optional[str] = None,
+                               use_labels: bool = True) -> str:
         """
-        Get survey responses for a specific survey.
+        Export survey responses and stream the export file to a temporary file.
         
         Args:
             survey_id: Qualtrics survey ID
@@ -52,7 +118,7 @@ class QualtricsAPI:
             end_date: End date filter (YYYY-MM-DD)
             
         Returns:
-            Dict containing survey responses
+            Path to the downloaded export (a ZIP file); the caller deletes it
         """
         export_data = {
             'format': format
@@ -68,7 +134,7 @@ class QualtricsAPI:
             export_data['endDate'] = end_date
             
         # Create export
-        export_response = requests.post(
+        export_response = self.session.post(
             f"{self.base_url}/surveys/{survey_id}/export-responses",
             headers=self.headers,
             json=export_data
@@ -78,7 +144,7 @@ class QualtricsAPI:
             # Try without date filters if they cause issues
             if start_date or end_date:
                 export_data = {'format': format}
-                export_response = requests.post(
+                export_response = self.session.post(
                     f"{self.base_url}/surveys/{survey_id}/export-responses",
                     headers=self.headers,
                     json=export_data
@@ -90,7 +156,7 @@ class QualtricsAPI:
         
         # Check export progress
         while True:
-            progress_response = requests.get(
+            progress_response = self.session.get(
                 f"{self.base_url}/surveys/{survey_id}/export-responses/{progress_id}",
                 headers=self.headers
             )
@@ -105,27 +171,79 @@ class QualtricsAPI:
             
             time.sleep(1)
         
-        # Download file
-        file_response = requests.get(
-            f"{self.base_url}/surveys/{survey_id}/export-responses/{file_id}/file",
-            headers=self.headers
-        )
-        file_response.raise_for_status()
-        
-        if format == 'json':
-            # Extract JSON from ZIP
-            with zipfile.ZipFile(io.BytesIO(file_response.content)) as zip_file:
-                json_filename = [name for name in zip_file.namelist() if name.endswith('.json')][0]
-                with zip_file.open(json_filename) as json_file:
-                    return json.load(json_file)
-        elif format == 'csv':
-            # Extract CSV from ZIP
-            with zipfile.ZipFile(io.BytesIO(file_response.content)) as zip_file:
+        # Download file in chunks to disk
+        fd, export_path = tempfile.mkstemp(prefix=f'qualtrics_{survey_id}_', suffix='.zip')
+        try:
+            with os.fdopen(fd, 'wb') as f, self.session.get(
+                f"{self.base_url}/surveys/{survey_id}/export-responses/{file_id}/file",
+                headers=self.headers,
+                stream=True
+            ) as file_response:
+                file_response.raise_for_status()
+                stream_response_to_file(file_response, f)
+        except Exception:
+            os.remove(export_path)
+            raise
+        
+        return export_path
+    
+    @contextmanager
+    def open_survey_responses_csv(self, survey_id: str, 
+                                  start_date: Optional[str] = None, 
+                                  end_date: Optional[str] = None,
+                                  use_labels: bool = True):
+        """
+        Export survey responses as CSV and yield the CSV as a binary file object.
+        
+        The CSV is decompressed from the downloaded ZIP on disk as it is read, so it
+        can be passed straight to a parser without loading the export into memory.
+        """
+        export_path = self.download_survey_export(survey_id, format='csv', start_date=start_date,
+                                                  end_date=end_date, use_labels=use_labels)
+        try:
+            with zipfile.ZipFile(export_path) as zip_file:
                 csv_filename = [name for name in zip_file.namelist() if name.endswith('.csv')][0]
                 with zip_file.open(csv_filename) as csv_file:
-                    return csv_file.read()
-        else:
-            return file_response.content
+                    yield csv_file
+        finally:
+            os.remove(export_path)
+    
+    def get_survey_responses(self, survey_id: str, format: str = 'json', 
+                           start_date: Optional[str] = None, 
+                           end_date: Optional[str] = None,
+                           use_labels: bool = True) -> Dict[str, Any]:
+        """
+        Get survey responses for a specific survey.
+        
+        Args:
+            survey_id: Qualtrics survey ID
+            format: Response format ('json', 'csv', 'tsv', 'spss')
+            start_date: Start date filter (YYYY-MM-DD)
+            end_date: End date filter (YYYY-MM-DD)
+        
+        Returns:
+            Dict containing survey responses
+        """
+        export_path = self.download_survey_export(survey_id, format=format, start_date=start_date,
+                                                  end_date=end_date, use_labels=use_labels)
+        try:
+            if format == 'json':
+                # Extract JSON from ZIP
+                with zipfile.ZipFile(export_path) as zip_file:
+                    json_filename = [name for name in zip_file.namelist() if name.endswith('.json')][0]
+                    with zip_file.open(json_filename) as json_file:
+                        return json.load(json_file)
+            elif format == 'csv':
+                # Extract CSV from ZIP
+                with zipfile.ZipFile(export_path) as zip_file:
+                    csv_filename = [name for name in zip_file.namelist() if name.endswith('.csv')][0]
+                    with zip_file.open(csv_filename) as csv_file:
+                        return csv_file.read()
+            else:
+                with open(export_path, 'rb') as f:
+                    return f.read()
+        finally:
+            os.remove(export_path)
     
     def get_survey_responses_df(self, survey_id: str, 
                                start_date: Optional[str] = None, 
@@ -198,7 +316,7 @@ class QualtricsAPI:
         Returns:
             Dict containing survey metadata
         """
-        response = requests.get(
+        response = self.session.get(
             f"{self.base_url}/surveys/{survey_id}",
             headers=self.headers
         )
@@ -207,7 +325,7 @@ class QualtricsAPI:
     
     def get_all_surveys(self) -> List[Dict[str, Any]]:
         """Get list of all surveys in the organization."""
-        response = requests.get(
+        response = self.session.get(
             f"{self.base_url}/surveys",
             headers=self.headers
         )
@@ -225,7 +343,7 @@ class QualtricsAPI:
             Dict with response counts
         """
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/surveys/{survey_id}/response-counts",
                 headers=self.headers
             )
@@ -354,24 +472,14 @@ def save_diary_responses_to_csv(start_date: Optional[str] = None,
     """
     client = get_qualtrics_client()
     
-    # Get responses as CSV directly to get proper column names
-    csv_data = client.get_survey_responses(client.survey_diary_id, 
-                                          format='csv', 
+    # Get responses as CSV directly to get proper column names, streaming the CSV
+    # out of the downloaded export ZIP into the parser
+    with client.open_survey_responses_csv(client.survey_diary_id, 
                                           start_date=start_date, 
                                           end_date=end_date,
-                                          use_labels=use_labels)
-    
-    # Convert CSV data to DataFrame
-    import pandas as pd
-    import io
-    
-    # Handle bytes or string data
-    if isinstance(csv_data, bytes):
-        csv_string = csv_data.decode('utf-8', errors='ignore')
-    else:
-        csv_string = csv_data
-    
-    df = pd.read_csv(io.StringIO(csv_string))
+                                          use_labels=use_labels) as csv_file:
+        # newline='' keeps line breaks inside quoted answers as exported
+        df = pd.read_csv(io.TextIOWrapper(csv_file, encoding='utf-8', errors='ignore', newline=''))
     
     if not include_test:
         # Skip first 14 rows (test responses)
@@ -445,24 +553,14 @@ def save_exit_responses_to_csv(start_date: Optional[str] = None,
     """
     client = get_qualtrics_client()
     
-    # Get responses as CSV directly to get proper column names
-    csv_data = client.get_survey_responses(client.survey_exit_id, 
-                                          format='csv', 
+    # Get responses as CSV directly to get proper column names, streaming the CSV
+    # out of the downloaded export ZIP into the parser
+    with client.open_survey_responses_csv(client.survey_exit_id, 
                                           start_date=start_date, 
                                           end_date=end_date,
-                                          use_labels=use_labels)
-    
-    # Convert CSV data to DataFrame
-    import pandas as pd
-    import io
-    
-    # Handle bytes or string data
-    if isinstance(csv_data, bytes):
-        csv_string = csv_data.decode('utf-8', errors='ignore')
-    else:
-        csv_string = csv_data
-    
-    df = pd.read_csv(io.StringIO(csv_string))
+                                          use_labels=use_labels) as csv_file:
+        # newline='' keeps line breaks inside quoted answers as exported
+        df = pd.read_csv(io.TextIOWrapper(csv_file, encoding='utf-8', errors='ignore', newline=''))
     
     if not include_test:
         # Skip first 14 rows (test responses)
@@ -516,13 +614,72 @@ def save_recent_exit_responses(hours: int = 24,
     )
 
 
-def save_contact_list_to_csv(filename: Optional[str] = None) -> str:
+def get_contact_last_modified(contact: Dict[str, Any]) -> Optional[str]:
+    """Return the last-modified marker of a contact list element, if the API provides one."""
+    for field in CONTACT_LAST_MODIFIED_FIELDS:
+        if contact.get(field):
+            return str(contact[field])
+    return None
+
+
+def load_contact_cache(cache_path: str) -> Dict[str, Dict[str, Any]]:
+    """Load the contactId -> {lastModified, detail} cache, or an empty cache if unavailable."""
+    if not os.path.exists(cache_path):
+        return {}
+    
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Warning: Could not read contact cache {cache_path}: {e}")
+        return {}
+
+
+def save_contact_cache(cache_path: str, cache: Dict[str, Dict[str, Any]]) -> None:
+    """Atomically write the contact cache."""
+    temp_path = f"{cache_path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(temp_path, cache_path)
+
+
+def build_contact_record(contact_id: str, contact_detail: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a contact detail (including embedded data) into a CSV record."""
+    contact_record = {
+        'contactId': contact_id,
+        'firstName': contact_detail.get('firstName', ''),
+        'lastName': contact_detail.get('lastName', ''),
+        'email': contact_detail.get('email', ''),
+        'phone': contact_detail.get('phone', ''),
+        'extRef': contact_detail.get('extRef', ''),
+        'language': contact_detail.get('language', ''),
+        'unsubscribed': contact_detail.get('unsubscribed', False)
+    }
+    
+    # Add embedded data fields
+    embedded_data = contact_detail.get('embeddedData', {})
+    for key, value in embedded_data.items():
+        contact_record[key] = value
+    
+    return contact_record
+
+
+def save_contact_list_to_csv(filename: Optional[str] = None,
+                             max_workers: int = DEFAULT_CONTACT_WORKERS,
+                             use_cache: bool = True) -> str:
     """
     Save contact list data with embedded data to CSV in .tmp directory.
     Uses Qualtrics Mailing List API to fetch contacts and their embedded data.
     
+    Contacts are listed with embedded data included where the API supports it
+    (XM Directory endpoint). Otherwise details are fetched concurrently, and a
+    local cache keyed by contactId skips contacts whose last-modified time is
+    unchanged since the previous export.
+    
     Args:
         filename: Optional custom filename (without path or extension)
+        max_workers: Maximum concurrent contact detail requests
+        use_cache: Whether to read/write the local contact cache
         
     Returns:
         Full path to the saved CSV file
@@ -542,55 +699,98 @@ def save_contact_list_to_csv(filename: Optional[str] = None) -> str:
     else:
         raise ValueError("Invalid CONTACT_WHITELIST_ID format. Expected URL with /contacts/ path")
     
+    # The directory ID (POOL_...) enables the XM Directory list endpoint with embedded data
+    directory_id = None
+    if '/directories/' in contact_whitelist_url:
+        directory_id = contact_whitelist_url.split('/directories/')[-1].split('/')[0]
+    
     print(f"Using mailing list ID: {mailing_list_id}")
     
+    # Ensure .tmp directory exists
+    tmp_dir = os.path.join(os.path.dirname(__file__), '..', '.tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    
+    cache_path = os.path.join(tmp_dir, CONTACT_CACHE_FILENAME)
+    contact_cache = load_contact_cache(cache_path) if use_cache else {}
+    
+    def fetch_contact_detail(contact_id: str) -> Dict[str, Any]:
+        detail_response = client.session.get(
+            f"{client.base_url}/mailinglists/{mailing_list_id}/contacts/{contact_id}",
+            headers=client.headers
+        )
+        detail_response.raise_for_status()
+        return detail_response.json()['result']
+    
+    # Prefer the list export that includes embedded data, fall back to the legacy endpoint
+    list_urls = [f"{client.base_url}/mailinglists/{mailing_list_id}/contacts"]
+    if directory_id:
+        list_urls.insert(0, f"{client.base_url}/directories/{directory_id}/mailinglists/{mailing_list_id}/contacts?includeEmbedded=true")
+    
     # Fetch contacts from Qualtrics Mailing List API
     contacts_data = []
-    next_page = f"{client.base_url}/mailinglists/{mailing_list_id}/contacts"
+    stats = {'bulk': 0, 'cached': 0, 'fetched': 0}
+    next_page = list_urls.pop(0)
     
     while next_page:
         try:
-            response = requests.get(next_page, headers=client.headers)
+            response = client.session.get(next_page, headers=client.headers)
             if response.status_code != 200:
+                if list_urls and not contacts_data:
+                    print(f"Bulk contact export unavailable ({response.status_code}), using per-contact requests")
+                    next_page = list_urls.pop(0)
+                    continue
                 print(f"API Error: {response.status_code}")
                 print(f"Response: {response.text}")
                 break
             response.raise_for_status()
             data = response.json()
+            list_urls = []
             
             # Get basic contact info
             contacts = data['result']['elements']
             
-            # For each contact, get detailed info including embedded data
-            for contact in contacts:
+            # Resolve each contact's detail from the list itself, the cache, or a detail request
+            page_details = [None] * len(contacts)
+            to_fetch = []
+            for index, contact in enumerate(contacts):
                 contact_id = contact.get('contactId', contact.get('id', ''))
+                last_modified = get_contact_last_modified(contact)
+                cached = contact_cache.get(contact_id)
                 
-                # Get detailed contact info with embedded data
-                detail_response = requests.get(
-                    f"{client.base_url}/mailinglists/{mailing_list_id}/contacts/{contact_id}",
-                    headers=client.headers
-                )
-                detail_response.raise_for_status()
-                contact_detail = detail_response.json()['result']
+                if 'embeddedData' in contact:
+                    page_details[index] = contact
+                    contact_cache[contact_id] = {'lastModified': last_modified, 'detail': contact}
+                    stats['bulk'] += 1
+                elif cached and last_modified and cached.get('lastModified') == last_modified:
+                    page_details[index] = cached['detail']
+                    stats['cached'] += 1
+                else:
+                    to_fetch.append((index, contact_id, last_modified))
                 
-                # Extract contact info and embedded data
-                contact_record = {
-                    'contactId': contact_id,
-                    'firstName': contact_detail.get('firstName', ''),
-                    'lastName': contact_detail.get('lastName', ''),
-                    'email': contact_detail.get('email', ''),
-                    'phone': contact_detail.get('phone', ''),
-                    'extRef': contact_detail.get('extRef', ''),
-                    'language': contact_detail.get('language', ''),
-                    'unsubscribed': contact_detail.get('unsubscribed', False)
-                }
+            # Get detailed contact info with embedded data (bounded concurrency)
+            fetch_error = None
+            if to_fetch:
+                with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                    futures = [(index, contact_id, last_modified, executor.submit(fetch_contact_detail, contact_id))
+                               for index, contact_id, last_modified in to_fetch]
+                    for index, contact_id, last_modified, future in futures:
+                        try:
+                            page_details[index] = future.result()
+                        except requests.exceptions.RequestException as e:
+                            fetch_error = fetch_error or e
+                            continue
+                        contact_cache[contact_id] = {'lastModified': last_modified, 'detail': page_details[index]}
+                        stats['fetched'] += 1
                 
-                # Add embedded data fields
-                embedded_data = contact_detail.get('embeddedData', {})
-                for key, value in embedded_data.items():
-                    contact_record[key] = value
+            # Keep list order; stop at the first contact that could not be fetched
+            for contact, contact_detail in zip(contacts, page_details):
+                if contact_detail is None:
+                    break
+                contact_id = contact.get('contactId', contact.get('id', ''))
+                contacts_data.append(build_contact_record(contact_id, contact_detail))
                 
-                contacts_data.append(contact_record)
+            if fetch_error:
+                raise fetch_error
             
             # Get next page URL if available
             next_page = data['result'].get('nextPage')
@@ -599,6 +799,12 @@ def save_contact_list_to_csv(filename: Optional[str] = None) -> str:
             print(f"Error fetching contacts: {e}")
             break
     
+    if use_cache:
+        save_contact_cache(cache_path, contact_cache)
+    
+    print(f"Contacts: {stats['bulk']} from list export, {stats['cached']} unchanged (cache), "
+          f"{stats['fetched']} fetched individually")
+    
     import pandas as pd
     df = pd.DataFrame(contacts_data)
     
@@ -607,10 +813,6 @@ def save_contact_list_to_csv(filename: Optional[str] = None) -> str:
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f'contact_list_{timestamp}'
     
-    # Ensure .tmp directory exists
-    tmp_dir = os.path.join(os.path.dirname(__file__), '..', '.tmp')
-    os.makedirs(tmp_dir, exist_ok=True)
-    
     # Save to CSV
     output_path = os.path.join(tmp_dir, f'{filename}.csv')
     df.to_csv(output_path, index=False)
@@ -634,7 +836,7 @@ def list_directories() -> List[Dict[str, Any]]:
     """
     client = get_qualtrics_client()
     
-    response = requests.get(f"{client.base_url}/directories", headers=client.headers)
+    response = client.session.get(f"{client.base_url}/directories", headers=client.headers)
     response.raise_for_status()
     
     directories = response.json()['result']['elements']
@@ -663,7 +865,7 @@ def list_mailing_lists() -> List[Dict[str, Any]]:
     client = get_qualtrics_client()
     
     try:
-        response = requests.get(f"{client.base_url}/mailinglists", headers=client.headers)
+        response = client.session.get(f"{client.base_url}/mailinglists", headers=client.headers)
         response.raise_for_status()
         
         mailing_lists = response.json()['result']['elements']